@@ -2,13 +2,34 @@
 后端服务器模块
 提供RESTful API接口，处理游戏方的请求
 """
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
-from flask_socketio import SocketIO, emit
-from game_logic import GameLogic, GameStatus
+from flask_socketio import SocketIO, emit, join_room
+from game_logic import GameLogic, GameStatus, SPEAKER_TIMEOUT, VOTE_TIMEOUT, format_time, monotonic_clock
+from tournament import Tournament, MAX_RESIDENT_TABLES, ROOM_IDLE_SECONDS, SNAPSHOT_DIR
+from status_feed import StatusFeed
+from replay import CommandRecorder
+from state_history import HISTORY_WINDOW, StateHistory, thaw
+from traffic import TrafficRecorder
+from vote_analytics import TOP_PAIRS, VoteAnalytics
+from connection_quality import PING_INTERVAL, ConnectionQuality
+from diagnostics import TOP_ALLOCATIONS, ResourceProbe
+from polling import next_poll_ms, record_poll
+from bot_sandbox import BOT_CALL_TIMEOUT, BOT_UID, BOT_WORKERS, BotPool, BotRegistry
+from tracing import SLOW_TRACE_MS, TracedLock, TraceStore, current_trace, install as install_tracing, span
+from description_similarity import DescriptionSimilarity
+from word_filter import PINYIN_AVAILABLE, validate_variants
+from description_index import DescriptionIndex, COPY_MIN_LENGTH, INDEX_DIR, SEARCH_LIMIT
 import os
+import contextlib
+import hmac
 import threading
+import json
+import secrets
 import socket
+import time
+import atexit
+from datetime import datetime
 
 app = Flask(__name__)
 CORS(app)  # 允许跨域请求
@@ -17,11 +38,105 @@ socketio = SocketIO(app, cors_allowed_origins="*")  # WebSocket支持
 # 管理员令牌（主持方专用）
 ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "host-secret")
 
-# 全局游戏逻辑实例
-game = GameLogic()
+# 全局游戏逻辑实例（记录命令流，可离线回放复现；保留最近 STATE_HISTORY_WINDOW 个历史版本）
+game = GameLogic(recorder=CommandRecorder(),
+                 history=StateHistory(int(os.environ.get("STATE_HISTORY_WINDOW", HISTORY_WINDOW))))
 
-# 线程锁，保证线程安全
-game_lock = threading.Lock()
+# 线程锁，保证线程安全（请求中加锁时把等锁和持锁时间记入追踪）
+game_lock = TracedLock()
+
+# 锦标赛（多桌并行，每张桌子有独立的游戏实例和锁；空闲桌子休眠到磁盘快照）
+tournament = Tournament(
+    snapshot_dir=os.environ.get("SNAPSHOT_DIR", SNAPSHOT_DIR),
+    idle_seconds=float(os.environ.get("ROOM_IDLE_SECONDS", ROOM_IDLE_SECONDS)),
+    max_resident=int(os.environ.get("MAX_RESIDENT_TABLES", MAX_RESIDENT_TABLES))
+)
+HIBERNATE_SWEEP_SECONDS = 30  # 检查空闲桌子的间隔（秒）
+
+# 投票图分析（主游戏和所有桌子、所有局的投票，每处理完一轮投票增量更新）
+vote_analytics = VoteAnalytics()
+
+# 历史描述全文索引（所有桌子、所有局，提交时增量加入，落盘在 DESCRIPTION_INDEX_DIR）
+description_index = DescriptionIndex(os.environ.get("DESCRIPTION_INDEX_DIR", INDEX_DIR))
+atexit.register(description_index.close)
+
+# 各游戏当前回合的描述相似度 {桌号(主游戏为None): 引擎}，每提交一条描述增量更新
+similarity_engines = {}
+
+# 请求追踪：响应带 Server-Timing，超过 SLOW_TRACE_MS 毫秒的慢请求保存在内存中供主持界面查看
+trace_store = TraceStore(float(os.environ.get("SLOW_TRACE_MS", SLOW_TRACE_MS)))
+install_tracing(app, trace_store)
+
+# 各组连接质量（Socket.IO 往返时延、抖动、丢包、重连和 HTTP 耗时），用于区分超时是思考还是网络原因
+connection_quality = ConnectionQuality()
+
+# 已加入私有频道的连接 {sid: 组名}（逐个连接发送 latency_ping 并等待 ack）
+group_sids = {}
+
+# 托管机器人：主持方上传的各组策略在隔离的子进程池中执行，结果直接提交给游戏逻辑
+# 默认关闭，HOSTED_BOTS=1 开启；BOT_ISOLATION=none 关闭隔离（只剩资源限制，仅用于本机调试可信的策略）
+HOSTED_BOTS = os.environ.get("HOSTED_BOTS", "0") == "1"
+bots = BotRegistry(BotPool(workers=int(os.environ.get("BOT_WORKERS", BOT_WORKERS)),
+                           timeout=float(os.environ.get("BOT_CALL_TIMEOUT", BOT_CALL_TIMEOUT)),
+                           isolate=os.environ.get("BOT_ISOLATION", "namespace") != "none",
+                           uid=int(os.environ.get("BOT_UID", BOT_UID))))
+atexit.register(bots.close)
+bot_lock = threading.Lock()
+bot_pending = set()  # 状态有变化、需要让机器人行动的游戏（桌号，主游戏为None）
+bot_running = set()  # 正在驱动机器人的游戏
+bot_attempts = {}  # {桌号: ((种子, 局数, 回合), {(动作, 组名)})}，每个阶段每个机器人只尝试一次
+
+# 资源诊断（soak.py 长时间压测时采样内存、线程和句柄）
+resource_probe = ResourceProbe()
+
+# 流量记录（设置环境变量 TRAFFIC_LOG=文件路径 时开启，用 traffic.py 回放）
+traffic = TrafficRecorder(os.environ["TRAFFIC_LOG"]) if os.environ.get("TRAFFIC_LOG") else None
+if traffic is not None:
+    atexit.register(traffic.close)
+
+
+@app.before_request
+def _traffic_start():
+    if traffic is not None:
+        g.traffic_start = time.perf_counter()
+
+
+@app.after_request
+def _traffic_record(response):
+    """记录请求的路由、请求体、状态码和耗时"""
+    if traffic is not None and 'traffic_start' in g:
+        traffic.record_http(request, response, (time.perf_counter() - g.traffic_start) * 1000)
+    return response
+
+
+@app.after_request
+def _quality_record(response):
+    """记录已注册的组的 HTTP 请求在服务器端的处理耗时"""
+    trace = current_trace()
+    body = request.get_json(silent=True) if request.is_json else None
+    body = body if isinstance(body, dict) else {}
+    group_name = request.args.get('group_name') or body.get('group_name') or body.get('voter_group')
+    if trace is not None and isinstance(group_name, str) and group_name.strip() in group_tokens:
+        connection_quality.record_http(group_name.strip(), (time.perf_counter() - trace.start) * 1000)
+    return response
+
+
+def _record_socket(event, data=None):
+    """记录游戏方发来的 Socket.IO 事件（开启流量记录时）"""
+    if traffic is not None:
+        traffic.record_socket(request.sid, event, data)
+
+# 观众端SSE推送（所有订阅者共享同一份序列化结果）
+status_feed = StatusFeed()
+
+# 各组私有频道凭证（注册时下发，加入私有 Socket.IO 频道时校验）
+group_tokens = {}
+
+# 主持方频道：完整游戏状态和违禁词通知含双方词语，只推送给携带主持方令牌加入的连接（前端中继）
+HOST_ROOM = 'host'
+
+# 各游戏上次私有推送时的阶段 {桌号(主游戏为None): (种子, 局数, 状态, 回合, 发言者索引)}
+private_phases = {}
 
 
 def broadcast_status():
@@ -29,13 +144,396 @@ def broadcast_status():
     with game_lock:
         status = game.get_public_status()
     socketio.emit('status_update', status)
+    status_feed.publish(status)
+    push_private(None)
 
 
 def broadcast_game_state():
     """广播完整游戏状态（主持方用）"""
     with game_lock:
         state = game.get_game_state()
-    socketio.emit('game_state_update', state)
+        state['semantic_outliers'] = _similarity_engine(game, None).ranking()
+    socketio.emit('game_state_update', state, to=HOST_ROOM)
+
+
+def _index_description(room_game, group_name, table_id):
+    """把刚提交的描述加入历史描述索引（需持有该游戏的锁）"""
+    record = room_game.descriptions[room_game.current_round][-1]
+    description_index.add(record.description, record.group, room_game.groups[group_name].word,
+                          f"{room_game.undercover_word}/{room_game.civilian_word}", table_id,
+                          room_game.current_round, record.time)
+
+
+def _similarity_engine(room_game, table_id):
+    """取某个游戏的描述相似度引擎并计入新提交的描述（需持有该游戏的锁）"""
+    engine = similarity_engines.get(table_id)
+    if engine is None:
+        engine = similarity_engines[table_id] = DescriptionSimilarity()
+    engine.update(room_game)
+    return engine
+
+
+def broadcast_table(table_id):
+    """广播锦标赛某张桌子的状态变化"""
+    table = tournament.tables.get(table_id)
+    if not table:
+        return
+    with table.lock:
+        status = table.game.get_public_status()
+    status['table'] = table_id
+    socketio.emit('table_status_update', status)
+    push_private(table_id)
+
+
+def broadcast_tournament():
+    """广播锦标赛积分榜和各桌概况"""
+    with tournament.lock:
+        payload = {
+            'standings': tournament.get_standings(),
+            'tables': tournament.get_tables_summary()
+        }
+    socketio.emit('tournament_update', payload)
+
+
+def hibernation_loop():
+    """定期让空闲的锦标赛桌子休眠（写入磁盘快照并释放内存，下次访问时自动恢复）"""
+    while True:
+        socketio.sleep(HIBERNATE_SWEEP_SECONDS)
+        with tournament.lock:
+            tournament.hibernate_idle()
+            # 休眠或已撤掉的桌子不再保留描述向量
+            for table_id in [t for t in similarity_engines if t is not None]:
+                table = tournament.tables.get(table_id)
+                if table is None or not table.resident:
+                    similarity_engines.pop(table_id, None)
+        # 历史描述索引的日志过长时压缩进快照（锁外写盘，不阻塞描述提交）
+        description_index.maybe_compact()
+
+
+def latency_loop():
+    """定期向每个已加入私有频道的连接发送 latency_ping，按 ack 的往返时间统计各组网络状况"""
+    while True:
+        socketio.sleep(PING_INTERVAL)
+        connection_quality.expire()
+        for sid, group_name in list(group_sids.items()):
+            seq = connection_quality.ping_sent(group_name)
+            socketio.emit('latency_ping', {'seq': seq}, to=sid,
+                          callback=lambda *_, seq=seq: connection_quality.pong(seq))
+
+
+def _kick_bots(table_id):
+    """某个游戏状态有变化：有托管机器人时在后台让它们行动（每个游戏同时只有一个驱动任务）"""
+    if not bots:
+        return
+    with bot_lock:
+        bot_pending.add(table_id)
+        if table_id in bot_running:
+            return
+        bot_running.add(table_id)
+    socketio.start_background_task(_drive_bots, table_id)
+
+
+def _drive_bots(table_id):
+    """驱动某个游戏里的机器人，直到没有机器人可以行动且期间没有新的状态变化"""
+    while True:
+        with bot_lock:
+            if table_id not in bot_pending:
+                bot_running.discard(table_id)
+                return
+            bot_pending.discard(table_id)
+        try:
+            while _bot_step(table_id):
+                pass
+        except Exception:
+            app.logger.exception('托管机器人执行出错（桌号：%s）', table_id)
+
+
+def _bot_attempts(table_id, room_game):
+    """本阶段已尝试过的机器人动作（需持有该游戏的锁）"""
+    key = (room_game.seed, room_game.game_number, room_game.current_round)
+    entry = bot_attempts.get(table_id)
+    if entry is None or entry[0] != key:
+        entry = bot_attempts[table_id] = (key, set())
+    return entry[1]
+
+
+def _bot_step(table_id):
+    """
+    让机器人行动一步：轮到发言的机器人描述、尚未投票的机器人投票；
+    全部由机器人组成的游戏还会自动开始回合和处理投票。策略在锁外执行
+    :return: 是否有进展（有进展时继续下一步）
+    """
+    room = _room_by_id(table_id)
+    if room is None:
+        return False
+    room_game, room_lock = room
+    with room_lock:
+        status = room_game.game_status
+        active = [name for name in room_game.group_names if name not in room_game.eliminated_groups]
+        hosted = [name for name in active if name in bots]
+        if not hosted:
+            return False
+        bot_only = len(hosted) == len(active)
+        attempts = _bot_attempts(table_id, room_game)
+        if status == GameStatus.DESCRIBING:
+            speaker = room_game.get_current_speaker()
+            if speaker not in hosted or ('describe', speaker) in attempts:
+                return False
+            attempts.add(('describe', speaker))
+            word = room_game.groups[speaker].word
+            history = [{'round': round_num, 'group': record.group, 'description': record.description}
+                       for round_num, records in sorted(room_game.descriptions.items()) for record in records]
+            voters = []
+        elif status == GameStatus.VOTING:
+            views = {name: room_game.get_group_view(name) for name in hosted}
+            voters = [(name, views[name]) for name in hosted
+                      if views[name]['can_vote'] and not views[name]['has_voted'] and ('vote', name) not in attempts]
+            if not voters:
+                if not bot_only or not all(view['has_voted'] for view in views.values()):
+                    return False
+                result = room_game.process_voting_result()
+                if 'error' in result:
+                    return False
+                _announce_vote_result(room_game, table_id, result)
+            attempts.update(('vote', name) for name, _ in voters)
+        elif status in (GameStatus.WORD_ASSIGNED, GameStatus.ROUND_END) and bot_only:
+            if not room_game.start_round():
+                return False
+            _broadcast_room(table_id)
+            return True
+        else:
+            return False
+
+    if status == GameStatus.DESCRIBING:
+        description = bots.describe(speaker, word, history)
+        if description is None:
+            return False
+        with room_lock:
+            success, _ = _describe(room_game, table_id, speaker, description)
+        return success
+    if not voters:
+        _record_table_result(table_id, result)
+        return True
+    progressed = False
+    for name, view in voters:
+        target = bots.vote(name, view)
+        if target is None:
+            continue
+        with room_lock:
+            if room_game.submit_vote(name, target):
+                _broadcast_vote(table_id)
+                progressed = True
+    return progressed
+
+
+def _issue_token(group_name):
+    """下发（或沿用）某组的私有频道凭证"""
+    return group_tokens.setdefault(group_name, secrets.token_urlsafe(16))
+
+
+def _revoke_tokens(group_names):
+    """收回已不在任何游戏或报名池中的组的凭证"""
+    for name in group_names:
+        if name not in game.groups and name not in tournament.meetings:
+            group_tokens.pop(name, None)
+            connection_quality.forget([name])
+            bots.remove(name)
+
+
+def _reset_game():
+    """重置主游戏并收回其各组的凭证（需持有 game_lock）"""
+    group_names = list(game.group_names)
+    game.reset_game()
+    _revoke_tokens(group_names)
+
+
+def _group_room(group_name):
+    """某组私有频道的房间名"""
+    return f'group:{group_name}'
+
+
+def _phase_events(room_game, group_name, table_id, view, include_word=False):
+    """
+    根据当前阶段生成发给某组的私有事件（需持有该游戏的锁）
+    :param include_word: 是否无论阶段都附带 your_word（加入频道、断线重连时补发）
+    :return: [(事件名, 数据)]
+    """
+    events = []
+    status = room_game.game_status
+    extra = {'table': table_id} if table_id else {}
+    if view['word'] and (include_word or status == GameStatus.WORD_ASSIGNED):
+        events.append(('your_word', {'group': group_name, 'word': view['word'], **extra}))
+    if view['is_my_turn']:
+        events.append(('your_turn', {
+            'group': group_name,
+            'round': room_game.current_round,
+            'deadline': view['speaker_deadline'],
+            'remaining_seconds': view['speaker_remaining_seconds'],
+            'server_time': view['server_time'],
+            **extra
+        }))
+    if view['can_vote']:
+        events.append(('vote_open', {
+            'group': group_name,
+            'round': room_game.current_round,
+            'candidates': [g for g in view['active_groups'] if g != group_name],
+            'deadline': view['phase_deadline'],
+            'remaining_seconds': view['remaining_seconds'],
+            'server_time': view['server_time'],
+            **extra
+        }))
+    return events
+
+
+def push_private(table_id):
+    """
+    向某个游戏里各组的私有频道推送：每次都推送"我的视图"，
+    阶段变化（开局、换人发言、进入投票）时再推送 your_word / your_turn / vote_open
+    """
+    if table_id:
+        table = tournament.tables.get(table_id)
+        if not table:
+            return
+        room_game, room_lock = table.handle, table.lock
+    else:
+        room_game, room_lock = game, game_lock
+
+    outgoing = []
+    with room_lock:
+        phase = (room_game.seed, room_game.game_number, room_game.game_status,
+                 room_game.current_round, room_game.current_speaker_index)
+        changed = private_phases.get(table_id) != phase
+        private_phases[table_id] = phase
+        for name in room_game.group_names:
+            view = room_game.get_group_view(name)
+            if table_id:
+                view['table'] = table_id
+            outgoing.append((name, 'my_view', view))
+            if changed:
+                outgoing.extend((name, event, payload)
+                                for event, payload in _phase_events(room_game, name, table_id, view))
+    for name, event, payload in outgoing:
+        socketio.emit(event, payload, to=_group_room(name))
+    _kick_bots(table_id)
+
+
+def _room_for(group_name):
+    """
+    根据组名找到所在的游戏
+    :return: (游戏实例, 锁, 桌号)，未参加锦标赛时为主游戏，桌号为None；桌子返回的是句柄，需加锁后使用
+    """
+    table = tournament.table_for(group_name) if group_name else None
+    if table:
+        return table.handle, table.lock, table.table_id
+    return game, game_lock, None
+
+
+def _room_by_id(table_id):
+    """
+    按桌号找到游戏
+    :return: (游戏实例, 锁)，桌子不存在时返回None
+    """
+    if not table_id:
+        return game, game_lock
+    table = tournament.tables.get(table_id)
+    if not table:
+        return None
+    return table.handle, table.lock
+
+
+def _admin_room():
+    """主持方接口通过 ?table= 指定操作的桌子，缺省为主游戏；桌号无效时返回None"""
+    table_id = request.args.get('table', '').strip()
+    if not table_id:
+        return game, game_lock, None
+    table = tournament.tables.get(table_id)
+    if not table:
+        return None
+    return table.handle, table.lock, table_id
+
+
+def _background(task, *args):
+    """在后台执行广播任务；请求中发起时，广播耗时在响应之后补记到该请求的追踪（broadcast 分段）"""
+    trace = current_trace()
+    if trace is None:
+        socketio.start_background_task(task, *args)
+        return
+
+    def traced():
+        with trace.span('broadcast'):
+            task(*args)
+    socketio.start_background_task(traced)
+
+
+def _broadcast_room(table_id):
+    """广播某个游戏的状态变化"""
+    if table_id:
+        _background(broadcast_table, table_id)
+    else:
+        _background(broadcast_status)
+        _background(broadcast_game_state)
+
+
+def _export_events(room_game, room_lock):
+    """
+    逐条生成比赛记录事件（NDJSON导出用）
+    每次只在锁内复制一小段数据，导出期间不会长时间占用锁
+    """
+    with room_lock:
+        header = {
+            'type': 'export',
+            'status': room_game.game_status.value,
+            'current_round': room_game.current_round,
+            'exported_at': datetime.now().isoformat()
+        }
+        group_names = list(room_game.groups.keys())
+    yield header
+
+    for name in group_names:
+        with room_lock:
+            info = room_game.groups.get(name)
+            event = info and {'type': 'registration', 'group': name, 'time': format_time(info.registered_at)}
+        if event:
+            yield event
+
+    with room_lock:
+        if room_game.undercover_group:
+            event = {
+                'type': 'role_assignment',
+                'undercover_group': room_game.undercover_group,
+                'undercover_word': room_game.undercover_word,
+                'civilian_word': room_game.civilian_word,
+                'roles': {name: info.role for name, info in room_game.groups.items()}
+            }
+        else:
+            event = None
+        last_round = room_game.current_round
+    if event:
+        yield event
+
+    result_index = 0
+    for round_num in range(1, last_round + 1):
+        with room_lock:
+            descriptions = [desc.to_dict() for desc in room_game.descriptions.get(round_num, [])]
+        for desc in descriptions:
+            yield {'type': 'description', 'round': round_num, **desc}
+
+        with room_lock:
+            votes = list(room_game.round_votes(round_num).items())
+        for voter, target in votes:
+            yield {'type': 'vote', 'round': round_num, 'voter': voter, 'target': target}
+
+        while True:
+            with room_lock:
+                result = room_game.vote_results[result_index] if result_index < len(room_game.vote_results) else None
+            if not result or result['round'] != round_num:
+                break
+            result_index += 1
+            yield {'type': 'result', **result}
+
+    with room_lock:
+        scores = dict(room_game.scores)
+    yield {'type': 'scores', 'scores': scores}
 
 
 def get_local_ip():
@@ -66,7 +564,8 @@ def make_response(data=None, code=200, message="ok"):
         "message": message,
         "data": data or {}
     }
-    return jsonify(payload), code
+    with span('serialize'):
+        return jsonify(payload), code
 
 
 @app.route('/api/register', methods=['POST'])
@@ -83,16 +582,187 @@ def register():
         success = game.register_group(group_name)
         if success:
             # 广播状态变化
-            socketio.start_background_task(broadcast_status)
-            socketio.start_background_task(broadcast_game_state)
+            _background(broadcast_status)
+            _background(broadcast_game_state)
             return make_response({
                 'group_name': group_name,
-                'total_groups': len(game.groups)
+                'total_groups': len(game.groups),
+                'token': _issue_token(group_name)  # 加入私有推送频道的凭证
             }, 200, '注册成功')
         else:
             return make_response({}, 400, '注册失败：组名已存在或已达到最大组数(5组)')
 
 
+@app.route('/api/register/bulk', methods=['POST'])
+def register_bulk():
+    """批量注册接口（主持方调用，全部成功或全部失败）"""
+    if not _require_admin():
+        return _admin_forbidden_response()
+    data = request.json or {}
+    group_names = data.get('group_names')
+    if not isinstance(group_names, list):
+        return make_response({}, 400, 'group_names必须是列表')
+    group_names = [name.strip() if isinstance(name, str) else '' for name in group_names]
+    if not all(group_names):
+        return make_response({}, 400, '组名不能为空')
+
+    with game_lock:
+        success, message = game.register_groups(group_names)
+        if not success:
+            return make_response({}, 400, f'注册失败：{message}')
+        # 整批只广播一次
+        _background(broadcast_status)
+        _background(broadcast_game_state)
+        return make_response({
+            'group_names': group_names,
+            'total_groups': len(game.groups),
+            'tokens': {name: _issue_token(name) for name in group_names}
+        }, 200, message)
+
+
+def _batch_register(room_game, op):
+    if room_game is not game:
+        # 与重置相同：桌子的成员由锦标赛管理，直接注册不会更新 teams/team_table
+        return False, '锦标赛的桌子不能单独注册，请使用 /api/tournament/register', {}
+    if 'group_names' in op:
+        names = op['group_names']
+        if not isinstance(names, list):
+            return False, 'group_names必须是列表', {}
+    else:
+        names = [op['group_name']] if op.get('group_name') else []
+    names = [name.strip() if isinstance(name, str) else '' for name in names]
+    if not names or not all(names):
+        return False, '组名不能为空', {}
+    success, message = room_game.register_groups(names)
+    if not success:
+        return success, message, {'total_groups': len(room_game.groups)}
+    return success, message, {
+        'total_groups': len(room_game.groups),
+        'tokens': {name: _issue_token(name) for name in names}
+    }
+
+
+def _batch_start_game(room_game, op):
+    undercover_word = (op.get('undercover_word') or '').strip()
+    civilian_word = (op.get('civilian_word') or '').strip()
+    if not undercover_word or not civilian_word:
+        return False, '词语不能为空', {}
+    variants = op.get('variants') or {}
+    variants_error = validate_variants(variants)
+    if variants_error:
+        return False, variants_error, {}
+    if not room_game.start_game(undercover_word, civilian_word, variants):
+        return False, '无法开始游戏：游戏状态不正确或没有注册的组', {}
+    return True, '游戏已开始', {'undercover_group': room_game.undercover_group}
+
+
+def _batch_new_game(room_game, op):
+    undercover_word = (op.get('undercover_word') or '').strip()
+    civilian_word = (op.get('civilian_word') or '').strip()
+    if not undercover_word or not civilian_word:
+        return False, '词语不能为空', {}
+    variants = op.get('variants') or {}
+    variants_error = validate_variants(variants)
+    if variants_error:
+        return False, variants_error, {}
+    success, message = room_game.new_game(undercover_word, civilian_word, variants)
+    if not success:
+        return False, message, {}
+    return True, message, {'game_number': room_game.game_number, 'undercover_group': room_game.undercover_group}
+
+
+def _batch_start_round(room_game, op):
+    order = room_game.start_round()
+    if not order:
+        return False, '无法开始回合：游戏状态不正确或活跃组数不足', {}
+    return True, '回合已开始', {'round': room_game.current_round, 'order': order}
+
+
+def _batch_process_voting(room_game, op):
+    result = room_game.process_voting_result()
+    if 'error' in result:
+        return False, result['error'], {}
+    _observe_votes(room_game, result)
+    return True, '投票结果已生成', result
+
+
+def _batch_reset(room_game, op):
+    if room_game is not game:
+        # 桌子的成员和座位由锦标赛管理，单独清空会与 team_table 不一致
+        return False, '锦标赛的桌子不能单独重置，请使用 /api/tournament/reset', {}
+    _reset_game()
+    return True, '游戏已重置', {}
+
+
+def _observe_votes(room_game, result):
+    """把刚处理完的一轮投票计入投票图分析（需持有该游戏的锁）"""
+    vote_analytics.observe_round(room_game.round_votes(result['round']), room_game.undercover_group,
+                                 result['eliminated'], result['game_ended'])
+
+
+# 批量命令支持的操作 {op: 处理函数(游戏实例, 操作参数) -> (是否成功, 消息, 数据)}
+BATCH_OPERATIONS = {
+    'register': _batch_register,
+    'start_game': _batch_start_game,
+    'new_game': _batch_new_game,
+    'start_round': _batch_start_round,
+    'process_voting': _batch_process_voting,
+    'reset': _batch_reset,
+}
+
+
+@app.route('/api/game/batch', methods=['POST'])
+def batch_commands():
+    """
+    批量执行主持方命令（一次加锁、结束时只广播一次）
+    按顺序执行，遇到失败的操作后停止，后续操作标记为跳过
+    """
+    if not _require_admin():
+        return _admin_forbidden_response()
+    operations = (request.json or {}).get('operations')
+    if not isinstance(operations, list) or not operations:
+        return make_response({}, 400, 'operations必须是非空列表')
+    room = _admin_room()
+    if room is None:
+        return make_response({}, 404, '桌号不存在')
+    room_game, room_lock, table_id = room
+
+    results = []
+    vote_results = []
+    failed = False
+    # 锦标赛的桌子先加锦标赛的锁（与其他接口相同的加锁顺序），每局结束时立即计入积分榜，
+    # 否则同一批中随后的 new_game 会让这局的得分再也计不进去
+    with tournament.lock if table_id else contextlib.nullcontext(), room_lock:
+        for op in operations:
+            name = op.get('op') if isinstance(op, dict) else None
+            if failed:
+                results.append({'op': name, 'success': False, 'message': '已跳过', 'data': {}})
+                continue
+            handler = BATCH_OPERATIONS.get(name)
+            if handler is None:
+                success, message, data = False, f'未知操作：{name}', {}
+            else:
+                success, message, data = handler(room_game, op)
+            if success and name == 'process_voting':
+                vote_results.append(data)
+                if table_id and data.get('game_ended'):
+                    tournament.record_table(table_id)
+            if success and name == 'new_game' and table_id:
+                # 同一张桌子的新一局结束后也计入锦标赛积分榜
+                tournament.tables[table_id].recorded = False
+            results.append({'op': name, 'success': success, 'message': message, 'data': data})
+            failed = not success
+
+    if any(r['success'] for r in results):
+        _broadcast_room(table_id)
+        for result in vote_results:
+            socketio.emit('vote_result', dict(result, table=table_id) if table_id else result)
+    if table_id and any(r.get('game_ended') for r in vote_results):
+        _background(broadcast_tournament)
+    return make_response({'results': results}, 400 if failed else 200,
+                         '部分操作失败' if failed else '批量操作已完成')
+
+
 @app.route('/api/game/start', methods=['POST'])
 def start_game():
     """开始游戏接口（主持方调用）"""
@@ -101,43 +771,121 @@ def start_game():
     data = request.json
     undercover_word = data.get('undercover_word', '').strip()
     civilian_word = data.get('civilian_word', '').strip()
+    variants = data.get('variants') or {}  # 违禁词变体 {词语: [变体写法...]}
     
     if not undercover_word or not civilian_word:
         return make_response({}, 400, '词语不能为空')
+    variants_error = validate_variants(variants)
+    if variants_error:
+        return make_response({}, 400, variants_error)
     
     with game_lock:
-        success = game.start_game(undercover_word, civilian_word)
+        success = game.start_game(undercover_word, civilian_word, variants)
         if success:
             # 广播状态变化
-            socketio.start_background_task(broadcast_status)
-            socketio.start_background_task(broadcast_game_state)
+            _background(broadcast_status)
+            _background(broadcast_game_state)
             return make_response({
                 'undercover_group': game.undercover_group,
-                'groups': {name: info['role'] for name, info in game.groups.items()}
+                'groups': {name: info.role for name, info in game.groups.items()}
             }, 200, '游戏已开始')
         else:
             return make_response({}, 400, '无法开始游戏：游戏状态不正确或没有注册的组')
 
 
+@app.route('/api/game/new', methods=['POST'])
+def new_game():
+    """
+    系列赛下一局接口（主持方调用）
+    保留已注册的组、私有频道凭证和系列赛累计得分，归档上一局后重新分配身份和词语，无需重新注册
+    """
+    if not _require_admin():
+        return _admin_forbidden_response()
+    data = request.json or {}
+    undercover_word = (data.get('undercover_word') or '').strip()
+    civilian_word = (data.get('civilian_word') or '').strip()
+    variants = data.get('variants') or {}
+
+    if not undercover_word or not civilian_word:
+        return make_response({}, 400, '词语不能为空')
+    variants_error = validate_variants(variants)
+    if variants_error:
+        return make_response({}, 400, variants_error)
+    room = _admin_room()
+    if room is None:
+        return make_response({}, 404, '桌号不存在')
+    room_game, room_lock, table_id = room
+
+    with room_lock:
+        success, message = room_game.new_game(undercover_word, civilian_word, variants)
+        if not success:
+            return make_response({}, 400, f'无法开始下一局：{message}')
+        payload = {
+            'game_number': room_game.game_number,
+            'undercover_group': room_game.undercover_group,
+            'groups': {name: info.role for name, info in room_game.groups.items()}
+        }
+    if table_id:
+        # 同一张桌子的新一局结束后也计入锦标赛积分榜
+        with tournament.lock:
+            tournament.tables[table_id].recorded = False
+    _broadcast_room(table_id)
+    return make_response(payload, 200, message)
+
+
+@app.route('/api/game/series', methods=['GET'])
+def get_series():
+    """系列赛累计得分和往局归档（主持方调用）"""
+    if not _require_admin():
+        return _admin_forbidden_response()
+    room = _admin_room()
+    if room is None:
+        return make_response({}, 404, '桌号不存在')
+    room_game, room_lock, _ = room
+    with room_lock:
+        return make_response(room_game.get_series())
+
+
 @app.route('/api/game/round/start', methods=['POST'])
 def start_round():
     """开始新回合接口（主持方调用）"""
     if not _require_admin():
         return _admin_forbidden_response()
-    with game_lock:
-        order = game.start_round()
+    room = _admin_room()
+    if room is None:
+        return make_response({}, 404, '桌号不存在')
+    room_game, room_lock, table_id = room
+    with room_lock:
+        order = room_game.start_round()
         if order:
             # 广播状态变化
-            socketio.start_background_task(broadcast_status)
-            socketio.start_background_task(broadcast_game_state)
+            _broadcast_room(table_id)
             return make_response({
-                'round': game.current_round,
+                'round': room_game.current_round,
                 'order': order
             }, 200, '回合已开始')
         else:
             return make_response({}, 400, '无法开始回合：游戏状态不正确或活跃组数不足')
 
 
+def _describe(room_game, table_id, group_name, description):
+    """
+    提交描述，并通知违禁词、更新相似度和历史索引、广播状态（需持有该游戏的锁）
+    :return: (是否成功, 消息)
+    """
+    flag_count = len(room_game.flags)
+    success, message = room_game.submit_description(group_name, description)
+    if len(room_game.flags) > flag_count:
+        # 描述中出现违禁词，只通知主持方（命中记录含双方词语）
+        socketio.emit('description_flag', dict(room_game.flags[-1], table=table_id), to=HOST_ROOM)
+    if success:
+        _similarity_engine(room_game, table_id)
+        _index_description(room_game, group_name, table_id)
+        # 广播状态变化
+        _broadcast_room(table_id)
+    return success, message
+
+
 @app.route('/api/describe', methods=['POST'])
 def submit_description():
     """提交描述接口（游戏方调用）"""
@@ -148,24 +896,36 @@ def submit_description():
     if not group_name or not description:
         return make_response({}, 400, '组名和描述不能为空')
     
-    with game_lock:
-        success, message = game.submit_description(group_name, description)
+    room_game, room_lock, table_id = _room_for(group_name)
+    with room_lock:
+        # 本次发言的开始时刻（上一组提交或回合开始），用于拆分网络耗时和思考耗时
+        turn_started = room_game.speaker_deadline - SPEAKER_TIMEOUT if room_game.speaker_deadline else None
+        success, message = _describe(room_game, table_id, group_name, description)
         if success:
-            # 广播状态变化
-            socketio.start_background_task(broadcast_status)
-            socketio.start_background_task(broadcast_game_state)
+            if turn_started is not None:
+                record = room_game.descriptions[room_game.current_round][-1]
+                connection_quality.record_submission(group_name, 'describe', room_game.current_round,
+                                                     record.time - turn_started, record.timeout)
             # 获取当前描述列表
-            current_descriptions = game.descriptions.get(game.current_round, [])
+            current_descriptions = room_game.descriptions.get(room_game.current_round, [])
             return make_response({
-                'round': game.current_round,
+                'round': room_game.current_round,
                 'total_descriptions': len(current_descriptions)
             }, 200, message)
         else:
             return make_response({
-                'current_speaker': game.get_current_speaker()
+                'current_speaker': room_game.get_current_speaker()
             }, 200, message)  # 返回200但提示需要等待
 
 
+def _broadcast_vote(table_id):
+    """广播投票进度"""
+    if table_id:
+        _background(broadcast_table, table_id)
+    else:
+        _background(broadcast_status)
+
+
 @app.route('/api/vote', methods=['POST'])
 def submit_vote():
     """提交投票接口（游戏方调用）"""
@@ -176,11 +936,17 @@ def submit_vote():
     if not voter_group or not target_group:
         return make_response({}, 400, '投票者和被投票者不能为空')
     
-    with game_lock:
-        success = game.submit_vote(voter_group, target_group)
+    room_game, room_lock, table_id = _room_for(voter_group)
+    with room_lock:
+        # 投票阶段的开始时刻，用于拆分网络耗时和思考耗时
+        vote_started = room_game.phase_deadline - VOTE_TIMEOUT if room_game.phase_deadline else None
+        success = room_game.submit_vote(voter_group, target_group)
         if success:
-            # 广播状态变化
-            socketio.start_background_task(broadcast_status)
+            if vote_started is not None:
+                elapsed = room_game.clock() - vote_started
+                connection_quality.record_submission(voter_group, 'vote', room_game.current_round,
+                                                     elapsed, elapsed > VOTE_TIMEOUT)
+            _broadcast_vote(table_id)
             return make_response({}, 200, '投票提交成功')
         else:
             return make_response({}, 400, '投票提交失败：游戏状态不正确、组名无效或不能投自己')
@@ -191,41 +957,239 @@ def process_voting():
     """处理投票结果接口（主持方调用）"""
     if not _require_admin():
         return _admin_forbidden_response()
-    with game_lock:
-        result = game.process_voting_result()
+    room = _admin_room()
+    if room is None:
+        return make_response({}, 404, '桌号不存在')
+    room_game, room_lock, table_id = room
+    with room_lock:
+        result = room_game.process_voting_result()
         if 'error' in result:
             return make_response(result, 400, result.get('error', '投票处理失败'))
-        # 广播状态变化
-        socketio.start_background_task(broadcast_status)
-        socketio.start_background_task(broadcast_game_state)
-        # 广播投票结果
-        socketio.emit('vote_result', result)
-        return make_response(result, 200, '投票结果已生成')
+        _announce_vote_result(room_game, table_id, result)
+    _record_table_result(table_id, result)
+    return make_response(result, 200, '投票结果已生成')
+
+
+def _announce_vote_result(room_game, table_id, result):
+    """计入投票图分析，广播状态变化和投票结果（需持有该游戏的锁）"""
+    _observe_votes(room_game, result)
+    _broadcast_room(table_id)
+    socketio.emit('vote_result', dict(result, table=table_id) if table_id else result)
+
+
+def _record_table_result(table_id, result):
+    """锦标赛的桌子本局结束时计入积分榜（不能持有桌子的锁）"""
+    if table_id and result.get('game_ended'):
+        with tournament.lock:
+            tournament.record_results()
+        _background(broadcast_tournament)
+
+
+@app.route('/api/analytics/votes', methods=['GET'])
+def get_vote_analytics():
+    """
+    投票图分析（主持方调用）
+    各组找卧底准确率和影响力，以及互投率、同票率最高的组对；?top= 指定组对数
+    """
+    if not _require_admin():
+        return _admin_forbidden_response()
+    top = request.args.get('top', TOP_PAIRS, type=int)
+    return make_response(vote_analytics.summary(top))
+
+
+@app.route('/api/history/descriptions', methods=['GET'])
+def search_descriptions():
+    """
+    检索历史描述（主持方调用）
+    ?q= 关键词（至少2个字），可按 group、word（描述者的词语）、pair（"卧底词/平民词"）、round 过滤，最新的在前
+    """
+    if not _require_admin():
+        return _admin_forbidden_response()
+    query = request.args.get('q', '').strip()
+    filters = {
+        'group': request.args.get('group') or None,
+        'word': request.args.get('word') or None,
+        'pair': request.args.get('pair') or None,
+        'round_num': request.args.get('round', type=int)
+    }
+    if len(query) == 1 or (not query and all(v is None for v in filters.values())):
+        return make_response({}, 400, '关键词至少2个字，或至少指定一个过滤条件')
+    limit = request.args.get('limit', SEARCH_LIMIT, type=int)
+    return make_response(description_index.search(query, limit=limit, **filters))
+
+
+@app.route('/api/history/copies', methods=['GET'])
+def find_copied_descriptions():
+    """不同组提交的相同描述（跨桌、跨局查抄袭，主持方调用）"""
+    if not _require_admin():
+        return _admin_forbidden_response()
+    min_length = request.args.get('min_length', COPY_MIN_LENGTH, type=int)
+    limit = request.args.get('limit', SEARCH_LIMIT, type=int)
+    return make_response({'copies': description_index.copies(min_length, limit)})
+
+
+@app.route('/api/traces/slow', methods=['GET'])
+def get_slow_traces():
+    """最近的慢请求追踪（最新的在前，主持方调用）"""
+    if not _require_admin():
+        return _admin_forbidden_response()
+    return make_response({'threshold_ms': trace_store.threshold_ms, 'traces': trace_store.list()})
+
+
+@app.route('/api/connection/quality', methods=['GET'])
+def get_connection_quality():
+    """
+    各组连接质量（主持方调用）
+    往返时延、抖动、丢包率、重连次数、HTTP 处理耗时、RTT 热力图，以及最近几次提交的网络/思考耗时分解
+    """
+    if not _require_admin():
+        return _admin_forbidden_response()
+    return make_response(connection_quality.summary())
+
+
+@app.route('/api/debug/resources', methods=['GET'])
+def get_debug_resources():
+    """
+    进程资源采样（主持方调用，soak.py 使用）
+    ?top= 返回相对基线增长最多的分配位置数，?exclude=a.py,b.py 不计入统计的文件，?baseline=1 以本次采样为新基线
+    """
+    if not _require_admin():
+        return _admin_forbidden_response()
+    exclude = [item for item in request.args.get('exclude', '').split(',') if item]
+    result = resource_probe.sample(request.args.get('top', TOP_ALLOCATIONS, type=int), exclude,
+                                   request.args.get('baseline') == '1')
+    # 只增不减的全局容器和 Socket.IO 会话
+    result['containers'] = {
+        'group_tokens': len(group_tokens),
+        'group_sids': len(group_sids),
+        'private_phases': len(private_phases),
+        'similarity_engines': len(similarity_engines),
+        'bot_attempts': len(bot_attempts),
+        'connection_links': len(connection_quality.links),
+        'socketio_sessions': len(socketio.server.eio.sockets),
+        'socketio_callbacks': sum(len(callbacks) for callbacks in socketio.server.manager.callbacks.values()),
+        'history_versions': len(game.history.versions()) if game.history is not None else 0,
+        'archived_games': len(game.archived_games),
+        'tournament_tables': len(tournament.tables)
+    }
+    return make_response(result)
 
 
 @app.route('/api/game/state', methods=['GET'])
 def get_game_state():
-    """获取游戏状态接口"""
+    """获取游戏状态接口（?version=N 查看第N个版本时的历史状态）"""
     if not _require_admin():
         return _admin_forbidden_response()
-    with game_lock:
-        state = game.get_game_state()
+    room = _admin_room()
+    if room is None:
+        return make_response({}, 404, '桌号不存在')
+    room_game, room_lock, table_id = room
+    version = request.args.get('version', type=int)
+    if version is not None:
+        if room_game.history is None:
+            return make_response({}, 400, '该游戏未开启历史版本')
+        state = room_game.history.get(version)
+        if state is None:
+            return make_response({}, 404, f'版本 {version} 不在保留范围内')
+        return make_response(thaw(state))
+    with room_lock:
+        state = room_game.get_game_state()
+        state['semantic_outliers'] = _similarity_engine(room_game, table_id).ranking()
         return make_response(state)
 
 
+@app.route('/api/game/versions', methods=['GET'])
+def get_game_versions():
+    """保留范围内的历史版本列表（版本号、命令、状态、回合），配合 /api/game/state?version= 使用"""
+    if not _require_admin():
+        return _admin_forbidden_response()
+    room = _admin_room()
+    if room is None:
+        return make_response({}, 404, '桌号不存在')
+    room_game = room[0]
+    if room_game.history is None:
+        return make_response({}, 400, '该游戏未开启历史版本')
+    return make_response({'current': room_game.version, 'versions': room_game.history.versions()})
+
+
+@app.route('/api/game/export', methods=['GET'])
+def export_game():
+    """以NDJSON流导出整场比赛记录（主持方调用）"""
+    if not _require_admin():
+        return _admin_forbidden_response()
+    room = _admin_room()
+    if room is None:
+        return make_response({}, 404, '桌号不存在')
+    room_game, room_lock, _ = room
+
+    def generate():
+        for event in _export_events(room_game, room_lock):
+            yield json.dumps(event, ensure_ascii=False) + '\n'
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
+
+@app.route('/api/game/record', methods=['GET'])
+def export_record():
+    """导出当前一局的命令记录（主持方调用，用 replay.py 离线回放）"""
+    if not _require_admin():
+        return _admin_forbidden_response()
+    room = _admin_room()
+    if room is None:
+        return make_response({}, 404, '桌号不存在')
+    room_game, room_lock, _ = room
+    if room_game.recorder is None:
+        return make_response({}, 404, '该游戏未开启命令记录')
+    with room_lock:
+        lines = list(room_game.recorder.iter_ndjson())
+    return Response(lines, mimetype='application/x-ndjson')
+
+
+def _add_poll_hint(data):
+    """
+    给 HTTP 轮询响应加上建议的下次轮询间隔 next_poll_ms（客户端另加随机抖动）
+    按阶段、距最近截止时间的远近和当前轮询负载给出；只属于 HTTP 轮询，不进入游戏状态和推送
+    :param data: get_public_status 或 get_group_view 的结果（含 status、截止时间和 server_time）
+    """
+    deadlines = [d for d in (data.get('phase_deadline'), data.get('speaker_deadline')) if d]
+    data['next_poll_ms'] = next_poll_ms(data['status'], min(deadlines) if deadlines else None,
+                                        data['server_time'])
+
+
 @app.route('/api/status', methods=['GET'])
 def public_status():
-    """游戏方公共状态接口"""
-    with game_lock:
-        status = game.get_public_status()
-        return make_response(status)
+    """游戏方公共状态接口（锦标赛中传 ?group_name= 获取所在桌子的状态）"""
+    record_poll()  # 计入轮询负载（next_poll_ms 据此放慢）
+    room_game, room_lock, table_id = _room_for(request.args.get('group_name', '').strip())
+    with room_lock:
+        status = room_game.get_public_status()
+    _add_poll_hint(status)
+    if table_id:
+        status['table'] = table_id
+    return make_response(status)
+
+
+@app.route('/api/stream', methods=['GET'])
+def status_stream():
+    """观众端SSE状态推送（支持 Last-Event-ID 断线续传和心跳）"""
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    last_id = int(last_id) if last_id and last_id.isdigit() else None
+    if status_feed.last_id == 0:
+        # 还没有任何推送时先发布一次当前状态
+        with game_lock:
+            status_feed.publish(game.get_public_status())
+    return Response(status_feed.subscribe(last_id), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
 
 
 @app.route('/api/result', methods=['GET'])
 def public_result():
     """最近一次投票结果"""
-    with game_lock:
-        result = game.get_last_result()
+    room_game, room_lock, _ = _room_for(request.args.get('group_name', '').strip())
+    with room_lock:
+        result = room_game.get_last_result()
         if not result:
             return make_response({}, 404, '当前暂无投票结果')
         return make_response(result)
@@ -239,8 +1203,9 @@ def get_word():
     if not group_name:
         return make_response({}, 400, '组名不能为空')
     
-    with game_lock:
-        word = game.get_group_word(group_name)
+    room_game, room_lock, _ = _room_for(group_name)
+    with room_lock:
+        word = room_game.get_group_word(group_name)
         if word:
             return make_response({'word': word})
         else:
@@ -251,17 +1216,18 @@ def get_word():
 def get_descriptions():
     """获取当前回合的描述列表（游戏方调用）"""
     round_num = request.args.get('round', type=int)
+    room_game, room_lock, _ = _room_for(request.args.get('group_name', '').strip())
     
-    with game_lock:
+    with room_lock:
         if round_num is None:
-            round_num = game.current_round
+            round_num = room_game.current_round
         
-        descriptions = game.descriptions.get(round_num, [])
+        descriptions = room_game.descriptions.get(round_num, [])
         result = []
         for desc in descriptions:
             result.append({
-                'group': desc['group'],
-                'description': desc['description']
+                'group': desc.group,
+                'description': desc.description
             })
         
         return make_response({
@@ -271,16 +1237,38 @@ def get_descriptions():
         })
 
 
+@app.route('/api/me', methods=['GET'])
+def get_my_view():
+    """
+    游戏方"我的视图"接口：一次请求、一次加锁返回自己的词语、公开状态、
+    是否轮到发言、能否投票、剩余时间和本回合描述（代替分别轮询 status/word/descriptions）
+    """
+    group_name = request.args.get('group_name', '').strip()
+    if not group_name:
+        return make_response({}, 400, '组名不能为空')
+
+    record_poll()
+    room_game, room_lock, table_id = _room_for(group_name)
+    with room_lock:
+        view = room_game.get_group_view(group_name)
+    if view is None:
+        return make_response({}, 404, '该组未注册')
+    _add_poll_hint(view)
+    if table_id:
+        view['table'] = table_id
+    return make_response(view)
+
+
 @app.route('/api/game/reset', methods=['POST'])
 def reset_game():
     """重置游戏接口（主持方调用）"""
     if not _require_admin():
         return _admin_forbidden_response()
     with game_lock:
-        game.reset_game()
+        _reset_game()
         # 广播状态变化
-        socketio.start_background_task(broadcast_status)
-        socketio.start_background_task(broadcast_game_state)
+        _background(broadcast_status)
+        _background(broadcast_game_state)
         return make_response({}, 200, '游戏已重置')
 
 
@@ -313,7 +1301,7 @@ def get_groups():
         for name, info in game.groups.items():
             groups_info.append({
                 'name': name,
-                'registered_time': info['registered_time'],
+                'registered_time': format_time(info.registered_at),
                 'eliminated': name in game.eliminated_groups
             })
         return make_response({
@@ -322,23 +1310,238 @@ def get_groups():
         })
 
 
+@app.route('/api/tournament/register', methods=['POST'])
+def tournament_register():
+    """锦标赛报名接口（游戏方调用，不受单局5组限制）"""
+    data = request.json or {}
+    group_name = data.get('group_name') or data.get('group_id', '')
+    group_name = group_name.strip() if isinstance(group_name, str) else ''
+
+    if not group_name:
+        return make_response({}, 400, '组名不能为空')
+
+    with tournament.lock:
+        success = tournament.add_team(group_name)
+        total = len(tournament.teams)
+    if not success:
+        return make_response({}, 400, '报名失败：组名已存在')
+    _background(broadcast_tournament)
+    return make_response({
+        'group_name': group_name,
+        'total_teams': total,
+        'token': _issue_token(group_name)  # 加入私有推送频道的凭证
+    }, 200, '报名成功')
+
+
+@app.route('/api/tournament/seat', methods=['POST'])
+def tournament_seat():
+    """编排下一轮座位（主持方调用）"""
+    if not _require_admin():
+        return _admin_forbidden_response()
+    with tournament.lock:
+        seating = tournament.seat_next_round()
+        round_number = tournament.round_number
+    if not seating:
+        return make_response({}, 400, '无法编排：报名队伍不足3组或上一轮还有桌子未结束')
+    _background(broadcast_tournament)
+    return make_response({
+        'round': round_number,
+        'tables': seating
+    }, 200, '座位已编排')
+
+
+@app.route('/api/tournament/start', methods=['POST'])
+def tournament_start():
+    """所有桌子同时开局（主持方调用）"""
+    if not _require_admin():
+        return _admin_forbidden_response()
+    data = request.json or {}
+    undercover_word = data.get('undercover_word', '').strip()
+    civilian_word = data.get('civilian_word', '').strip()
+
+    if not undercover_word or not civilian_word:
+        return make_response({}, 400, '词语不能为空')
+
+    with tournament.lock:
+        assigned = tournament.start_tables(undercover_word, civilian_word)
+    if not assigned:
+        return make_response({}, 400, '无法开局：没有等待开局的桌子')
+    for table_id in assigned:
+        _background(broadcast_table, table_id)
+    _background(broadcast_tournament)
+    return make_response({'undercover_groups': assigned}, 200, '各桌已开局')
+
+
+@app.route('/api/tournament/standings', methods=['GET'])
+def tournament_standings():
+    """锦标赛积分榜和各桌概况"""
+    with tournament.lock:
+        return make_response({
+            'round': tournament.round_number,
+            'standings': tournament.get_standings(),
+            'tables': tournament.get_tables_summary()
+        })
+
+
+@app.route('/api/tournament/reset', methods=['POST'])
+def tournament_reset():
+    """重置锦标赛（主持方调用）"""
+    if not _require_admin():
+        return _admin_forbidden_response()
+    with tournament.lock:
+        team_names = list(tournament.teams)
+        tournament.reset()
+        _revoke_tokens(team_names)
+    _background(broadcast_tournament)
+    return make_response({}, 200, '锦标赛已重置')
+
+
+def _check_group_token(data):
+    """校验请求中的组名和凭证，返回组名（无效时为None）"""
+    group_name = data.get('group_name')
+    group_name = group_name.strip() if isinstance(group_name, str) else ''
+    token = data.get('token') if isinstance(data.get('token'), str) else ''
+    expected = group_tokens.get(group_name)
+    if not expected or not hmac.compare_digest(expected, token):
+        return None
+    return group_name
+
+
+def _bots_disabled_response():
+    return make_response({}, 403, '服务器未开启托管机器人（HOSTED_BOTS=1）')
+
+
+@app.route('/api/bot/upload', methods=['POST'])
+def upload_bot():
+    """
+    上传（或替换）某组的托管策略（主持方调用，需 X-Admin-Token；服务器需以 HOSTED_BOTS=1 启动）
+    请求体 {group_name, source}，source 为实现 describe(word, history) 和 vote(status) 的Python源码
+    """
+    if not HOSTED_BOTS:
+        return _bots_disabled_response()
+    if not _require_admin():
+        return _admin_forbidden_response()
+    data = request.json or {}
+    group_name = data.get('group_name')
+    group_name = group_name.strip() if isinstance(group_name, str) else ''
+    if group_name not in group_tokens:
+        return make_response({}, 404, '该组未注册')
+    source = data.get('source')
+    if not isinstance(source, str):
+        return make_response({}, 400, 'source必须是策略源码字符串')
+    success, message, digest = bots.upload(group_name, source)
+    if not success:
+        return make_response({}, 400, message)
+    _, _, table_id = _room_for(group_name)
+    _kick_bots(table_id)
+    return make_response({'group': group_name, 'digest': digest}, 200, message)
+
+
+@app.route('/api/bot/remove', methods=['POST'])
+def remove_bot():
+    """撤下托管策略，恢复由游戏方自己提交（游戏方凭证或主持方 X-Admin-Token）"""
+    if not HOSTED_BOTS:
+        return _bots_disabled_response()
+    data = request.json or {}
+    if _require_admin():
+        group_name = data.get('group_name')
+        group_name = group_name.strip() if isinstance(group_name, str) else ''
+    else:
+        group_name = _check_group_token(data)
+        if group_name is None:
+            return make_response({}, 403, '组名或凭证无效')
+    if not bots.remove(group_name):
+        return make_response({}, 404, '该组没有托管策略')
+    return make_response({'group': group_name}, 200, '托管策略已撤下')
+
+
+@app.route('/api/bots', methods=['GET'])
+def get_bots():
+    """各组托管策略的调用次数、失败次数、超时次数和平均耗时（主持方调用）"""
+    if not _require_admin():
+        return _admin_forbidden_response()
+    return make_response({'enabled': HOSTED_BOTS, 'bots': bots.stats()})
+
+
 # WebSocket事件处理
 @socketio.on('connect')
 def handle_connect():
     """客户端连接时发送当前状态"""
+    _record_socket('connect')
     with game_lock:
         status = game.get_public_status()
     emit('status_update', status)
 
 
+@socketio.on('join_host')
+def handle_join_host(data):
+    """主持方（前端中继）携带主持方令牌加入主持方频道，接收完整游戏状态和违禁词通知"""
+    token = data.get('token') if isinstance(data, dict) and isinstance(data.get('token'), str) else ''
+    if not hmac.compare_digest(ADMIN_TOKEN, token):
+        emit('join_error', {'message': '主持方令牌无效'})
+        return
+    join_room(HOST_ROOM)
+    emit('host_joined', {})
+
+
+@socketio.on('join_group')
+def handle_join_group(data):
+    """游戏方携带注册时下发的凭证加入本组私有频道，加入后立即补发当前视图和阶段事件"""
+    _record_socket('join_group', data)
+    group_name = _check_group_token(data if isinstance(data, dict) else {})
+    if group_name is None:
+        emit('join_error', {'message': '组名或凭证无效'})
+        return
+
+    join_room(_group_room(group_name))
+    previous = group_sids.get(request.sid)
+    if previous is not None:
+        connection_quality.left(previous)
+    group_sids[request.sid] = group_name
+    connection_quality.joined(group_name)
+    room_game, room_lock, table_id = _room_for(group_name)
+    with room_lock:
+        view = room_game.get_group_view(group_name)
+        if view is None:
+            events = []
+        else:
+            if table_id:
+                view['table'] = table_id
+            events = [('my_view', view)] + _phase_events(room_game, group_name, table_id, view, include_word=True)
+    emit('joined', {'group': group_name, 'table': table_id})
+    for event, payload in events:
+        emit(event, payload)
+
+
+@socketio.on('time_sync')
+def handle_time_sync(data):
+    """
+    时钟同步握手（通过 ack 回复）
+    客户端记下发送时刻 t0 和收到回复时刻 t1，时钟偏差 ≈ server_time - (t0 + t1) / 2
+    """
+    _record_socket('time_sync', data)
+    client_time = data.get('client_time') if isinstance(data, dict) else None
+    return {'client_time': client_time, 'server_time': monotonic_clock()}
+
+
 @socketio.on('request_status')
 def handle_request_status():
     """客户端请求状态更新"""
+    _record_socket('request_status')
     with game_lock:
         status = game.get_public_status()
     emit('status_update', status)
 
 
+@socketio.on('disconnect')
+def handle_disconnect(*args):
+    """客户端断开（流量记录；已加入私有频道的连接计入该组的断线次数）"""
+    _record_socket('disconnect')
+    group_name = group_sids.pop(request.sid, None)
+    if group_name is not None:
+        connection_quality.left(group_name)
+
+
 if __name__ == '__main__':
     local_ip = get_local_ip()
     print(f"=" * 50)
@@ -351,7 +1554,13 @@ if __name__ == '__main__':
     print(f"=" * 50)
     print(f"请确保游戏方能够访问上述IP地址")
     print(f"=" * 50)
+    if not PINYIN_AVAILABLE:
+        print(f"警告：未安装 pypinyin，违禁词检测不会拦截拼音写法（pip install -r requirements.txt）")
+    
+    socketio.start_background_task(hibernation_loop)
+    socketio.start_background_task(latency_loop)
     
-    # 使用 socketio.run 替代 app.run
-    socketio.run(app, host='0.0.0.0', port=5000, debug=True, allow_unsafe_werkzeug=True)
+    # 使用 socketio.run 替代 app.run（BACKEND_DEBUG=0 关闭调试模式和自动重载，长时间运行时使用）
+    socketio.run(app, host='0.0.0.0', port=5000, debug=os.environ.get('BACKEND_DEBUG', '1') != '0',
+                 allow_unsafe_werkzeug=True)
 
@@ -0,0 +1,73 @@
+"""
+房间内存基准
+用 tracemalloc 统计每个房间（一局完整游戏）常驻内存的字节数
+
+用法：
+    python bench_memory.py            # 默认1000个房间
+    python bench_memory.py --rooms 10000 --record
+"""
+import argparse
+import gc
+import tracemalloc
+
+from game_logic import GameLogic
+
+
+GROUPS = ["望月队", "青木队", "星火队", "山海队", "流云队"]
+
+
+def play_room(game: GameLogic, room_index: int):
+    """在一个房间里跑完整局游戏：注册、开局、若干回合描述和投票、一次异常上报"""
+    for name in GROUPS:
+        game.register_group(name)
+    game.start_game("向日葵", "太阳花", undercover_group=GROUPS[room_index % len(GROUPS)])
+    while True:
+        order = game.start_round()
+        if not order:
+            break
+        for name in order:
+            game.submit_description(name, f"{name}觉得它是一种很常见的东西，第{game.current_round}轮")
+        for i, name in enumerate(order):
+            game.submit_vote(name, order[(i + 1) % len(order)] if game.current_round == 1 else order[0])
+        result = game.process_voting_result()
+        if result.get("game_ended") or game.current_round > 4:
+            break
+    game.add_report(GROUPS[0], "network", "描述时断线")
+
+
+def measure(rooms: int, record: bool) -> float:
+    """
+    :return: 每个房间的平均字节数
+    """
+    recorder_cls = None
+    if record:
+        from replay import CommandRecorder
+        recorder_cls = CommandRecorder
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    games = []
+    for i in range(rooms):
+        game = GameLogic(seed=i, recorder=recorder_cls() if recorder_cls else None)
+        play_room(game, i)
+        games.append(game)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / rooms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="统计每个房间的常驻内存")
+    parser.add_argument("--rooms", type=int, default=1000, help="房间数")
+    parser.add_argument("--record", action="store_true", help="同时开启命令记录")
+    args = parser.parse_args()
+
+    per_room = measure(args.rooms, args.record)
+    print(f"{args.rooms} 个房间，平均每个房间 {per_room:,.0f} 字节"
+          f"（约 {per_room * 10000 / 1024 / 1024:,.1f} MB / 万房间）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+轮询尖峰基准
+模拟大量同时启动的轮询客户端，主持方开始回合后统计 /api/status 的峰值请求速率，
+对比旧的固定间隔轮询（每2秒一次）和按服务器 next_poll_ms 加随机抖动的轮询
+
+用法（需先启动 backend.py，基准会重置当前游戏）：
+    python bench_polling.py                  # 默认200个客户端，两种方式各测一次
+    python bench_polling.py --clients 500 --mode hinted
+"""
+import argparse
+import os
+import random
+import threading
+import time
+from statistics import median
+from typing import Dict, List, Optional
+
+import requests
+
+from polling import next_delay, poll_hint
+
+
+GROUPS = ["望月队", "青木队", "星火队", "山海队"]
+FIXED_INTERVAL = 2.0  # 旧客户端的固定轮询间隔（秒）
+BUCKET_SECONDS = 0.1  # 统计峰值速率的时间片
+
+
+class Poller(threading.Thread):
+    """一个轮询 /api/status 的客户端"""
+
+    def __init__(self, url: str, mode: str, stop: threading.Event, start_gate: threading.Event, seed: int):
+        super().__init__(daemon=True)
+        self.url = url
+        self.mode = mode
+        self.stop = stop
+        self.start_gate = start_gate
+        self.rng = random.Random(seed)
+        self.http = requests.Session()
+        self.sent: List[float] = []  # 每个请求的发出时刻
+        self.saw_describing: Optional[float] = None  # 第一次看到描述阶段的时刻
+
+    def run(self):
+        self.start_gate.wait()
+        failures = 0
+        while not self.stop.is_set():
+            self.sent.append(time.monotonic())
+            hint = None
+            try:
+                status = self.http.get(self.url + "/api/status", timeout=10).json().get("data") or {}
+                failures = 0
+                hint = poll_hint(status)
+                if status.get("status") == "describing" and self.saw_describing is None:
+                    self.saw_describing = time.monotonic()
+            except (requests.RequestException, ValueError):
+                failures += 1
+            if self.mode == "fixed":
+                delay = FIXED_INTERVAL
+            else:
+                delay = next_delay(hint, failures, self.rng)
+            self.stop.wait(delay)
+
+
+def prepare_game(url: str, admin: Dict[str, str]):
+    """重置游戏，注册各组并开局（停在等待主持方开始回合的状态）"""
+    requests.post(url + "/api/game/reset", headers=admin, timeout=10)
+    for name in GROUPS:
+        requests.post(url + "/api/register", json={"group_name": name}, timeout=10)
+    response = requests.post(url + "/api/game/start", headers=admin, timeout=10,
+                             json={"undercover_word": "向日葵", "civilian_word": "太阳花"})
+    if response.json().get("code") != 200:
+        raise SystemExit(f"开局失败：{response.json().get('message')}")
+
+
+def peak_rate(times: List[float], start: float, end: float) -> float:
+    """[start, end) 内按 BUCKET_SECONDS 分桶的最大请求速率（次/秒）"""
+    buckets: Dict[int, int] = {}
+    for t in times:
+        if start <= t < end:
+            key = int((t - start) / BUCKET_SECONDS)
+            buckets[key] = buckets.get(key, 0) + 1
+    return max(buckets.values(), default=0) / BUCKET_SECONDS
+
+
+def run(url: str, admin: Dict[str, str], mode: str, clients: int, before: float, after: float) -> Dict:
+    """
+    所有客户端同时开始轮询，before 秒后主持方开始回合，再观察 after 秒
+    :return: {mode, peak_rps, mean_rps, requests, reaction_median, reaction_max}
+    """
+    prepare_game(url, admin)
+    stop, start_gate = threading.Event(), threading.Event()
+    pollers = [Poller(url, mode, stop, start_gate, seed) for seed in range(clients)]
+    for poller in pollers:
+        poller.start()
+    start_gate.set()
+    time.sleep(before)
+    transition = time.monotonic()
+    requests.post(url + "/api/game/round/start", headers=admin, timeout=10)
+    time.sleep(after)
+    stop.set()
+    for poller in pollers:
+        poller.join()
+
+    times = [t for poller in pollers for t in poller.sent]
+    reactions = [poller.saw_describing - transition for poller in pollers if poller.saw_describing]
+    in_window = [t for t in times if transition <= t < transition + after]
+    return {
+        "mode": mode,
+        "peak_rps": peak_rate(times, transition, transition + after),
+        "mean_rps": len(in_window) / after,
+        "requests": len(times),
+        "reaction_median": median(reactions) if reactions else None,
+        "reaction_max": max(reactions) if reactions else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="统计阶段切换时 /api/status 的峰值请求速率")
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="后端地址")
+    parser.add_argument("--admin-token", default=os.environ.get("ADMIN_TOKEN", "host-secret"), help="主持方令牌")
+    parser.add_argument("--clients", type=int, default=200, help="轮询客户端数")
+    parser.add_argument("--mode", choices=["fixed", "hinted", "both"], default="both",
+                        help="fixed 固定每2秒 / hinted 按 next_poll_ms 加抖动")
+    parser.add_argument("--before", type=float, default=6, help="开始轮询后多久开始回合（秒）")
+    parser.add_argument("--after", type=float, default=10, help="开始回合后观察多久（秒）")
+    args = parser.parse_args()
+
+    admin = {"X-Admin-Token": args.admin_token}
+    modes = ["fixed", "hinted"] if args.mode == "both" else [args.mode]
+    print(f"{args.clients} 个客户端，开始回合后观察 {args.after:g} 秒")
+    for mode in modes:
+        result = run(args.url, admin, mode, args.clients, args.before, args.after)
+        reaction = "—" if result["reaction_median"] is None else \
+            f"{result['reaction_median']:.1f}秒（最慢 {result['reaction_max']:.1f}秒）"
+        print(f"  {mode:>6}：峰值 {result['peak_rps']:,.0f} 次/秒，平均 {result['mean_rps']:,.1f} 次/秒，"
+              f"看到新阶段的延迟中位数 {reaction}")
+    requests.post(args.url + "/api/game/reset", headers=admin, timeout=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+主持方面板渲染基准（无需浏览器）
+从 frontend.py 的 HTML_TEMPLATE 中取出面板脚本，在 Node.js 里配一个最小的 DOM 替身运行，
+按真实游戏过程逐条命令生成 game_state_update 推送，统计每次渲染的脚本耗时和 DOM 变更次数：
+- 脚本耗时与面板里的 RENDER_BUDGET_MS 比较（替身不做排版和绘制，浏览器中的排版开销用变更次数衡量）
+- 状态未变化的重复推送不应产生任何 DOM 变更
+
+用法（需要 node）：
+    python bench_render.py                   # 默认3局系列赛、每局40回合
+    python bench_render.py --games 5 --rounds 80
+退出码：超出预算或重复推送产生了变更时为1，便于接入 CI
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List
+
+from frontend import HTML_TEMPLATE
+from game_logic import GameLogic
+
+
+GROUPS = ["望月队", "青木队", "星火队", "山海队", "流云队"]
+WORDS = [("向日葵", "太阳花"), ("牛奶", "豆浆"), ("眼镜", "墨镜")]
+
+# 最小 DOM 替身：节点用双向链表保存子节点，只实现面板脚本用到的接口，并统计变更次数
+DOM_SHIM = r"""
+const vm = require('vm');
+const fs = require('fs');
+
+const mutations = {created: 0, inserted: 0, replaced: 0, removed: 0, html: 0};
+
+class Element {
+    constructor(tagName) {
+        this.tagName = tagName;
+        this.parentNode = null;
+        this.firstChild = null;
+        this.lastChild = null;
+        this.nextSibling = null;
+        this.previousSibling = null;
+        this.style = {};
+        this.value = '';
+        this.textContent = '';
+        this.outerHTML = '';
+        this.classList = {add() {}, remove() {}};
+        this.content = null;
+    }
+    get firstElementChild() { return this.firstChild; }
+    set innerHTML(html) {
+        while (this.firstChild) this._unlink(this.firstChild);
+        mutations.html++;
+        if (this.tagName === 'template') {
+            // 模板内容只需一个代表该段标记的节点
+            this.content = new Element('fragment');
+            if (html) {
+                const node = new Element('div');
+                node.outerHTML = html;
+                this.content._link(node, null);
+                mutations.created++;
+            }
+        }
+    }
+    _unlink(node) {
+        if (node.previousSibling) node.previousSibling.nextSibling = node.nextSibling;
+        else this.firstChild = node.nextSibling;
+        if (node.nextSibling) node.nextSibling.previousSibling = node.previousSibling;
+        else this.lastChild = node.previousSibling;
+        node.parentNode = node.nextSibling = node.previousSibling = null;
+    }
+    _link(node, before) {
+        if (node.parentNode) node.parentNode._unlink(node);
+        node.parentNode = this;
+        node.nextSibling = before;
+        node.previousSibling = before ? before.previousSibling : this.lastChild;
+        if (node.previousSibling) node.previousSibling.nextSibling = node;
+        else this.firstChild = node;
+        if (before) before.previousSibling = node;
+        else this.lastChild = node;
+    }
+    insertBefore(node, before) { mutations.inserted++; this._link(node, before || null); return node; }
+    appendChild(node) { return this.insertBefore(node, null); }
+    replaceChild(node, old) { mutations.replaced++; this._link(node, old); this._unlink(old); return old; }
+    remove() { if (this.parentNode) { mutations.removed++; this.parentNode._unlink(this); } }
+    addEventListener() {}
+}
+
+const elements = new Map();
+const document = {
+    getElementById(id) {
+        if (!elements.has(id)) elements.set(id, new Element('div'));
+        return elements.get(id);
+    },
+    createElement(tag) { return new Element(tag); }
+};
+const pending = () => new Promise(() => {});
+const context = {
+    document, console: {log() {}, warn() {}, error: console.error},
+    performance, Date, Map, Set, Math, JSON, Object, String, Promise, Infinity,
+    io: () => ({on() {}, emit() {}}),
+    fetch: pending, alert() {}, confirm: () => false,
+    setInterval() {}, setTimeout() {}, clearTimeout() {}
+};
+context.window = context;
+vm.createContext(context);
+vm.runInContext(fs.readFileSync(process.argv[2], 'utf8'), context);
+
+function snapshot() { return Object.values(mutations).reduce((a, b) => a + b, 0); }
+
+const states = JSON.parse(fs.readFileSync(process.argv[3], 'utf8'));
+const result = {pushes: [], repeats: []};
+for (const state of states) {
+    // 每条命令后的推送，紧接着再推一次同样的状态（重连补发、多个广播合并前的重复推送）
+    for (const [bucket, data] of [[result.pushes, state], [result.repeats, JSON.parse(JSON.stringify(state))]]) {
+        const before = snapshot();
+        context.renderGameState(data);
+        bucket.push({ms: context.renderStats.game_state.last, mutations: snapshot() - before});
+    }
+}
+process.stdout.write(JSON.stringify(result));
+"""
+
+
+def dashboard_script() -> str:
+    """HTML_TEMPLATE 中的面板内联脚本"""
+    scripts = re.findall(r"<script>(.*?)</script>", HTML_TEMPLATE, re.S)
+    if not scripts:
+        raise SystemExit("HTML_TEMPLATE 中没有内联脚本")
+    return scripts[-1]
+
+
+def render_budget(script: str) -> float:
+    """面板脚本中的渲染预算（毫秒）"""
+    match = re.search(r"const RENDER_BUDGET_MS = ([\d.]+);", script)
+    if not match:
+        raise SystemExit("面板脚本中没有 RENDER_BUDGET_MS")
+    return float(match.group(1))
+
+
+def game_states(games: int, rounds: int) -> List[Dict]:
+    """
+    跑一组系列赛，每条命令执行后取一次完整状态（即主持方面板收到的 game_state_update）
+    靠平票拖长每局的回合数，最后一轮投出卧底结束本局
+    """
+    game = GameLogic(seed=0)
+    states = []
+
+    def push():
+        states.append(json.loads(json.dumps(game.get_game_state(), ensure_ascii=False)))
+
+    for name in GROUPS:
+        game.register_group(name)
+        push()
+    for number in range(games):
+        undercover_word, civilian_word = WORDS[number % len(WORDS)]
+        if number == 0:
+            game.start_game(undercover_word, civilian_word)
+        else:
+            game.new_game(undercover_word, civilian_word)
+        push()
+        for round_index in range(rounds):
+            order = game.start_round()
+            push()
+            for i, name in enumerate(order):
+                # 偶尔直接说出词语本体，产生违禁词标记
+                text = civilian_word if i == 0 and round_index % 7 == 0 else f"{name}第{round_index + 1}轮的描述，常见的东西"
+                game.submit_description(name, text)
+                push()
+            last = round_index == rounds - 1
+            targets = [game.undercover_group] * len(order) if last else \
+                [order[1], order[0], order[0], order[1], order[2]]
+            for name, target in zip(order, targets):
+                game.submit_vote(name, target if target != name else order[(order.index(name) + 1) % len(order)])
+                push()
+            game.process_voting_result()
+            push()
+            if round_index % 5 == 0:
+                game.add_report(order[0], "network", f"第{round_index + 1}轮描述时断线")
+                push()
+    return states
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在 Node.js 中统计主持方面板的渲染耗时和 DOM 变更次数")
+    parser.add_argument("--games", type=int, default=3, help="系列赛局数")
+    parser.add_argument("--rounds", type=int, default=40, help="每局回合数")
+    args = parser.parse_args()
+
+    node = shutil.which("node")
+    if node is None:
+        raise SystemExit("未找到 node，无法运行渲染基准")
+    script = dashboard_script()
+    budget = render_budget(script)
+    states = game_states(args.games, args.rounds)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        paths = {}
+        for name, content in (("shim.js", DOM_SHIM), ("dashboard.js", script),
+                              ("states.json", json.dumps(states, ensure_ascii=False))):
+            paths[name] = os.path.join(workdir, name)
+            with open(paths[name], "w", encoding="utf-8") as f:
+                f.write(content)
+        completed = subprocess.run([node, paths["shim.js"], paths["dashboard.js"], paths["states.json"]],
+                                   capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise SystemExit(f"node 执行失败：\n{completed.stderr}")
+    result = json.loads(completed.stdout)
+
+    pushes, repeats = result["pushes"], result["repeats"]
+    times = [p["ms"] for p in pushes[1:]]  # 第一次渲染包含 JIT 预热，单独报告
+    p95, worst = percentile(times, 0.95), max(times, default=0.0)
+    repeat_mutations = sum(r["mutations"] for r in repeats)
+    print(f"{len(pushes)} 次推送（{args.games} 局 × {args.rounds} 回合），预算 {budget:g}ms")
+    print(f"  首次渲染：{pushes[0]['ms']:.2f}ms，{pushes[0]['mutations']} 次 DOM 变更")
+    print(f"  后续渲染：中位数 {percentile(times, 0.5):.2f}ms，p95 {p95:.2f}ms，最慢 {worst:.2f}ms")
+    print(f"  每次推送的 DOM 变更：中位数 {percentile([p['mutations'] for p in pushes[1:]], 0.5):.0f}，"
+          f"最多 {max((p['mutations'] for p in pushes[1:]), default=0)}")
+    print(f"  重复推送：p95 {percentile([r['ms'] for r in repeats], 0.95):.2f}ms，DOM 变更共 {repeat_mutations} 次")
+
+    failed = []
+    if p95 > budget:
+        failed.append(f"p95 渲染耗时 {p95:.2f}ms 超出预算 {budget:g}ms")
+    if repeat_mutations:
+        failed.append(f"状态未变化的推送产生了 {repeat_mutations} 次 DOM 变更")
+    for message in failed:
+        print(f"✗ {message}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+托管机器人沙箱启动器
+由 bot_sandbox.BotPool 以独立进程启动（不在多线程的服务器进程里 fork 后执行 preexec_fn），
+单线程地完成以下步骤后 exec 成策略子进程：
+
+1. 设置内存、CPU 时间和可写文件大小限制，脱离服务器的进程组
+2. 隔离模式下（Linux，需要 root 或 CAP_SYS_ADMIN）：
+   - 新建网络命名空间：只有未启用的回环网卡，无法联网，也无法连到服务器
+   - 新建挂载命名空间：根目录换成只读的 tmpfs，只挂入运行 Python 所需的系统目录（只读）和 /dev/null，
+     服务器代码、数据和其他用户的文件都不可见；工作目录 /work 为空且只读
+   - 切换到独立的低权限用户（默认 nobody），并禁止再提权（PR_SET_NO_NEW_PRIVS），无法向服务器进程发信号
+3. exec 策略子进程（子进程启动后再自行禁止创建子进程：先设置的话切换用户后 exec 会失败）
+
+无法建立隔离环境时按子进程协议回复一行错误后退出，上传检查会返回该错误
+
+用法（由 BotPool 调用）：
+    python -I bot_launcher.py <内存MB> <CPU秒数> <用户ID|none> <策略子进程脚本>
+"""
+import ctypes
+import json
+import os
+import resource
+import sys
+
+
+SANDBOX_ROOT = "/tmp"  # 新挂载命名空间中覆盖为 tmpfs 作为新的根目录（不影响服务器看到的 /tmp）
+SYSTEM_DIRS = ("/usr", "/lib", "/lib64", "/lib32", "/bin", "/sbin")  # 只读挂入的系统目录
+WORK_DIR = "/work"
+
+CLONE_NEWNS = 0x00020000
+CLONE_NEWNET = 0x40000000
+MS_RDONLY = 0x1
+MS_NOSUID = 0x2
+MS_NODEV = 0x4
+MS_REMOUNT = 0x20
+MS_BIND = 0x1000
+MS_REC = 0x4000
+MS_PRIVATE = 0x40000
+PR_SET_NO_NEW_PRIVS = 38
+
+libc = ctypes.CDLL(None, use_errno=True)  # 本进程已加载的 C 库
+
+
+def _check(result: int, action: str):
+    if result != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, f"{action}：{os.strerror(errno)}")
+
+
+def _mount(source, target: str, fstype, flags: int, action: str):
+    _check(libc.mount(source and source.encode(), target.encode(), fstype and fstype.encode(), flags, None), action)
+
+
+def _bind_readonly(source: str, root: str):
+    """把 source 只读挂到新根目录下的同一路径（顶层符号链接如 /lib -> usr/lib 原样复制）"""
+    target = root + source
+    if os.path.islink(source) and os.path.dirname(source) == "/":
+        if not os.path.lexists(target):
+            os.symlink(os.readlink(source), target)
+        return
+    if os.path.isdir(source):
+        os.makedirs(target, exist_ok=True)
+    else:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        open(target, "a").close()
+    _mount(source, target, None, MS_BIND | MS_REC, f"挂载 {source}")
+    _mount(None, target, None, MS_BIND | MS_REMOUNT | MS_RDONLY | MS_NOSUID, f"只读挂载 {source}")
+
+
+def _isolate(uid: int, worker: str):
+    """新建网络和挂载命名空间，切换到只读的最小根目录并降权"""
+    _check(libc.unshare(CLONE_NEWNET | CLONE_NEWNS), "新建命名空间")
+    _mount(None, "/", None, MS_REC | MS_PRIVATE, "隔离挂载点")
+    _mount("tmpfs", SANDBOX_ROOT, "tmpfs", MS_NOSUID | MS_NODEV, "挂载根目录")
+    python_dirs = {os.path.realpath(sys.base_prefix), os.path.realpath(sys.prefix)}
+    for path in [p for p in SYSTEM_DIRS if os.path.lexists(p)] + sorted(python_dirs) + [worker]:
+        if not any(path.startswith(d + "/") for d in SYSTEM_DIRS if not os.path.islink(d)):
+            _bind_readonly(path, SANDBOX_ROOT)
+    os.makedirs(SANDBOX_ROOT + "/dev", exist_ok=True)
+    open(SANDBOX_ROOT + os.devnull, "a").close()
+    _mount(os.devnull, SANDBOX_ROOT + os.devnull, None, MS_BIND, "挂载 /dev/null")
+    os.makedirs(SANDBOX_ROOT + WORK_DIR, exist_ok=True)
+    _mount(None, SANDBOX_ROOT, None, MS_REMOUNT | MS_RDONLY | MS_NOSUID | MS_NODEV, "只读挂载根目录")
+    os.chroot(SANDBOX_ROOT)
+    os.chdir(WORK_DIR)
+    os.setgroups([])
+    os.setgid(uid)
+    os.setuid(uid)
+    _check(libc.prctl(PR_SET_NO_NEW_PRIVS, 1, 0, 0, 0), "禁止提权")
+
+
+def main():
+    memory_mb, cpu_seconds, uid, worker = sys.argv[1:5]
+    memory = int(memory_mb) * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    resource.setrlimit(resource.RLIMIT_CPU, (int(cpu_seconds), int(cpu_seconds)))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+    os.setsid()  # 脱离服务器的进程组，不接收终端的 Ctrl+C
+    if uid != "none":
+        try:
+            _isolate(int(uid), worker)
+        except (OSError, AttributeError) as exc:  # 非 Linux 系统的 C 库没有 unshare
+            print(json.dumps({"ok": False, "error": f"无法建立隔离环境（{exc}）"}, ensure_ascii=False), flush=True)
+            sys.exit(1)
+    os.execv(sys.executable, [sys.executable, "-I", worker, "--worker"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+"""
+托管机器人模块
+游戏方上传策略模块（实现 describe(word, history) 和 vote(status) 两个函数），服务器在受限的子进程池中执行，
+结果直接提交给游戏逻辑，不再经过局域网往返。全部由机器人组成的桌子几秒内即可打完一局
+
+- 子进程由 bot_launcher.py 启动：先设置内存、CPU 时间和可写文件大小限制，再 exec 成隔离模式（python -I）的策略进程，
+  环境变量清空；子进程启动后自行禁止创建子进程
+- 隔离模式（默认，Linux 上需要以 root 启动服务器）下子进程没有网络，根目录是只读的最小文件系统，
+  看不到服务器的代码和数据，以独立的低权限用户（BOT_UID，默认 nobody）运行，无法向服务器进程发信号
+- 每次调用有超时，超时或崩溃的子进程直接杀掉，下次调用时重新启动
+- 子进程执行一定次数后主动回收，CPU 时间限制不会因长时间比赛而累积耗尽
+
+注意：托管机器人默认关闭，需由服务器显式开启；关闭隔离（isolate=False）时只剩资源限制，不能防御恶意代码
+
+策略模块示例：
+    def describe(word, history):
+        # word：本组词语；history：本局已提交的描述 [{round, group, description}]
+        return "一种植物"
+
+    def vote(status):
+        # status：与 /api/me 相同的"我的视图"
+        return [g for g in status["active_groups"] if g != status["group"]][0]
+"""
+import hashlib
+import json
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块，只保留超时限制
+    resource = None
+
+
+BOT_WORKERS = 4  # 子进程池大小
+BOT_CALL_TIMEOUT = 2.0  # 每次调用的超时（秒）
+BOT_MEMORY_MB = 256  # 每个子进程的内存上限
+BOT_CPU_SECONDS = 30  # 每个子进程累计 CPU 时间上限
+BOT_MAX_CALLS = 200  # 每个子进程执行多少次调用后回收
+MAX_SOURCE_BYTES = 64 * 1024  # 策略源码大小上限
+MAX_DESCRIPTION_LENGTH = 200  # 机器人描述的长度上限（超出截断）
+MAX_CACHED_MODULES = 64  # 子进程中缓存的已加载策略数
+BOT_UID = 65534  # 隔离模式下子进程使用的用户和组ID（nobody）
+LAUNCHER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bot_launcher.py")
+STRATEGY_METHODS = ("describe", "vote")
+
+
+class _Worker:
+    """一个执行策略的子进程，按行收发 JSON"""
+
+    def __init__(self, memory_mb: int, cpu_seconds: int, uid: Optional[int]):
+        env = {"PYTHONIOENCODING": "utf-8"}
+        if "SYSTEMROOT" in os.environ:  # Windows 上启动 Python 需要
+            env["SYSTEMROOT"] = os.environ["SYSTEMROOT"]
+        script = os.path.abspath(__file__)
+        if resource is not None:
+            # 资源限制和隔离由启动器在 exec 前设置，不在多线程的服务器进程里使用 preexec_fn
+            command = [LAUNCHER, str(memory_mb), str(cpu_seconds), "none" if uid is None else str(uid), script]
+        elif uid is None:  # Windows 没有 resource 模块，只保留超时限制
+            command = [script, "--worker"]
+        else:
+            raise RuntimeError("当前系统不支持隔离执行托管策略")
+        self.process = subprocess.Popen(
+            [sys.executable, "-I"] + command,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            cwd=tempfile.gettempdir(), env=env, text=True, encoding="utf-8", bufsize=1
+        )
+        self.calls = 0
+        self._replies: "queue.Queue[Optional[str]]" = queue.Queue()
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self):
+        """后台读取子进程的回复（用队列实现跨平台的读超时）"""
+        for line in self.process.stdout:
+            self._replies.put(line)
+        self._replies.put(None)
+
+    def call(self, request: Dict, timeout: float) -> Dict:
+        """
+        发送一次调用并等待回复
+        :raise queue.Empty: 超时
+        :raise RuntimeError: 子进程已退出或回复格式错误
+        """
+        self.calls += 1
+        try:
+            self.process.stdin.write(json.dumps(request, ensure_ascii=False) + "\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError):
+            raise RuntimeError("沙箱进程已退出")
+        line = self._replies.get(timeout=timeout)
+        if line is None:
+            raise RuntimeError("沙箱进程已退出（可能超出内存或CPU时间限制）")
+        try:
+            reply = json.loads(line)
+        except ValueError:
+            raise RuntimeError("沙箱进程回复格式错误")
+        if not isinstance(reply, dict):
+            raise RuntimeError("沙箱进程回复格式错误")
+        return reply
+
+    def kill(self):
+        try:
+            self.process.kill()
+            self.process.wait(1)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+
+
+class BotPool:
+    """策略子进程池（线程安全，子进程按需启动）"""
+
+    def __init__(self, workers: int = BOT_WORKERS, timeout: float = BOT_CALL_TIMEOUT,
+                 memory_mb: int = BOT_MEMORY_MB, cpu_seconds: int = BOT_CPU_SECONDS,
+                 isolate: bool = True, uid: int = BOT_UID):
+        """
+        :param isolate: 是否在隔离环境（无网络、只读的最小根目录、独立用户）中执行策略，
+                        关闭后只有资源限制，仅用于本机调试可信的策略
+        :param uid: 隔离模式下子进程使用的用户ID
+        """
+        self.timeout = timeout
+        self.uid = uid if isolate else None
+        self.memory_mb = memory_mb
+        self.cpu_seconds = cpu_seconds
+        self._idle: "queue.Queue[Optional[_Worker]]" = queue.Queue()
+        for _ in range(workers):
+            self._idle.put(None)  # 空位：用到时再启动子进程
+        self._workers: List[_Worker] = []
+        self._lock = threading.Lock()
+
+    def call(self, source: str, digest: str, method: str, args: list) -> Tuple[bool, object, bool]:
+        """
+        在子进程中执行策略的一个函数
+        :param source: 策略源码
+        :param digest: 源码摘要（子进程按摘要缓存已加载的策略）
+        :param method: 函数名（"check" 只加载并返回缺少的函数）
+        :param args: 参数（需可序列化为JSON）
+        :return: (是否成功, 返回值或错误信息, 是否超时)
+        """
+        try:
+            worker = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            return False, "沙箱繁忙", True
+        try:
+            if worker is None:
+                worker = _Worker(self.memory_mb, self.cpu_seconds, self.uid)
+                with self._lock:
+                    self._workers.append(worker)
+            reply = worker.call({"source": source, "digest": digest, "method": method, "args": args},
+                                self.timeout)
+        except queue.Empty:
+            self._discard(worker)
+            worker = None
+            return False, f"调用超时（{self.timeout}秒）", True
+        except (RuntimeError, OSError) as exc:
+            self._discard(worker)
+            worker = None
+            return False, str(exc), False
+        finally:
+            if worker is not None and worker.calls >= BOT_MAX_CALLS:
+                self._discard(worker)
+                worker = None
+            self._idle.put(worker)
+        if reply.get("ok"):
+            return True, reply.get("result"), False
+        return False, str(reply.get("error", "未知错误")), False
+
+    def _discard(self, worker: Optional[_Worker]):
+        if worker is None:
+            return
+        worker.kill()
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+
+    def close(self):
+        """结束所有子进程"""
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.kill()
+
+
+class BotStrategy:
+    """一个组上传的策略及其调用统计"""
+    __slots__ = ("source", "digest", "uploaded_at", "calls", "failures", "timeouts", "total_ms", "last_error")
+
+    def __init__(self, source: str):
+        self.source = source
+        self.digest = hashlib.sha256(source.encode("utf-8")).hexdigest()
+        self.uploaded_at = datetime.now().isoformat()
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.total_ms = 0.0
+        self.last_error: Optional[str] = None
+
+
+class BotRegistry:
+    """各组的托管策略（线程安全）"""
+
+    def __init__(self, pool: Optional[BotPool] = None):
+        self.pool = pool or BotPool()
+        self.lock = threading.Lock()
+        self.strategies: Dict[str, BotStrategy] = {}
+
+    def __contains__(self, group_name: str) -> bool:
+        return group_name in self.strategies
+
+    def __bool__(self) -> bool:
+        return bool(self.strategies)
+
+    def upload(self, group_name: str, source: str) -> Tuple[bool, str, Optional[str]]:
+        """
+        上传（或替换）某组的策略，先在沙箱中加载检查
+        :return: (是否成功, 消息, 源码摘要)
+        """
+        if not source.strip():
+            return False, "策略源码不能为空", None
+        if len(source.encode("utf-8")) > MAX_SOURCE_BYTES:
+            return False, f"策略源码不能超过 {MAX_SOURCE_BYTES // 1024}KB", None
+        strategy = BotStrategy(source)
+        success, result, _ = self.pool.call(source, strategy.digest, "check", [])
+        if not success:
+            return False, f"策略加载失败：{result}", None
+        if result:
+            return False, f"策略缺少函数：{', '.join(result)}", None
+        with self.lock:
+            self.strategies[group_name] = strategy
+        return True, "策略已加载", strategy.digest
+
+    def remove(self, group_name: str) -> bool:
+        with self.lock:
+            return self.strategies.pop(group_name, None) is not None
+
+    def _call(self, group_name: str, method: str, args: list) -> Tuple[bool, object]:
+        strategy = self.strategies.get(group_name)
+        if strategy is None:
+            return False, "该组没有托管策略"
+        start = time.perf_counter()
+        success, result, timed_out = self.pool.call(strategy.source, strategy.digest, method, args)
+        with self.lock:
+            strategy.calls += 1
+            strategy.total_ms += (time.perf_counter() - start) * 1000
+            if not success:
+                strategy.failures += 1
+                strategy.timeouts += timed_out
+                strategy.last_error = f"{method}: {result}"
+        return success, result
+
+    def _reject(self, group_name: str, method: str, error: str):
+        """记下一次返回值不合法的调用"""
+        with self.lock:
+            strategy = self.strategies.get(group_name)
+            if strategy is not None:
+                strategy.failures += 1
+                strategy.last_error = f"{method}: {error}"
+
+    def describe(self, group_name: str, word: Optional[str], history: List[Dict]) -> Optional[str]:
+        """
+        调用策略生成描述
+        :return: 描述（去除首尾空白，过长时截断），失败或返回值不合法时为None
+        """
+        success, result = self._call(group_name, "describe", [word, history])
+        if not success:
+            return None
+        if not isinstance(result, str) or not result.strip():
+            self._reject(group_name, "describe", "返回值必须是非空字符串")
+            return None
+        return result.strip()[:MAX_DESCRIPTION_LENGTH]
+
+    def vote(self, group_name: str, status: Dict) -> Optional[str]:
+        """
+        调用策略投票
+        :param status: 该组的"我的视图"
+        :return: 被投票的组名，失败或返回值不是可投的组时为None
+        """
+        success, result = self._call(group_name, "vote", [status])
+        if not success:
+            return None
+        candidates = [g for g in status.get("active_groups", []) if g != group_name]
+        if result not in candidates:
+            self._reject(group_name, "vote", f"返回值必须是可投票的组名之一：{candidates}")
+            return None
+        return result
+
+    def stats(self) -> List[Dict]:
+        """各组策略的调用统计"""
+        with self.lock:
+            return [{
+                "group": name,
+                "digest": strategy.digest[:12],
+                "uploaded_at": strategy.uploaded_at,
+                "calls": strategy.calls,
+                "failures": strategy.failures,
+                "timeouts": strategy.timeouts,
+                "avg_ms": round(strategy.total_ms / strategy.calls, 2) if strategy.calls else None,
+                "last_error": strategy.last_error
+            } for name, strategy in sorted(self.strategies.items())]
+
+    def close(self):
+        self.pool.close()
+
+
+def _worker_main():
+    """子进程：逐行读取调用请求，执行策略函数并回复"""
+    if resource is not None and hasattr(resource, "RLIMIT_NPROC"):
+        resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))  # 启动器切换用户后 exec 前不能设置
+    requests_in = sys.stdin
+    replies_out = sys.stdout
+    # 策略代码的输入输出不能混入协议
+    sys.stdin = open(os.devnull)
+    sys.stdout = sys.stderr
+    modules: Dict[str, dict] = {}
+    for line in requests_in:
+        try:
+            request = json.loads(line)
+            namespace = modules.get(request["digest"])
+            if namespace is None:
+                namespace = {"__name__": "strategy"}
+                exec(compile(request["source"], "<strategy>", "exec"), namespace)
+                if len(modules) >= MAX_CACHED_MODULES:
+                    modules.clear()
+                modules[request["digest"]] = namespace
+            if request["method"] == "check":
+                result = [name for name in STRATEGY_METHODS if not callable(namespace.get(name))]
+            else:
+                result = namespace[request["method"]](*request["args"])
+            reply = json.dumps({"ok": True, "result": result}, ensure_ascii=False)
+        except BaseException as exc:  # 策略代码的任何异常（包括 SystemExit）都只回复错误
+            reply = json.dumps({"ok": False, "error": f"{type(exc).__name__}: {exc}"[:300]}, ensure_ascii=False)
+        replies_out.write(reply + "\n")
+        replies_out.flush()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--worker"]:
+        _worker_main()
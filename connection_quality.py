@@ -0,0 +1,219 @@
+"""
+连接质量模块
+按组统计网络状况，用来区分"超时"是队伍思考太久还是网络不好：
+- 往返时延（RTT）：服务器定期通过 Socket.IO 向各组发送 latency_ping，收到 ack 的耗时
+- 抖动：相邻两次 RTT 之差的平均值
+- 丢包率：超过 PING_TIMEOUT 秒仍未回复的 ping 所占比例
+- 断线、重连次数
+- HTTP 处理耗时：该组请求在服务器端的处理时间
+
+样本保存在固定长度的滚动窗口中（内存不随比赛时长增长）。热力图按 HEATMAP_BUCKET_SECONDS 秒分桶，
+保留最近 HEATMAP_BUCKETS 个桶的平均 RTT。
+每次提交描述或投票时，用该组最近的 RTT 中位数估算网络耗时，把"从轮到发言（投票开始）到服务器收到"的总耗时
+拆成网络耗时和思考耗时
+"""
+import threading
+import time
+from collections import deque
+from statistics import median
+from typing import Callable, Deque, Dict, Iterable, Optional, Tuple
+
+
+LATENCY_WINDOW = 64  # 每组保留最近多少个 RTT / 丢包 / HTTP 样本
+SUBMISSION_WINDOW = 10  # 每组保留最近多少次提交的耗时分解
+PING_INTERVAL = 5  # 发送 latency_ping 的间隔（秒）
+PING_TIMEOUT = 3  # 超过多少秒未回复算丢包
+HEATMAP_BUCKETS = 24  # 热力图列数
+HEATMAP_BUCKET_SECONDS = 10  # 热力图每列的时间跨度（秒）
+
+
+class GroupLink:
+    """一个组的连接质量样本（固定长度的滚动窗口）"""
+    __slots__ = ("rtt", "replies", "http", "submissions", "heat_sum", "heat_count", "heat_slot",
+                 "connections", "joins", "disconnects", "last_seen")
+
+    def __init__(self):
+        self.rtt: Deque[float] = deque(maxlen=LATENCY_WINDOW)  # 毫秒
+        self.replies: Deque[bool] = deque(maxlen=LATENCY_WINDOW)  # 每个 ping 是否收到回复
+        self.http: Deque[float] = deque(maxlen=LATENCY_WINDOW)  # 毫秒
+        self.submissions: Deque[Dict] = deque(maxlen=SUBMISSION_WINDOW)
+        # 热力图环形缓冲：第 i 个桶对应时间片 heat_slot[i]，时间片过期时整桶清零
+        self.heat_sum = [0.0] * HEATMAP_BUCKETS
+        self.heat_count = [0] * HEATMAP_BUCKETS
+        self.heat_slot = [-1] * HEATMAP_BUCKETS
+        self.connections = 0  # 当前在线的连接数
+        self.joins = 0  # 累计加入私有频道次数（第一次之后的都算重连）
+        self.disconnects = 0
+        self.last_seen: Optional[float] = None
+
+    def network_ms(self) -> Optional[float]:
+        """估算的网络耗时：最近 RTT 的中位数（推送到达 + 请求到达各约半个往返）"""
+        return median(self.rtt) if self.rtt else None
+
+    def jitter_ms(self) -> Optional[float]:
+        if len(self.rtt) < 2:
+            return None
+        samples = list(self.rtt)
+        return sum(abs(b - a) for a, b in zip(samples, samples[1:])) / (len(samples) - 1)
+
+
+class ConnectionQuality:
+    """各组连接质量统计（线程安全）"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.links: Dict[str, GroupLink] = {}
+        self._pending: Dict[int, Tuple[str, float]] = {}  # ping 序号 -> (组名, 发送时刻)
+        self._seq = 0
+
+    def _link(self, group_name: str) -> GroupLink:
+        link = self.links.get(group_name)
+        if link is None:
+            link = self.links[group_name] = GroupLink()
+        return link
+
+    def joined(self, group_name: str):
+        """某组加入私有频道（断线后再次加入计为重连）"""
+        with self.lock:
+            link = self._link(group_name)
+            link.connections += 1
+            link.joins += 1
+            link.last_seen = self.clock()
+
+    def left(self, group_name: str):
+        """某组的一个连接断开"""
+        with self.lock:
+            link = self.links.get(group_name)
+            if link is not None:
+                link.connections = max(0, link.connections - 1)
+                link.disconnects += 1
+
+    def forget(self, group_names: Iterable[str]):
+        """移除已不再参赛的组"""
+        with self.lock:
+            for name in group_names:
+                self.links.pop(name, None)
+
+    def ping_sent(self, group_name: str) -> int:
+        """
+        记下一次 latency_ping
+        :return: ping 序号（回复时凭序号计算 RTT）
+        """
+        with self.lock:
+            self._seq += 1
+            self._pending[self._seq] = (group_name, self.clock())
+            return self._seq
+
+    def pong(self, seq: int, timeout: float = PING_TIMEOUT) -> Optional[float]:
+        """
+        收到 latency_ping 的回复（超过 timeout 秒才到的回复同样计为丢包）
+        :return: RTT（毫秒），序号未知或已判定丢包时为None
+        """
+        now = self.clock()
+        with self.lock:
+            pending = self._pending.pop(seq, None)
+            if pending is None:
+                return None
+            group_name, sent_at = pending
+            link = self.links.get(group_name)
+            if link is None:
+                return None
+            if now - sent_at > timeout:
+                link.replies.append(False)
+                return None
+            rtt = (now - sent_at) * 1000
+            link.rtt.append(rtt)
+            link.replies.append(True)
+            link.last_seen = now
+            slot = int(now // HEATMAP_BUCKET_SECONDS)
+            i = slot % HEATMAP_BUCKETS
+            if link.heat_slot[i] != slot:
+                link.heat_slot[i], link.heat_sum[i], link.heat_count[i] = slot, 0.0, 0
+            link.heat_sum[i] += rtt
+            link.heat_count[i] += 1
+            return rtt
+
+    def expire(self, timeout: float = PING_TIMEOUT) -> int:
+        """
+        把超时未回复的 ping 计为丢包
+        :return: 本次判定丢包的个数
+        """
+        deadline = self.clock() - timeout
+        with self.lock:
+            lost = [seq for seq, (_, sent_at) in self._pending.items() if sent_at < deadline]
+            for seq in lost:
+                group_name, _ = self._pending.pop(seq)
+                link = self.links.get(group_name)
+                if link is not None:
+                    link.replies.append(False)
+            return len(lost)
+
+    def record_http(self, group_name: str, elapsed_ms: float):
+        """记下某组一次 HTTP 请求的服务器处理耗时"""
+        with self.lock:
+            link = self._link(group_name)
+            link.http.append(elapsed_ms)
+            link.last_seen = self.clock()
+
+    def record_submission(self, group_name: str, kind: str, round_num: int, elapsed: float,
+                          timeout: bool = False) -> Dict:
+        """
+        记下一次提交的耗时分解
+        :param kind: "describe" 或 "vote"
+        :param elapsed: 从轮到该组（或投票开始）到服务器收到提交的秒数
+        :param timeout: 是否超时提交
+        :return: {kind, round, elapsed_ms, network_ms, think_ms, timeout}，没有 RTT 样本时网络耗时为None
+        """
+        elapsed_ms = max(0.0, elapsed * 1000)
+        with self.lock:
+            link = self._link(group_name)
+            network = link.network_ms()
+            entry = {
+                "kind": kind,
+                "round": round_num,
+                "elapsed_ms": round(elapsed_ms, 1),
+                "network_ms": None if network is None else round(min(network, elapsed_ms), 1),
+                "think_ms": round(elapsed_ms - min(network or 0.0, elapsed_ms), 1),
+                "timeout": timeout
+            }
+            link.submissions.append(entry)
+            return entry
+
+    def summary(self) -> Dict:
+        """
+        各组连接质量
+        :return: {bucket_seconds, buckets, groups: [{group, connected, rtt_ms, rtt_p95_ms, jitter_ms, loss_rate,
+                  reconnects, disconnects, http_ms, samples, heatmap: [每列平均RTT或None，旧→新], submissions}]}
+        """
+        now = self.clock()
+        current = int(now // HEATMAP_BUCKET_SECONDS)
+        groups = []
+        with self.lock:
+            for name, link in self.links.items():
+                rtt = sorted(link.rtt)
+                heatmap = []
+                for slot in range(current - HEATMAP_BUCKETS + 1, current + 1):
+                    i = slot % HEATMAP_BUCKETS
+                    if link.heat_slot[i] == slot and link.heat_count[i]:
+                        heatmap.append(round(link.heat_sum[i] / link.heat_count[i], 1))
+                    else:
+                        heatmap.append(None)
+                jitter = link.jitter_ms()
+                groups.append({
+                    "group": name,
+                    "connected": link.connections > 0,
+                    "rtt_ms": round(median(rtt), 1) if rtt else None,
+                    "rtt_p95_ms": round(rtt[min(len(rtt) - 1, int(len(rtt) * 0.95))], 1) if rtt else None,
+                    "jitter_ms": None if jitter is None else round(jitter, 1),
+                    "loss_rate": round(link.replies.count(False) / len(link.replies), 3) if link.replies else None,
+                    "reconnects": max(0, link.joins - 1),
+                    "disconnects": link.disconnects,
+                    "http_ms": round(median(link.http), 1) if link.http else None,
+                    "samples": len(rtt),
+                    "idle_seconds": None if link.last_seen is None else round(now - link.last_seen, 1),
+                    "heatmap": heatmap,
+                    "submissions": list(link.submissions)
+                })
+        groups.sort(key=lambda item: item["group"])
+        return {"bucket_seconds": HEATMAP_BUCKET_SECONDS, "buckets": HEATMAP_BUCKETS, "groups": groups}
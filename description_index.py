@@ -0,0 +1,355 @@
+"""
+历史描述全文索引
+按中文字符二元组（bigram）以及组名、词语、词对、回合建立倒排索引，描述提交时增量加入。
+落盘格式：index.npz（倒排表按差值编码后压缩）+ journal.ndjson（上次压缩之后新增的描述，逐行追加），
+启动时加载快照并重放日志。压缩时只在锁内复制数据，写盘不阻塞新描述的加入
+
+用法：
+    python description_index.py description_index 向日葵 --group 望月队
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+import zlib
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+INDEX_DIR = "description_index"  # 默认索引目录
+INDEX_FILE = "index.npz"
+JOURNAL_FILE = "journal.ndjson"
+COMPACTING_FILE = "journal.compacting.ndjson"  # 压缩进行中的旧日志（压缩完成后删除）
+INDEX_VERSION = 1
+JOURNAL_COMPACT_LINES = 10000  # 日志超过多少行时压缩进快照
+SEARCH_LIMIT = 50  # 默认返回条数
+COPY_MIN_LENGTH = 4  # 判定抄袭的描述最短字数（规范化后）
+
+# 描述记录字段顺序（内存中以元组保存，落盘时为JSON数组）
+DOC_FIELDS = ("description", "group", "word", "pair", "table", "round", "time")
+
+
+def normalize(text: str) -> str:
+    """规范化：小写，去掉空白和标点"""
+    return "".join(ch for ch in text.lower() if ch.isalnum())
+
+
+def bigrams(text: str) -> Iterable[str]:
+    """规范化文本的字符二元组"""
+    return (text[i:i + 2] for i in range(len(text) - 1))
+
+
+def field_terms(group: str, word: str, pair: str, round_num: int) -> Tuple[str, ...]:
+    """字段词条（带前缀，规范化文本中不含冒号，不会与二元组冲突）"""
+    return f"g:{group}", f"w:{word}", f"p:{pair}", f"r:{round_num}"
+
+
+def _intern_fields(doc) -> tuple:
+    """驻留重复度高的字段（组名、词语、词对、桌号），每条描述不再各持一份相同的字符串"""
+    text, group, word, pair, table, round_num, timestamp = doc
+    return (text, sys.intern(group), sys.intern(word), sys.intern(pair),
+            None if table is None else sys.intern(table), round_num, timestamp)
+
+
+def _intersect(small: np.ndarray, large: np.ndarray) -> np.ndarray:
+    """两个升序文档编号数组求交（在大数组中二分查找小数组的元素）"""
+    if not small.size or not large.size:
+        return small[:0]
+    positions = np.minimum(np.searchsorted(large, small), large.size - 1)
+    return small[large[positions] == small]
+
+
+class DescriptionIndex:
+    """描述倒排索引（线程安全；directory 为空时只在内存中）"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.lock = threading.Lock()
+        self._save_lock = threading.Lock()  # 同一时间只做一次压缩
+        self.directory = directory
+        self.docs: List[tuple] = []
+        self.postings: Dict[str, array] = {}  # 词条 -> 升序文档编号
+        self.fingerprints = array("I")  # 每条描述规范化文本的 crc32（查找抄袭用）
+        self._journal = None
+        self.journal_lines = 0
+        self._loaded = not directory  # 第一次使用时才加载（调试模式的重载监视进程不会读写索引）
+
+    def _ensure_loaded(self):
+        """按需加载快照和日志（需持有锁）"""
+        if self._loaded:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._load()
+        self._journal = open(os.path.join(self.directory, JOURNAL_FILE), "a", encoding="utf-8")
+        self._loaded = True
+
+    def _index(self, doc: tuple) -> int:
+        """把一条描述加入内存索引（需持有锁）"""
+        doc_id = len(self.docs)
+        doc = _intern_fields(doc)
+        self.docs.append(doc)
+        text, group, word, pair, _, round_num, _ = doc
+        normalized = normalize(text)
+        for term in {*bigrams(normalized), *field_terms(group, word, pair, round_num)}:
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = array("I")
+            postings.append(doc_id)
+        self.fingerprints.append(zlib.crc32(normalized.encode("utf-8")))
+        return doc_id
+
+    def add(self, description: str, group: str, word: str, pair: str, table: Optional[str],
+            round_num: int, timestamp: Optional[float] = None) -> int:
+        """
+        加入一条描述
+        :param description: 描述内容
+        :param group: 组名
+        :param word: 该组的词语
+        :param pair: 本局词对（"卧底词/平民词"）
+        :param table: 锦标赛桌号（主游戏为None）
+        :param round_num: 回合
+        :param timestamp: 提交时间（时间戳），缺省为当前时间
+        :return: 文档编号
+        """
+        doc = (description, group, word, pair, table, round_num,
+               time.time() if timestamp is None else timestamp)
+        with self.lock:
+            self._ensure_loaded()
+            doc_id = self._index(doc)
+            if self._journal is not None:
+                self._journal.write(json.dumps([doc_id, *doc], ensure_ascii=False) + "\n")
+                self._journal.flush()
+                self.journal_lines += 1
+        return doc_id
+
+    def _doc_dict(self, doc_id: int) -> Dict:
+        return dict(zip(DOC_FIELDS, self.docs[doc_id]), id=doc_id)
+
+    def search(self, query: str = "", group: Optional[str] = None, word: Optional[str] = None,
+               pair: Optional[str] = None, round_num: Optional[int] = None,
+               limit: int = SEARCH_LIMIT) -> Dict:
+        """
+        检索描述（关键词的所有二元组都命中后再核对连续出现，最新的在前）
+        :param query: 关键词（规范化后至少2个字；为空时只按字段过滤）
+        :param group: 组名
+        :param word: 描述者的词语
+        :param pair: 词对（"卧底词/平民词"）
+        :param round_num: 回合
+        :param limit: 最多返回条数
+        :return: {candidates: 二元组全部命中的条数, results: [...]}
+        """
+        normalized = normalize(query)
+        terms = set(bigrams(normalized))
+        for prefix, value in (("g", group), ("w", word), ("p", pair), ("r", round_num)):
+            if value is not None:
+                terms.add(f"{prefix}:{value}")
+        if not terms:
+            return {"candidates": 0, "results": []}
+
+        with self.lock:
+            self._ensure_loaded()
+            lists = []
+            for term in terms:
+                postings = self.postings.get(term)
+                if postings is None:
+                    return {"candidates": 0, "results": []}
+                lists.append(postings)
+            lists.sort(key=len)
+            # 从最短的倒排表开始求交（拷贝一份，避免持有 array 的缓冲区导致之后无法追加）
+            ids = np.array(lists[0], dtype=np.uint32)
+            for postings in lists[1:]:
+                ids = _intersect(ids, np.frombuffer(postings, dtype=np.uint32))
+                if not ids.size:
+                    break
+
+            results = []
+            verify = len(normalized) > 2
+            for doc_id in ids[::-1]:
+                doc_id = int(doc_id)
+                if verify and normalized not in normalize(self.docs[doc_id][0]):
+                    continue
+                results.append(self._doc_dict(doc_id))
+                if len(results) >= limit:
+                    break
+            return {"candidates": int(ids.size), "results": results}
+
+    def copies(self, min_length: int = COPY_MIN_LENGTH, limit: int = SEARCH_LIMIT) -> List[Dict]:
+        """
+        查找不同组提交的相同描述（规范化后一致，可跨桌、跨局）
+        :param min_length: 规范化后的最短字数
+        :param limit: 最多返回几组
+        :return: [{description, groups, count, ids}]，按出现次数降序
+        """
+        with self.lock:
+            self._ensure_loaded()
+            fingerprints = np.array(self.fingerprints, dtype=np.uint32)
+        # 描述列表只追加，锁外按快照长度读取即可
+        docs = self.docs
+        values, counts = np.unique(fingerprints, return_counts=True)
+        candidates = np.flatnonzero(np.isin(fingerprints, values[counts > 1]))
+        clusters: Dict[str, List[int]] = {}
+        for doc_id in candidates:
+            normalized = normalize(docs[doc_id][0])
+            if len(normalized) >= min_length:
+                clusters.setdefault(normalized, []).append(int(doc_id))
+        found = []
+        for ids in clusters.values():
+            groups = sorted({docs[doc_id][1] for doc_id in ids})
+            if len(groups) > 1:
+                found.append({
+                    "description": docs[ids[0]][0],
+                    "groups": groups,
+                    "count": len(ids),
+                    "ids": ids
+                })
+        found.sort(key=lambda item: -item["count"])
+        return found[:limit]
+
+    def stats(self) -> Dict:
+        with self.lock:
+            self._ensure_loaded()
+            return {"descriptions": len(self.docs), "terms": len(self.postings),
+                    "journal_lines": self.journal_lines}
+
+    def _load(self):
+        """加载快照并重放日志"""
+        path = os.path.join(self.directory, INDEX_FILE)
+        if os.path.exists(path):
+            with np.load(path) as data:
+                header = json.loads(bytes(data["header"]).decode("utf-8"))
+                if header.get("version") != INDEX_VERSION:
+                    raise ValueError(f"不支持的索引版本：{header.get('version')}")
+                self.docs = [_intern_fields(doc) for doc in json.loads(bytes(data["docs"]).decode("utf-8"))]
+                counts = data["counts"]
+                deltas = data["deltas"]
+                self.fingerprints = array("I", data["fingerprints"].tobytes())
+            # 差值编码还原：整体前缀和减去每个词条起点之前的前缀和
+            totals = np.cumsum(deltas, dtype=np.uint64)
+            starts = (np.cumsum(counts) - counts).astype(np.int64)
+            base = totals[np.maximum(starts - 1, 0)]
+            base[starts == 0] = 0
+            values = (totals - np.repeat(base, counts)).astype(np.uint32)
+            self.postings = {}
+            for term, start, count in zip(header["terms"], starts, counts):
+                postings = array("I")
+                postings.frombytes(values[start:start + count].tobytes())
+                self.postings[term] = postings
+        # 日志行带文档编号，快照中已有的跳过（压缩中断时旧日志可能与快照重叠）
+        for name in (COMPACTING_FILE, JOURNAL_FILE):
+            journal = os.path.join(self.directory, name)
+            if not os.path.exists(journal):
+                continue
+            with open(journal, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        doc_id, *doc = json.loads(line)
+                    except ValueError:
+                        continue  # 写入中断留下的不完整行
+                    if doc_id == len(self.docs):
+                        self._index(tuple(doc))
+                        self.journal_lines += 1
+
+    def save(self):
+        """把整个索引写入快照并清空日志（锁内只复制数据，差值编码和压缩在锁外进行）"""
+        with self._save_lock:
+            compacting = os.path.join(self.directory, COMPACTING_FILE)
+            with self.lock:
+                if self._journal is None or not (self.journal_lines or os.path.exists(compacting)):
+                    return  # 未加载，或上次压缩成功后没有新描述
+                docs = self.docs[:]
+                terms = list(self.postings)
+                postings = b"".join(self.postings[term].tobytes() for term in terms)
+                counts = np.array([len(self.postings[term]) for term in terms], dtype=np.int64)
+                fingerprints = np.array(self.fingerprints, dtype=np.uint32)
+                # 当前日志改名留作保险，新描述写入新日志
+                self._journal.close()
+                self._rotate_journal(compacting)
+                self._journal = open(os.path.join(self.directory, JOURNAL_FILE), "w", encoding="utf-8")
+                self.journal_lines = 0
+
+            values = np.frombuffer(postings, dtype=np.uint32)
+            deltas = np.diff(values, prepend=np.uint32(0))
+            starts = np.cumsum(counts) - counts
+            deltas[starts] = values[starts]  # 每个词条的第一个编号存原值
+            header = json.dumps({"version": INDEX_VERSION, "terms": terms}, ensure_ascii=False)
+            path = os.path.join(self.directory, INDEX_FILE)
+            tmp = path + ".tmp.npz"
+            np.savez_compressed(
+                tmp,
+                header=np.frombuffer(header.encode("utf-8"), dtype=np.uint8),
+                docs=np.frombuffer(json.dumps(docs, ensure_ascii=False).encode("utf-8"), dtype=np.uint8),
+                counts=counts,
+                deltas=deltas,
+                fingerprints=fingerprints
+            )
+            os.replace(tmp, path)
+            os.remove(compacting)
+
+    def _rotate_journal(self, compacting: str):
+        """
+        把当前日志移作压缩中的旧日志（需持有 self.lock）
+        上次压缩失败留下的旧日志还没进快照，不能覆盖：把当前日志追加到它后面，一起压缩
+        """
+        journal = os.path.join(self.directory, JOURNAL_FILE)
+        if not os.path.exists(compacting):
+            os.replace(journal, compacting)
+            return
+        with open(compacting, "rb+") as dst, open(journal, "rb") as src:
+            dst.seek(0, os.SEEK_END)
+            if dst.tell():
+                dst.seek(-1, os.SEEK_END)
+                if dst.read(1) != b"\n":
+                    dst.write(b"\n")  # 中断时可能留下不完整的最后一行
+            shutil.copyfileobj(src, dst)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.remove(journal)
+
+    def maybe_compact(self, max_lines: int = JOURNAL_COMPACT_LINES) -> bool:
+        """日志过长时压缩进快照"""
+        if self.journal_lines < max_lines:
+            return False
+        self.save()
+        return True
+
+    def close(self):
+        """退出前压缩并关闭日志"""
+        if self._journal is not None:
+            self.save()
+            self._journal.close()
+            self._journal = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检索历史描述")
+    parser.add_argument("directory", help="索引目录")
+    parser.add_argument("query", nargs="?", default="", help="关键词")
+    parser.add_argument("--group", help="组名")
+    parser.add_argument("--word", help="描述者的词语")
+    parser.add_argument("--copies", action="store_true", help="列出不同组提交的相同描述")
+    parser.add_argument("--limit", type=int, default=SEARCH_LIMIT, help="最多返回条数")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = DescriptionIndex(args.directory)
+    index.stats()
+    print(f"加载 {len(index.docs)} 条描述，{len(index.postings)} 个词条，"
+          f"耗时 {time.perf_counter() - start:.2f} 秒")
+    start = time.perf_counter()
+    if args.copies:
+        result = index.copies(limit=args.limit)
+    else:
+        result = index.search(args.query, group=args.group, word=args.word, limit=args.limit)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    print(f"查询耗时 {elapsed:.2f} 毫秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+描述相似度模块
+每条描述提交时增量生成字符 n-gram 哈希向量，用批量矩阵运算求各组描述与本回合其他组描述中心的余弦距离，
+距离越大越"离群"，供主持方判断谁可能拿到了不同的词
+"""
+import zlib
+from typing import Dict, List
+
+import numpy as np
+
+
+VECTOR_DIM = 512  # 哈希向量维数
+NGRAM_SIZES = (1, 2)  # 字符 n-gram 长度（中文单字和双字）
+INITIAL_ROWS = 8  # 初始可容纳的描述条数（不够时按倍数扩容）
+MIN_DESCRIPTIONS = 3  # 至少几条描述才排名（少于3条时"其他组的中心"没有意义）
+
+
+def vectorize(text: str, dim: int = VECTOR_DIM) -> np.ndarray:
+    """
+    描述的字符 n-gram 哈希向量（忽略空白和标点，L2 归一化）
+    :param text: 描述内容
+    :param dim: 向量维数
+    :return: float32 向量，空描述为零向量
+    """
+    text = "".join(ch for ch in text.lower() if ch.isalnum())
+    buckets = [zlib.crc32(text[i:i + n].encode("utf-8")) % dim
+               for n in NGRAM_SIZES for i in range(len(text) - n + 1)]
+    vector = np.bincount(buckets, minlength=dim).astype(np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class DescriptionSimilarity:
+    """一个游戏当前回合的描述向量（回合、局或种子变化时自动清空）"""
+
+    def __init__(self, dim: int = VECTOR_DIM):
+        self.dim = dim
+        self.key = None  # (种子, 局数, 回合)
+        self.groups: List[str] = []
+        self.texts: List[str] = []
+        self.vectors = np.zeros((INITIAL_ROWS, dim), dtype=np.float32)
+        self.total = np.zeros(dim, dtype=np.float32)  # 本回合所有描述向量之和
+
+    def _reset(self, key):
+        self.key = key
+        self.groups = []
+        self.texts = []
+        self.total[:] = 0
+
+    def add(self, group_name: str, description: str):
+        """计入一条描述"""
+        n = len(self.groups)
+        if n == len(self.vectors):
+            grown = np.zeros((n * 2, self.dim), dtype=np.float32)
+            grown[:n] = self.vectors
+            self.vectors = grown
+        vector = vectorize(description, self.dim)
+        self.vectors[n] = vector
+        self.total += vector
+        self.groups.append(group_name)
+        self.texts.append(description)
+
+    def update(self, game) -> int:
+        """
+        增量计入游戏当前回合新提交的描述（每回合的描述列表只追加）
+        :param game: GameLogic 实例
+        :return: 新计入的条数
+        """
+        key = (game.seed, game.game_number, game.current_round)
+        if key != self.key:
+            self._reset(key)
+        records = game.descriptions.get(game.current_round, [])[len(self.groups):]
+        for record in records:
+            self.add(record.group, record.description)
+        return len(records)
+
+    def ranking(self) -> List[Dict]:
+        """
+        语义离群排名：各组描述与其余各组描述中心的余弦距离（降序）
+        :return: [{rank, group, distance, description}]，描述不足 MIN_DESCRIPTIONS 条时为空
+        """
+        n = len(self.groups)
+        if n < MIN_DESCRIPTIONS:
+            return []
+        vectors = self.vectors[:n]
+        # 其余各组之和 = 总和 - 自身，点积和模长都可以从 v·S 和 |v|² 推出，不必逐组求和
+        dots = vectors @ self.total
+        squares = np.einsum("ij,ij->i", vectors, vectors)
+        others_norm = np.sqrt(np.maximum(self.total @ self.total - 2 * dots + squares, 0))
+        similarity = (dots - squares) / np.maximum(np.sqrt(squares) * others_norm, 1e-9)
+        distance = 1 - similarity
+        order = np.argsort(-distance, kind="stable")
+        return [{
+            "rank": rank,
+            "group": self.groups[i],
+            "distance": round(float(distance[i]), 3),
+            "description": self.texts[i]
+        } for rank, i in enumerate(order, 1)]
@@ -0,0 +1,118 @@
+"""
+进程资源诊断模块
+采样本进程的常驻内存（RSS）、线程数、打开的文件描述符、GC 对象数，以及 tracemalloc 相对基线增长最多的分配位置，
+供 soak.py 长时间压测时判断是否存在内存、线程或句柄泄漏
+
+tracemalloc 需要在进程启动时开启才能看到完整的分配调用栈：
+    BACKEND_DEBUG=0 PYTHONTRACEMALLOC=8 python backend.py
+"""
+import gc
+import os
+import re
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+TOP_ALLOCATIONS = 15  # 默认返回增长最多的分配位置数
+TRACEBACK_FRAMES = 6  # 每个分配位置附带的调用栈帧数
+# 不计入统计的文件（tracemalloc 自身和导入机制）
+IGNORED_FILES = ("<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>", "<unknown>",
+                 tracemalloc.__file__)
+_THREAD_NUMBER = re.compile(r"-\d+")  # "Thread-12 (broadcast_status)" -> "Thread (broadcast_status)"
+
+
+def rss_bytes() -> Optional[int]:
+    """当前常驻内存（Linux 读 /proc，其他系统退回到峰值常驻内存）"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # macOS 单位是字节，Linux 是KB
+
+
+def open_fds() -> Optional[int]:
+    """打开的文件描述符数（不支持的系统返回None）"""
+    for path in ("/proc/self/fd", "/dev/fd"):
+        try:
+            return len(os.listdir(path))
+        except OSError:
+            continue
+    return None
+
+
+class ResourceProbe:
+    """资源采样器：记录一个 tracemalloc 基线，之后每次采样与基线比较"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.baseline: Optional[tracemalloc.Snapshot] = None
+
+    def _snapshot(self, exclude: Sequence[str]) -> tracemalloc.Snapshot:
+        filters = [tracemalloc.Filter(False, pattern) for pattern in IGNORED_FILES]
+        filters += [tracemalloc.Filter(False, f"*{pattern}*") for pattern in exclude]
+        return tracemalloc.take_snapshot().filter_traces(filters)
+
+    def sample(self, top: int = TOP_ALLOCATIONS, exclude: Sequence[str] = (), reset: bool = False) -> Dict:
+        """
+        采样一次
+        :param top: 返回相对基线增长最多的前几个分配位置
+        :param exclude: 不计入统计的文件名片段（如按设计会增长的索引模块）
+        :param reset: 是否以本次采样作为新的基线
+        :return: {rss_bytes, threads, thread_names, fds, gc_objects, tracing, traced_bytes, tracemalloc_bytes,
+                  top_allocations}
+        """
+        gc.collect()
+        threads = threading.enumerate()
+        result = {
+            "rss_bytes": rss_bytes(),
+            "threads": len(threads),
+            # 按名称前缀统计线程（后台任务泄漏时能看出是哪类线程在增长）
+            "thread_names": dict(Counter(_THREAD_NUMBER.sub("", thread.name) for thread in threads)),
+            "fds": open_fds(),
+            "gc_objects": len(gc.get_objects()),
+            "tracing": tracemalloc.is_tracing(),
+            "traced_bytes": None,
+            # tracemalloc 自身占用的内存（计入 RSS，且随记录的调用栈增多而增长）
+            "tracemalloc_bytes": tracemalloc.get_tracemalloc_memory(),
+            "top_allocations": []
+        }
+        if not tracemalloc.is_tracing():
+            return result
+        with self.lock:
+            snapshot = self._snapshot(exclude)
+            result["traced_bytes"] = sum(trace.size for trace in snapshot.traces)
+            if reset or self.baseline is None:
+                self.baseline = snapshot
+                return result
+            result["top_allocations"] = self._top_allocations(snapshot, top)
+        return result
+
+    def _top_allocations(self, snapshot: tracemalloc.Snapshot, top: int) -> List[Dict]:
+        """相对基线增长最多的分配位置，附带一条代表性的调用栈"""
+        allocations = []
+        for stat in snapshot.compare_to(self.baseline, "lineno")[:top]:
+            frame = stat.traceback[0]
+            traces = snapshot.filter_traces([tracemalloc.Filter(True, frame.filename, frame.lineno)]).traces
+            stack = traces[0].traceback if len(traces) else stat.traceback
+            allocations.append({
+                "file": frame.filename,
+                "line": frame.lineno,
+                "size_diff": stat.size_diff,
+                "count_diff": stat.count_diff,
+                "size": stat.size,
+                # 最近的调用在前
+                "traceback": [f"{item.filename}:{item.lineno}" for item in list(stack)[::-1][:TRACEBACK_FRAMES]]
+            })
+        return allocations
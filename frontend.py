@@ -2,27 +2,69 @@
 前端界面模块
 提供可视化的游戏管理界面
 """
-from flask import Flask, render_template_string, jsonify
+from flask import Flask, Response, render_template_string, jsonify
+from flask_socketio import SocketIO, emit
+import socketio as socketio_client  # python-socketio 客户端，用于订阅后端推送
 import os
 import requests
 import threading
 import time
 from datetime import datetime
+from polling import next_delay
+from tracing import SLOW_TRACE_MS, TRACE_HEADER, TraceStore, current_trace, install as install_tracing
 
 # 前端服务器（用于展示界面）
 frontend_app = Flask(__name__)
+frontend_socketio = SocketIO(frontend_app, cors_allowed_origins="*")  # 向浏览器转发推送
 
-# 后端API地址
-BACKEND_URL = "http://127.0.0.1:5000"
+# 后端API地址（主持方电脑以外部署时通过环境变量指定）
+BACKEND_URL = os.environ.get("BACKEND_URL", "http://127.0.0.1:5000")
 ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "host-secret")
 ADMIN_HEADERS = {'X-Admin-Token': ADMIN_TOKEN}
 
+# 请求追踪：浏览器到前端、前端到后端共用同一个追踪编号，慢请求保存在内存中供界面查看
+trace_store = TraceStore(float(os.environ.get("SLOW_TRACE_MS", SLOW_TRACE_MS)))
+install_tracing(frontend_app, trace_store)
+
+
+class BackendSession(requests.Session):
+    """转发到后端的会话（复用连接）：带上追踪编号，记录代理耗时，并把后端的 Server-Timing 并入本次追踪"""
+
+    def request(self, method, url, **kwargs):
+        trace = current_trace()
+        if trace is None:
+            return super().request(method, url, **kwargs)
+        kwargs['headers'] = dict(kwargs.get('headers') or {}, **{TRACE_HEADER: trace.trace_id})
+        with trace.span('proxy'):
+            response = super().request(method, url, **kwargs)
+        trace.merge_server_timing(response.headers.get('Server-Timing'), 'backend_')
+        return response
+
+
+class ThreadSessions(threading.local):
+    """
+    每个线程一个 BackendSession（requests.Session 不保证线程安全，前端按请求多线程处理）
+    用法与会话相同：backend.get(...) / backend.post(...)
+    """
+
+    def __init__(self):
+        self.session = BackendSession()
+
+    def get(self, url, **kwargs):
+        return self.session.get(url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.session.post(url, **kwargs)
+
+
+backend = ThreadSessions()
+
 
 def get_backend_data(endpoint, use_admin=False):
     """从后端获取数据"""
     try:
         headers = ADMIN_HEADERS if use_admin else None
-        response = requests.get(f"{BACKEND_URL}{endpoint}", headers=headers, timeout=2)
+        response = backend.get(f"{BACKEND_URL}{endpoint}", headers=headers, timeout=2)
         return response.json()
     except:
         return None
@@ -31,12 +73,95 @@ def get_backend_data(endpoint, use_admin=False):
 def post_backend_data(endpoint, data):
     """向后端发送POST请求"""
     try:
-        response = requests.post(f"{BACKEND_URL}{endpoint}", json=data, timeout=2)
+        response = backend.post(f"{BACKEND_URL}{endpoint}", json=data, timeout=2)
         return response.json()
     except:
         return None
 
 
+# 需要缓存最新值的推送事件（新打开的页面连接后立即补发）
+CACHED_EVENTS = ('status_update', 'game_state_update', 'vote_result', 'tournament_update')
+TIME_SYNC_SAMPLES = 3  # 每次时钟同步的握手次数（取往返最短的一次）
+
+
+class BackendRelay:
+    """
+    后端推送中继
+    整个前端进程只保持一条到后端的 Socket.IO 订阅，缓存最新状态并转发给所有浏览器，
+    无论打开多少个主持页面，后端都只有一个推送对象
+    """
+
+    def __init__(self):
+        self.client = socketio_client.Client(reconnection=True)
+        self.client.on('connect', self._on_connect)
+        self.client.on('*', self._relay)  # 转发所有后端事件
+        self.latest = {}  # 事件名 -> 最新数据
+        self.clock_offset = 0.0  # 后端时钟相对本机的偏差（秒）
+        self.lock = threading.Lock()
+        self._started = False
+
+    def start(self):
+        """启动订阅线程（只启动一次）"""
+        with self.lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        failures = 0
+        while True:
+            try:
+                self.client.connect(BACKEND_URL)
+                failures = 0
+                self._sync_clock()
+                self.client.wait()
+            except socketio_client.exceptions.ConnectionError:
+                failures += 1
+            # 断开后稍后重连，后端未启动时按指数退避（带随机抖动）
+            time.sleep(next_delay(None, max(failures, 1)))
+
+    def _sync_clock(self):
+        """与后端做时钟同步握手，记录后端时钟相对本机的偏差"""
+        best_rtt = None
+        for _ in range(TIME_SYNC_SAMPLES):
+            t0 = time.time()
+            try:
+                ack = self.client.call('time_sync', {'client_time': t0}, timeout=2)
+            except socketio_client.exceptions.TimeoutError:
+                continue
+            t1 = time.time()
+            if ack and (best_rtt is None or t1 - t0 < best_rtt):
+                best_rtt = t1 - t0
+                self.clock_offset = ack['server_time'] - (t0 + t1) / 2
+
+    def _on_connect(self):
+        # 完整游戏状态和违禁词通知只推送给主持方频道
+        self.client.emit('join_host', {'token': ADMIN_TOKEN})
+        # 断线期间可能错过推送，连上后拉取一次完整状态
+        data = get_backend_data('/api/game/state', use_admin=True)
+        if data and data.get('code') == 200:
+            self._relay('game_state_update', data.get('data') or {})
+
+    def _relay(self, event, data=None):
+        with self.lock:
+            if event in CACHED_EVENTS:
+                self.latest[event] = data
+            if event == 'status_update' and data and data.get('status') in ('waiting', 'registered', 'word_assigned'):
+                self.latest.pop('vote_result', None)  # 游戏已重置或新一局开始，旧的投票结果作废
+        frontend_socketio.emit(event, data)
+
+    def get(self, event):
+        """获取某个事件的最新缓存（未连接后端时返回None）"""
+        if not self.client.connected:
+            return None
+        with self.lock:
+            return self.latest.get(event)
+
+
+relay = BackendRelay()
+
+
 # HTML模板
 HTML_TEMPLATE = """
 <!DOCTYPE html>
@@ -179,6 +304,10 @@ HTML_TEMPLATE = """
         .description-item.undercover .group-name {
             color: #f44336;
         }
+        .description-item .flag {
+            color: #f44336;
+            font-weight: bold;
+        }
         .round-divider {
             background: linear-gradient(90deg, #4CAF50, #2196F3);
             color: white;
@@ -276,6 +405,54 @@ HTML_TEMPLATE = """
             color: #999;
             font-size: 0.9em;
         }
+        .speaker-network {
+            font-size: 0.9em;
+            opacity: 0.9;
+        }
+        .quality-row {
+            display: flex;
+            align-items: center;
+            gap: 10px;
+            margin: 6px 0;
+        }
+        .quality-row .name {
+            width: 100px;
+            font-weight: bold;
+        }
+        .quality-row .stats {
+            width: 260px;
+            color: #666;
+            font-size: 0.9em;
+        }
+        .quality-row .breakdown {
+            color: #666;
+            font-size: 0.9em;
+        }
+        .heat-cell {
+            display: inline-block;
+            width: 12px;
+            height: 18px;
+            margin-right: 1px;
+            background: #eee;
+        }
+        .outlier-item {
+            background: #f3e5f5;
+            padding: 10px;
+            margin: 10px 0;
+            border-radius: 5px;
+            border-left: 4px solid #9c27b0;
+        }
+        .outlier-item .distance {
+            float: right;
+            color: #666;
+        }
+        .flag-item {
+            background: #ffebee;
+            padding: 10px;
+            margin: 10px 0;
+            border-radius: 5px;
+            border-left: 4px solid #f44336;
+        }
         .vote-result {
             margin-top: 15px;
             padding: 15px;
@@ -336,9 +513,11 @@ HTML_TEMPLATE = """
                 <input type="text" id="civilian-word" placeholder="输入平民词">
             </div>
             <button onclick="startGame()">开始游戏</button>
+            <button onclick="newGame()">下一局（保留队伍）</button>
             <button onclick="startRound()">开始新回合</button>
             <button onclick="processVoting()">处理投票结果</button>
             <button onclick="resetGame()">重置游戏</button>
+            <button onclick="window.open('/api/game/export')">导出比赛记录</button>
         </div>
         
         <!-- 游戏状态 -->
@@ -356,9 +535,12 @@ HTML_TEMPLATE = """
                     <div class="speaker-name" id="current-speaker-name">---</div>
                     <div>剩余时间</div>
                     <div class="speaker-countdown" id="speaker-countdown">--</div>
+                    <div class="speaker-network" id="speaker-network"></div>
                 </div>
                 <div class="speaking-order" id="speaking-order"></div>
             </div>
+            <!-- 各组连接质量：RTT 热力图（旧→新）和最近一次提交的网络/思考耗时 -->
+            <div class="connection-quality" id="connection-quality"></div>
         </div>
         
         <!-- 注册的组 -->
@@ -373,12 +555,24 @@ HTML_TEMPLATE = """
             <div class="descriptions" id="descriptions"></div>
         </div>
         
+        <!-- 语义离群排名 -->
+        <div class="section">
+            <h2>语义离群排名</h2>
+            <div class="outliers" id="outliers"></div>
+        </div>
+        
         <!-- 投票结果 -->
         <div class="section">
             <h2>投票结果</h2>
             <div class="vote-result" id="vote-result"></div>
         </div>
 
+        <!-- 违禁词标记 -->
+        <div class="section">
+            <h2>违禁词标记</h2>
+            <div class="flags" id="flags"></div>
+        </div>
+
         <!-- 异常上报 -->
         <div class="section">
             <h2>异常上报</h2>
@@ -390,32 +584,49 @@ HTML_TEMPLATE = """
             <h2>得分</h2>
             <div class="scores" id="scores"></div>
         </div>
+
+        <!-- 每回合生存表 -->
+        <div class="section">
+            <h2>每回合生存表</h2>
+            <div class="round-tables" id="round-tables"></div>
+        </div>
+
+        <!-- 慢请求追踪 -->
+        <div class="section">
+            <h2>慢请求追踪</h2>
+            <button onclick="loadSlowTraces()">刷新</button>
+            <div class="traces" id="slow-traces"></div>
+        </div>
     </div>
     
     <script src="https://cdn.socket.io/4.7.2/socket.io.min.js"></script>
     <script>
-        // WebSocket 连接
-        const socket = io('http://127.0.0.1:5000');
+        // WebSocket 连接（连接前端服务器，由前端统一订阅后端推送后转发）
+        const socket = io();
         
         // 连接成功
         socket.on('connect', function() {
             console.log('WebSocket 已连接');
+            syncClock();
         });
         
         // 接收状态更新推送
         socket.on('status_update', function(data) {
             console.log('收到状态推送:', data);
-            updateSpeakerPanel(data);
+            timedRender('status', () => updateSpeakerPanel(data));
         });
         
         // 接收完整游戏状态推送
         socket.on('game_state_update', function(data) {
             console.log('收到游戏状态推送:', data);
-            updateStatus(data);
-            updateGroups(data);
-            updateDescriptions(data);
-            updateReports(data);
-            updateScores(data);
+            renderGameState(data);
+        });
+        
+        // 接收违禁词标记推送
+        socket.on('description_flag', function(data) {
+            console.log('收到违禁词标记:', data);
+            const hitWords = (data.hits || []).map(h => h.pattern).join(', ');
+            alert(`⚠️ ${data.group} 的描述包含违禁词：${hitWords}${data.rejected ? '（已拒绝）' : ''}`);
         });
         
         // 接收投票结果推送
@@ -424,32 +635,58 @@ HTML_TEMPLATE = """
             updateVoteResult(data);
         });
         
-        // 断开连接时的处理
+        // 断开连接时的处理（重连后前端服务器会补发最新状态）
         socket.on('disconnect', function() {
-            console.log('WebSocket 已断开，将使用轮询');
+            console.log('WebSocket 已断开，等待重连');
         });
         
-        // 本地倒计时变量
-        let localSpeakerRemaining = null;
-        let localPhaseRemaining = null;
-        let currentStatus = null;
+        // 服务器时钟偏差（秒）：服务器时间 ≈ 本地时间 + clockOffset，由 time_sync 握手测得
+        const TIME_SYNC_SAMPLES = 3;
+        let clockOffset = 0;
+        let bestRtt = Infinity;
         
-        // 本地倒计时（每秒更新）
-        setInterval(function() {
-            if (localSpeakerRemaining !== null && localSpeakerRemaining > 0) {
-                localSpeakerRemaining--;
-                updateCountdownDisplay();
-            }
-            if (localPhaseRemaining !== null && localPhaseRemaining > 0) {
-                localPhaseRemaining--;
+        function syncClock() {
+            bestRtt = Infinity;
+            for (let i = 0; i < TIME_SYNC_SAMPLES; i++) {
+                const t0 = Date.now() / 1000;
+                socket.emit('time_sync', {client_time: t0}, function(ack) {
+                    const t1 = Date.now() / 1000;
+                    // 取往返最短的一次样本，偏差估计最准
+                    if (!ack || t1 - t0 >= bestRtt) return;
+                    bestRtt = t1 - t0;
+                    clockOffset = ack.server_time - (t0 + t1) / 2;
+                });
             }
-        }, 1000);
+        }
+        
+        function serverNow() {
+            return Date.now() / 1000 + clockOffset;
+        }
+        
+        // 倒计时按服务器下发的绝对截止时间在本地计算，不随推送间隔或丢包漂移
+        let speakerDeadline = null;
+        let phaseDeadline = null;
+        let currentStatus = null;
+        
+        function deadlineFrom(deadline, remaining) {
+            if (deadline !== null && deadline !== undefined) return deadline;
+            // 兼容只带剩余秒数的旧状态
+            if (remaining !== null && remaining !== undefined) return serverNow() + remaining;
+            return null;
+        }
+        
+        function secondsLeft(deadline) {
+            return deadline === null ? null : Math.max(0, Math.ceil(deadline - serverNow()));
+        }
+        
+        setInterval(updateCountdownDisplay, 250);
         
         function updateCountdownDisplay() {
             const countdown = document.getElementById('speaker-countdown');
-            if (countdown && localSpeakerRemaining !== null) {
-                countdown.textContent = localSpeakerRemaining + ' 秒';
-                if (localSpeakerRemaining <= 10) {
+            const remaining = secondsLeft(speakerDeadline);
+            if (countdown && remaining !== null) {
+                countdown.textContent = remaining + ' 秒';
+                if (remaining <= 10) {
                     countdown.classList.add('warning');
                 } else {
                     countdown.classList.remove('warning');
@@ -457,32 +694,170 @@ HTML_TEMPLATE = """
             }
         }
         
-        // 备用轮询（WebSocket 断开时使用）
-        setInterval(function() {
-            if (!socket.connected) {
-                updateGameState();
-                updateSpeakerStatusFallback();
-            }
-        }, 2000);
-        
         // 初始加载
         updateGameState();
         
-        function updateSpeakerStatusFallback() {
-            fetch('/api/public/status')
-                .then(response => response.json())
-                .then(resp => {
-                    if (resp && resp.code === 200) {
-                        updateSpeakerPanel(resp.data || {});
+        // 渲染耗时预算（毫秒），超出时在控制台告警；统计数据挂在 window.renderStats 上便于排查
+        const RENDER_BUDGET_MS = 8;
+        window.renderStats = {};
+        
+        function timedRender(name, fn) {
+            const start = performance.now();
+            fn();
+            const cost = performance.now() - start;
+            const stat = window.renderStats[name] || (window.renderStats[name] = {count: 0, total: 0, max: 0, last: 0});
+            stat.count++;
+            stat.total += cost;
+            stat.last = cost;
+            stat.max = Math.max(stat.max, cost);
+            if (cost > RENDER_BUDGET_MS) {
+                console.warn(`渲染 ${name} 耗时 ${cost.toFixed(1)}ms，超出预算 ${RENDER_BUDGET_MS}ms`);
+            }
+        }
+        
+        function renderGameState(data) {
+            timedRender('game_state', function() {
+                updateStatus(data);
+                updateGroups(data);
+                updateDescriptions(data);
+                updateOutliers(data);
+                updateReports(data);
+                updateFlags(data);
+                updateScores(data);
+                updateRoundTables(data);
+            });
+        }
+        
+        function escapeHtml(text) {
+            return String(text ?? '').replace(/[&<>"']/g, ch => ({
+                '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'
+            })[ch]);
+        }
+        
+        function htmlToNode(html) {
+            const tpl = document.createElement('template');
+            tpl.innerHTML = html.trim();
+            return tpl.content.firstElementChild;
+        }
+        
+        // 按 key 增量更新列表：只新建新增的行、只替换内容变化的行、删除消失的行，顺序变化时移动已有节点
+        // items: [{key, html}]，html 为单个元素的标记
+        function patchList(container, items) {
+            if (!container._rows) {
+                container.innerHTML = '';
+                container._rows = new Map();
+            }
+            const rows = container._rows;
+            const seen = new Set();
+            let prev = null;
+            for (const item of items) {
+                seen.add(item.key);
+                let row = rows.get(item.key);
+                if (!row) {
+                    row = {html: item.html, node: htmlToNode(item.html)};
+                    rows.set(item.key, row);
+                } else if (row.html !== item.html) {
+                    const node = htmlToNode(item.html);
+                    if (row.node.parentNode === container) {
+                        container.replaceChild(node, row.node);
                     }
-                })
-                .catch(error => console.error('Error:', error));
+                    row.html = item.html;
+                    row.node = node;
+                }
+                const expected = prev ? prev.nextSibling : container.firstChild;
+                if (row.node !== expected) {
+                    container.insertBefore(row.node, expected);
+                }
+                prev = row.node;
+            }
+            for (const [key, row] of rows) {
+                if (!seen.has(key)) {
+                    row.node.remove();
+                    rows.delete(key);
+                }
+            }
+        }
+        
+        function emptyRow(text) {
+            return [{key: '__empty', html: `<p>${text}</p>`}];
+        }
+        
+        // 各组连接质量（定期拉取），发言面板据此显示当前发言者的网络状况
+        const QUALITY_REFRESH_MS = 5000;
+        let connectionQuality = {};
+        let currentSpeaker = null;
+        
+        function loadConnectionQuality() {
+            fetch('/api/connection/quality')
+            .then(response => response.json())
+            .then(resp => {
+                if (!resp || resp.code !== 200) return;
+                connectionQuality = {};
+                (resp.data.groups || []).forEach(item => { connectionQuality[item.group] = item; });
+                timedRender('connection_quality', function() {
+                    updateConnectionQuality(resp.data);
+                    updateSpeakerNetwork();
+                });
+            })
+            .catch(error => console.error('获取连接质量失败:', error));
+        }
+        
+        loadConnectionQuality();
+        setInterval(loadConnectionQuality, QUALITY_REFRESH_MS);
+        
+        function formatMs(ms) {
+            if (ms === null || ms === undefined) return '--';
+            return ms >= 1000 ? (ms / 1000).toFixed(1) + 's' : Math.round(ms) + 'ms';
+        }
+        
+        function heatColor(rtt) {
+            // 0ms 绿 → 500ms 及以上红
+            return `hsl(${120 - Math.min(rtt, 500) * 120 / 500}, 70%, 50%)`;
+        }
+        
+        function lastSubmission(item) {
+            const last = item.submissions[item.submissions.length - 1];
+            if (!last) return '';
+            const kind = last.kind === 'vote' ? '投票' : '描述';
+            const timeout = last.timeout ? '（超时）' : '';
+            return `上次${kind}${timeout}：共 ${formatMs(last.elapsed_ms)} = 网络 ${formatMs(last.network_ms)} + 思考 ${formatMs(last.think_ms)}`;
+        }
+        
+        function updateConnectionQuality(data) {
+            const container = document.getElementById('connection-quality');
+            patchList(container, (data.groups || []).map(item => {
+                const cells = item.heatmap.map((rtt, i) => {
+                    const age = (data.buckets - 1 - i) * data.bucket_seconds;
+                    return rtt === null
+                        ? `<span class="heat-cell" title="${age}秒前：无样本"></span>`
+                        : `<span class="heat-cell" style="background: ${heatColor(rtt)}" title="${age}秒前：${rtt}ms"></span>`;
+                }).join('');
+                const loss = item.loss_rate === null ? '--' : Math.round(item.loss_rate * 100) + '%';
+                return {key: item.group, html: `
+                    <div class="quality-row">
+                        <span class="name">${item.connected ? '🟢' : '⚪'} ${escapeHtml(item.group)}</span>
+                        <span class="stats">RTT ${formatMs(item.rtt_ms)} · 抖动 ${formatMs(item.jitter_ms)} · 丢包 ${loss} · 重连 ${item.reconnects}</span>
+                        <span>${cells}</span>
+                        <span class="breakdown">${escapeHtml(lastSubmission(item))}</span>
+                    </div>
+                `};
+            }));
+        }
+        
+        function updateSpeakerNetwork() {
+            const line = document.getElementById('speaker-network');
+            const item = currentSpeaker ? connectionQuality[currentSpeaker] : null;
+            if (!item) {
+                line.textContent = '';
+                return;
+            }
+            const loss = item.loss_rate === null ? '--' : Math.round(item.loss_rate * 100) + '%';
+            line.textContent = `${item.connected ? '在线' : '未连接'} · RTT ${formatMs(item.rtt_ms)} · 抖动 ${formatMs(item.jitter_ms)} · 丢包 ${loss}`;
         }
         
         function updateSpeakerPanel(data) {
             const panel = document.getElementById('speaker-panel');
             const speakerName = document.getElementById('current-speaker-name');
-            const countdown = document.getElementById('speaker-countdown');
             const orderDiv = document.getElementById('speaking-order');
             
             // 保存当前状态
@@ -492,32 +867,24 @@ HTML_TEMPLATE = """
                 panel.style.display = 'block';
                 
                 // 当前发言者
-                const current = data.current_speaker || '---';
-                speakerName.textContent = current;
+                speakerName.textContent = data.current_speaker || '---';
+                currentSpeaker = data.current_speaker || null;
+                updateSpeakerNetwork();
                 
-                // 更新本地倒计时（从服务器同步）
-                if (data.speaker_remaining_seconds !== null && data.speaker_remaining_seconds !== undefined) {
-                    localSpeakerRemaining = data.speaker_remaining_seconds;
-                }
-                if (data.remaining_seconds !== null && data.remaining_seconds !== undefined) {
-                    localPhaseRemaining = data.remaining_seconds;
-                }
+                // 更新截止时间
+                speakerDeadline = deadlineFrom(data.speaker_deadline, data.speaker_remaining_seconds);
+                phaseDeadline = deadlineFrom(data.phase_deadline, data.remaining_seconds);
                 
                 // 显示倒计时
                 updateCountdownDisplay();
                 
                 // 发言顺序
-                const order = data.describe_order || [];
                 const currentIdx = data.current_speaker_index || 0;
-                const eliminated = data.eliminated_groups || [];
-                
-                let orderHtml = '';
-                for (let i = 0; i < order.length; i++) {
-                    const name = order[i];
+                const eliminated = new Set(data.eliminated_groups || []);
+                patchList(orderDiv, (data.describe_order || []).map((name, i) => {
                     let badgeClass = 'waiting';
                     let icon = '⬜';
-                    
-                    if (eliminated.includes(name)) {
+                    if (eliminated.has(name)) {
                         badgeClass = 'eliminated';
                         icon = '❌';
                     } else if (i < currentIdx) {
@@ -527,50 +894,44 @@ HTML_TEMPLATE = """
                         badgeClass = 'current';
                         icon = '🎤';
                     }
-                    
-                    orderHtml += `<div class="speaker-badge ${badgeClass}">${icon} ${name}</div>`;
-                }
-                orderDiv.innerHTML = orderHtml;
+                    return {key: name, html: `<div class="speaker-badge ${badgeClass}">${icon} ${escapeHtml(name)}</div>`};
+                }));
                 
             } else if (data.status === 'voting') {
                 panel.style.display = 'block';
                 
                 // 显示投票进度
-                const votedGroups = data.voted_groups || [];
+                const votedGroups = new Set(data.voted_groups || []);
                 const activeGroups = data.active_groups || [];
-                speakerName.textContent = `🗳️ 投票中 (${votedGroups.length}/${activeGroups.length})`;
+                speakerName.textContent = `🗳️ 投票中 (${votedGroups.size}/${activeGroups.length})`;
+                currentSpeaker = null;
+                updateSpeakerNetwork();
                 
-                // 更新本地倒计时
-                if (data.remaining_seconds !== null && data.remaining_seconds !== undefined) {
-                    localSpeakerRemaining = data.remaining_seconds;
-                    localPhaseRemaining = data.remaining_seconds;
-                }
+                // 投票阶段显示阶段截止时间
+                phaseDeadline = deadlineFrom(data.phase_deadline, data.remaining_seconds);
+                speakerDeadline = phaseDeadline;
                 updateCountdownDisplay();
                 
                 // 显示投票状态：谁已投票，谁未投票
-                const order = data.describe_order || [];
-                const eliminated = data.eliminated_groups || [];
-                let orderHtml = '';
-                for (const name of order) {
-                    if (eliminated.includes(name)) {
-                        orderHtml += `<div class="speaker-badge eliminated">❌ ${name}</div>`;
-                    } else if (votedGroups.includes(name)) {
-                        orderHtml += `<div class="speaker-badge done">✅ ${name}</div>`;
+                const eliminated = new Set(data.eliminated_groups || []);
+                patchList(orderDiv, (data.describe_order || []).map(name => {
+                    let html;
+                    if (eliminated.has(name)) {
+                        html = `<div class="speaker-badge eliminated">❌ ${escapeHtml(name)}</div>`;
+                    } else if (votedGroups.has(name)) {
+                        html = `<div class="speaker-badge done">✅ ${escapeHtml(name)}</div>`;
                     } else {
-                        orderHtml += `<div class="speaker-badge waiting">⏳ ${name}</div>`;
+                        html = `<div class="speaker-badge waiting">⏳ ${escapeHtml(name)}</div>`;
                     }
-                }
-                orderDiv.innerHTML = orderHtml;
+                    return {key: name, html};
+                }));
                 
-            } else if (data.status === 'round_end' || data.status === 'game_end') {
-                // 回合结束或游戏结束，停止倒计时并隐藏面板
-                panel.style.display = 'none';
-                localSpeakerRemaining = null;
-                localPhaseRemaining = null;
             } else {
+                // 回合结束、游戏结束或未开始：停止倒计时并隐藏面板
                 panel.style.display = 'none';
-                localSpeakerRemaining = null;
-                localPhaseRemaining = null;
+                currentSpeaker = null;
+                speakerDeadline = null;
+                phaseDeadline = null;
             }
         }
         
@@ -579,12 +940,7 @@ HTML_TEMPLATE = """
                 .then(response => response.json())
                 .then(resp => {
                     if (resp && resp.code === 200) {
-                        const data = resp.data || {};
-                        updateStatus(data);
-                        updateGroups(data);
-                        updateDescriptions(data);
-                        updateReports(data);
-                        updateScores(data);
+                        renderGameState(resp.data || {});
                     } else {
                         console.error('状态刷新失败：', resp ? resp.message : '未知错误');
                     }
@@ -604,152 +960,222 @@ HTML_TEMPLATE = """
                 'game_end': '游戏结束'
             };
             
-            // 获取发言顺序和当前发言人
-            let speakerInfo = '';
+            const items = [
+                {key: 'status', html: `<div class="status-item">状态：${statusMap[data.status] || escapeHtml(data.status)}</div>`},
+                {key: 'game', html: `<div class="status-item">第 ${data.game_number || 1} 局</div>`},
+                {key: 'round', html: `<div class="status-item">当前回合：${data.current_round || 0}</div>`},
+                {key: 'count', html: `<div class="status-item">已注册组数：${Object.keys(data.groups || {}).length}</div>`}
+            ];
+            if (data.undercover_group) {
+                items.push({key: 'undercover', html: `<div class="status-item">卧底组：${escapeHtml(data.undercover_group)}</div>`});
+            }
+            
+            // 发言顺序
             if (data.describe_order && data.describe_order.length > 0) {
-                speakerInfo = `<div class="status-item">发言顺序：${data.describe_order.join(' → ')}</div>`;
+                items.push({key: 'order', html: `<div class="status-item">发言顺序：${data.describe_order.map(escapeHtml).join(' → ')}</div>`});
             }
             
             // 当前发言者
-            let currentSpeakerInfo = '';
             if (data.status === 'describing' && data.current_speaker) {
-                currentSpeakerInfo = `<div class="status-item" style="color: #ff9800; font-weight: bold;">🎤 当前发言：${data.current_speaker}</div>`;
+                items.push({key: 'speaker', html: `<div class="status-item" style="color: #ff9800; font-weight: bold;">🎤 当前发言：${escapeHtml(data.current_speaker)}</div>`});
             }
             
             // 已发言的组
-            let describedInfo = '';
             if (data.described_groups && data.described_groups.length > 0) {
-                describedInfo = `<div class="status-item" style="color: #4caf50;">✅ 已发言：${data.described_groups.join(', ')}</div>`;
+                items.push({key: 'described', html: `<div class="status-item" style="color: #4caf50;">✅ 已发言：${data.described_groups.map(escapeHtml).join(', ')}</div>`});
             }
             
             // 已投票的组
-            let votedInfo = '';
             if (data.status === 'voting' && data.voted_groups && data.voted_groups.length > 0) {
-                const activeCount = data.describe_order ? data.describe_order.filter(g => !data.eliminated_groups?.includes(g)).length : 0;
-                votedInfo = `<div class="status-item" style="color: #2196f3;">🗳️ 已投票：${data.voted_groups.join(', ')} (${data.voted_groups.length}/${activeCount})</div>`;
+                const eliminated = new Set(data.eliminated_groups || []);
+                const activeCount = (data.describe_order || []).filter(g => !eliminated.has(g)).length;
+                items.push({key: 'voted', html: `<div class="status-item" style="color: #2196f3;">🗳️ 已投票：${data.voted_groups.map(escapeHtml).join(', ')} (${data.voted_groups.length}/${activeCount})</div>`});
             }
             
-            statusDiv.innerHTML = `
-                <div class="status-item">状态：${statusMap[data.status] || data.status}</div>
-                <div class="status-item">当前回合：${data.current_round || 0}</div>
-                <div class="status-item">已注册组数：${Object.keys(data.groups || {}).length}</div>
-                ${data.undercover_group ? `<div class="status-item">卧底组：${data.undercover_group}</div>` : ''}
-                ${speakerInfo}
-                ${currentSpeakerInfo}
-                ${describedInfo}
-                ${votedInfo}
-            `;
+            patchList(statusDiv, items);
         }
         
         function updateGroups(data) {
             const groupsList = document.getElementById('groups-list');
-            if (!data.groups) {
-                groupsList.innerHTML = '<p>暂无注册的组</p>';
+            const groups = Object.entries(data.groups || {});
+            if (groups.length === 0) {
+                patchList(groupsList, emptyRow('暂无注册的组'));
                 return;
             }
             
-            let html = '';
-            for (const [name, info] of Object.entries(data.groups)) {
+            patchList(groupsList, groups.map(([name, info]) => {
                 const role = info.role || 'unknown';
                 const eliminated = info.eliminated || false;
-                html += `
+                return {key: name, html: `
                     <div class="group-card ${role} ${eliminated ? 'eliminated' : ''}">
-                        <div><strong>${name}</strong></div>
+                        <div><strong>${escapeHtml(name)}</strong></div>
                         <div>${role === 'undercover' ? '卧底' : role === 'civilian' ? '平民' : '未知'}</div>
                         ${eliminated ? '<div style="color: red;">已淘汰</div>' : ''}
                     </div>
-                `;
-            }
-            groupsList.innerHTML = html;
+                `};
+            }));
         }
         
         function updateDescriptions(data) {
             const descDiv = document.getElementById('descriptions');
             const allDescriptions = data.descriptions || {};
-            const rounds = Object.keys(allDescriptions);
-            if (rounds.length === 0) {
-                descDiv.innerHTML = '<p>暂无描述</p>';
-                return;
-            }
-
-            // 按回合顺序排列（从新到旧）
-            const numericRounds = rounds.map(r => parseInt(r, 10)).sort((a, b) => b - a);
             
-            let html = '';
-            let hasAnyDescription = false;
-            
-            // 显示所有回合的描述
+            // 按回合顺序排列（从新到旧），每个回合分界线和每条描述都是独立的行
+            const numericRounds = Object.keys(allDescriptions).map(r => parseInt(r, 10)).sort((a, b) => b - a);
+            const items = [];
             for (const roundNum of numericRounds) {
                 const roundDescriptions = allDescriptions[roundNum] || [];
-                if (roundDescriptions.length > 0) {
-                    hasAnyDescription = true;
-                    
-                    // 回合分界线
-                    html += `<div class="round-divider">📢 第 ${roundNum} 回合 (${roundDescriptions.length}人发言)</div>`;
-                    
-                    for (const desc of roundDescriptions) {
-                        const time = new Date(desc.time).toLocaleTimeString('zh-CN');
-                        const isUndercover = data.undercover_group && desc.group === data.undercover_group;
-                        html += `
-                            <div class="description-item ${isUndercover ? 'undercover' : ''}">
-                                <div class="group-name">${desc.group} ${isUndercover ? '👤(卧底)' : ''}</div>
-                                <div>${desc.description}</div>
-                                <div class="time">${time}</div>
-                            </div>
-                        `;
-                    }
+                if (roundDescriptions.length === 0) {
+                    continue;
+                }
+                
+                // 回合分界线
+                items.push({key: `r${roundNum}`, html: `<div class="round-divider">📢 第 ${roundNum} 回合 (${roundDescriptions.length}人发言)</div>`});
+                
+                for (const desc of roundDescriptions) {
+                    const time = new Date(desc.time).toLocaleTimeString('zh-CN');
+                    const isUndercover = data.undercover_group && desc.group === data.undercover_group;
+                    items.push({key: `r${roundNum}:${desc.group}`, html: `
+                        <div class="description-item ${isUndercover ? 'undercover' : ''}">
+                            <div class="group-name">${escapeHtml(desc.group)} ${isUndercover ? '👤(卧底)' : ''} ${desc.flagged ? '<span class="flag">⚠️违禁词</span>' : ''}</div>
+                            <div>${escapeHtml(desc.description)}</div>
+                            <div class="time">${time}</div>
+                        </div>
+                    `});
                 }
             }
             
-            if (!hasAnyDescription) {
-                html = '<p>暂无描述</p>';
-            }
-            
-            descDiv.innerHTML = html;
+            patchList(descDiv, items.length > 0 ? items : emptyRow('暂无描述'));
         }
 
         function updateReports(data) {
             const reportsDiv = document.getElementById('reports');
             const reports = data.reports || [];
             if (reports.length === 0) {
-                reportsDiv.innerHTML = '<p>暂无异常上报</p>';
+                patchList(reportsDiv, emptyRow('暂无异常上报'));
                 return;
             }
 
-            const latestReports = reports.slice(-10).reverse();
-            let html = '';
-            for (const report of latestReports) {
+            patchList(reportsDiv, reports.slice(-10).reverse().map(report => {
                 const time = new Date(report.time).toLocaleTimeString('zh-CN');
-                html += `
+                return {key: report.ticket, html: `
                     <div class="report-item">
-                        <div class="ticket">${report.ticket}</div>
-                        <div>组：${report.group}</div>
-                        <div>类型：${report.type}</div>
-                        <div>${report.detail}</div>
+                        <div class="ticket">${escapeHtml(report.ticket)}</div>
+                        <div>组：${escapeHtml(report.group)}</div>
+                        <div>类型：${escapeHtml(report.type)}</div>
+                        <div>${escapeHtml(report.detail)}</div>
                         <div class="time">${time}</div>
                     </div>
-                `;
+                `};
+            }));
+        }
+        
+        function updateOutliers(data) {
+            const outliersDiv = document.getElementById('outliers');
+            const outliers = data.semantic_outliers || [];
+            if (outliers.length === 0) {
+                patchList(outliersDiv, emptyRow('本回合描述不足3条'));
+                return;
             }
-            reportsDiv.innerHTML = html;
+            
+            // 与其他组描述中心的余弦距离，越靠前越可能拿到了不同的词
+            patchList(outliersDiv, outliers.map(item => ({key: item.group, html: `
+                <div class="outlier-item" style="opacity: ${(0.5 + item.distance / 2).toFixed(2)};">
+                    <strong>${item.rank}. ${escapeHtml(item.group)}</strong>
+                    <span class="distance">距离 ${item.distance.toFixed(3)}</span>
+                    <div>${escapeHtml(item.description)}</div>
+                </div>
+            `})));
+        }
+        
+        function updateFlags(data) {
+            const flagsDiv = document.getElementById('flags');
+            const flags = data.flags || [];
+            if (flags.length === 0) {
+                patchList(flagsDiv, emptyRow('暂无违禁词标记'));
+                return;
+            }
+
+            patchList(flagsDiv, flags.map((flag, i) => {
+                const time = new Date(flag.time).toLocaleTimeString('zh-CN');
+                const hitWords = (flag.hits || []).map(h => `${escapeHtml(h.pattern)}(${h.kind})`).join(', ');
+                return {key: `f${i}`, html: `
+                    <div class="flag-item">
+                        <div><strong>第 ${flag.round} 回合 · ${escapeHtml(flag.group)}</strong> ${flag.rejected ? '（已拒绝）' : ''}</div>
+                        <div>${escapeHtml(flag.description)}</div>
+                        <div>命中：${hitWords}</div>
+                        <div class="time">${time}</div>
+                    </div>
+                `};
+            }).reverse());
         }
         
         function updateScores(data) {
             const scoresDiv = document.getElementById('scores');
-            if (!data.scores || Object.keys(data.scores).length === 0) {
-                scoresDiv.innerHTML = '<p>暂无得分</p>';
+            const scores = Object.entries(data.scores || {});
+            if (scores.length === 0) {
+                patchList(scoresDiv, emptyRow('暂无得分'));
                 return;
             }
             
-            let html = '';
-            for (const [group, score] of Object.entries(data.scores)) {
-                html += `
-                    <div class="score-card">
-                        <div>${group}</div>
-                        <div class="score-value">${score}</div>
-                    </div>
-                `;
+            const items = scores.map(([group, score]) => ({key: group, html: `
+                <div class="score-card">
+                    <div>${escapeHtml(group)}</div>
+                    <div class="score-value">${score}</div>
+                </div>
+            `}));
+            // 系列赛累计得分（第二局起显示）
+            if ((data.game_number || 1) > 1) {
+                const series = Object.entries(data.series_scores || {}).sort((a, b) => b[1] - a[1]);
+                items.push({key: '__series__', html: `<div class="score-card"><div>系列赛累计（${data.game_number} 局）</div><div>${series.map(([group, score]) => escapeHtml(group) + ' ' + score).join('，')}</div></div>`});
             }
-            scoresDiv.innerHTML = html;
+            patchList(scoresDiv, items);
+        }
+        
+        function updateRoundTables(data) {
+            const tablesDiv = document.getElementById('round-tables');
+            const roundTables = data.round_tables || [];
+            if (roundTables.length === 0) {
+                patchList(tablesDiv, emptyRow('暂无回合记录'));
+                return;
+            }
+            
+            const ledger = data.elimination_ledger || {};
+            patchList(tablesDiv, roundTables.slice().reverse().map(row => {
+                const cells = Object.entries(row.scores).map(([group, score]) => {
+                    const out = ledger[group] && ledger[group].round <= row.round;
+                    return `<span class="speaker-badge ${out ? 'eliminated' : 'done'}">${escapeHtml(group)}：生存${row.survival[group]}轮 / ${score}分</span>`;
+                }).join(' ');
+                return {key: `t${row.round}`, html: `<div class="vote-item">第 ${row.round} 回合：${cells}</div>`};
+            }));
+        }
+        
+        function loadSlowTraces() {
+            fetch('/api/traces/slow')
+            .then(response => response.json())
+            .then(resp => {
+                const tracesDiv = document.getElementById('slow-traces');
+                const traces = (resp.data && resp.data.traces) || [];
+                if (traces.length === 0) {
+                    patchList(tracesDiv, emptyRow(`暂无超过 ${resp.data ? resp.data.threshold_ms : ''}ms 的请求`));
+                    return;
+                }
+                // 每段耗时按占总耗时的比例显示（proxy 为前端转发，backend_ 开头的为后端各段）
+                patchList(tracesDiv, traces.map(trace => {
+                    const spans = Object.entries(trace.spans).map(([name, ms]) =>
+                        `<span class="speaker-badge" title="${ms}ms">${escapeHtml(name)} ${ms}ms（${Math.round(ms * 100 / trace.total_ms)}%）</span>`
+                    ).join(' ');
+                    return {key: trace.trace_id, html: `
+                        <div class="vote-item">
+                            <strong>${escapeHtml(trace.method)} ${escapeHtml(trace.path)}</strong>
+                            → ${trace.status}，共 ${trace.total_ms}ms
+                            <span class="time">${new Date(trace.time).toLocaleTimeString('zh-CN')} · ${trace.trace_id}</span>
+                            <div>${spans}</div>
+                        </div>
+                    `};
+                }));
+            })
+            .catch(error => console.error('获取慢请求失败:', error));
         }
         
         function updateVoteResult(data) {
@@ -758,18 +1184,18 @@ HTML_TEMPLATE = """
             
             // 显示提示信息
             if (data.message) {
-                html += `<div class="vote-item" style="font-size: 1.2em; padding: 10px; background: #e3f2fd; border-radius: 5px; margin-bottom: 10px;">${data.message}</div>`;
+                html += `<div class="vote-item" style="font-size: 1.2em; padding: 10px; background: #e3f2fd; border-radius: 5px; margin-bottom: 10px;">${escapeHtml(data.message)}</div>`;
             }
             
             // 得票统计
             html += '<div class="vote-item"><strong>📊 得票统计：</strong></div>';
             for (const [group, votes] of Object.entries(data.vote_count || {})) {
-                html += `<div class="vote-item">${group}: ${votes}票</div>`;
+                html += `<div class="vote-item">${escapeHtml(group)}: ${votes}票</div>`;
             }
             
             // 淘汰信息
             if (data.eliminated && data.eliminated.length > 0) {
-                html += `<div class="vote-item" style="color: red; font-weight: bold;">💀 淘汰：${data.eliminated.join(', ')}</div>`;
+                html += `<div class="vote-item" style="color: red; font-weight: bold;">💀 淘汰：${data.eliminated.map(escapeHtml).join(', ')}</div>`;
             }
             
             // 游戏结束信息
@@ -780,24 +1206,21 @@ HTML_TEMPLATE = """
                 // 揭示卧底身份和词语
                 if (data.undercover_group) {
                     html += `<div class="vote-item" style="background: #fff3e0; padding: 10px; border-radius: 5px; margin-top: 10px;">`;
-                    html += `<div style="font-weight: bold;">🎭 卧底是：${data.undercover_group}</div>`;
-                    html += `<div>卧底词：<strong>${data.undercover_word || '???'}</strong></div>`;
-                    html += `<div>平民词：<strong>${data.civilian_word || '???'}</strong></div>`;
+                    html += `<div style="font-weight: bold;">🎭 卧底是：${escapeHtml(data.undercover_group)}</div>`;
+                    html += `<div>卧底词：<strong>${escapeHtml(data.undercover_word || '???')}</strong></div>`;
+                    html += `<div>平民词：<strong>${escapeHtml(data.civilian_word || '???')}</strong></div>`;
                     html += `</div>`;
                 }
                 
-                // 显示最终得分
+                // 显示最终得分（按分数排序，名次直接取排序后的下标）
                 if (data.final_scores && Object.keys(data.final_scores).length > 0) {
                     html += `<div class="vote-item" style="margin-top: 10px;"><strong>🏆 最终得分：</strong></div>`;
-                    // 按分数排序
+                    const medals = ['🥇', '🥈', '🥉'];
                     const sortedScores = Object.entries(data.final_scores).sort((a, b) => b[1] - a[1]);
-                    for (const [group, score] of sortedScores) {
+                    sortedScores.forEach(([group, score], rank) => {
                         const isUndercover = group === data.undercover_group;
-                        const medal = sortedScores.indexOf(sortedScores.find(s => s[0] === group)) === 0 ? '🥇' : 
-                                      sortedScores.indexOf(sortedScores.find(s => s[0] === group)) === 1 ? '🥈' : 
-                                      sortedScores.indexOf(sortedScores.find(s => s[0] === group)) === 2 ? '🥉' : '';
-                        html += `<div class="vote-item" style="color: ${isUndercover ? '#f44336' : '#333'};">${medal} ${group}${isUndercover ? '(卧底)' : ''}: ${score}分</div>`;
-                    }
+                        html += `<div class="vote-item" style="color: ${isUndercover ? '#f44336' : '#333'};">${medals[rank] || ''} ${escapeHtml(group)}${isUndercover ? '(卧底)' : ''}: ${score}分</div>`;
+                    });
                 }
             }
             
@@ -835,6 +1258,38 @@ HTML_TEMPLATE = """
             });
         }
         
+        function newGame() {
+            const undercoverWord = document.getElementById('undercover-word').value;
+            const civilianWord = document.getElementById('civilian-word').value;
+            
+            if (!undercoverWord || !civilianWord) {
+                alert('请输入下一局的卧底词和平民词');
+                return;
+            }
+            
+            fetch('/api/game/new', {
+                method: 'POST',
+                headers: {'Content-Type': 'application/json'},
+                body: JSON.stringify({
+                    undercover_word: undercoverWord,
+                    civilian_word: civilianWord
+                })
+            })
+            .then(response => response.json())
+            .then(resp => {
+                if (resp && resp.code === 200) {
+                    alert(resp.message || '下一局已开始！');
+                    document.getElementById('vote-result').innerHTML = '';
+                    updateGameState();
+                } else {
+                    alert('错误：' + (resp ? resp.message : '后端无响应'));
+                }
+            })
+            .catch(error => {
+                alert('请求失败：' + error);
+            });
+        }
+        
         function startRound() {
             fetch('/api/game/round/start', {
                 method: 'POST',
@@ -887,10 +1342,10 @@ HTML_TEMPLATE = """
                     const voteDiv = document.getElementById('vote-result');
                     let html = '<div class="vote-item">得票统计：</div>';
                     for (const [group, votes] of Object.entries(data.vote_count || {})) {
-                        html += `<div class="vote-item">${group}: ${votes}票</div>`;
+                        html += `<div class="vote-item">${escapeHtml(group)}: ${votes}票</div>`;
                     }
                     if (data.eliminated && data.eliminated.length > 0) {
-                        html += `<div class="vote-item" style="color: red;">淘汰：${data.eliminated.join(', ')}</div>`;
+                        html += `<div class="vote-item" style="color: red;">淘汰：${data.eliminated.map(escapeHtml).join(', ')}</div>`;
                     }
                     voteDiv.innerHTML = html;
                     
@@ -934,21 +1389,81 @@ HTML_TEMPLATE = """
 @frontend_app.route('/')
 def index():
     """主页面"""
+    relay.start()
     return render_template_string(HTML_TEMPLATE)
 
 
+@frontend_socketio.on('connect')
+def handle_browser_connect():
+    """浏览器连接时补发缓存的最新状态"""
+    relay.start()
+    for event in CACHED_EVENTS:
+        data = relay.get(event)
+        if data is not None:
+            emit(event, data)
+
+
+@frontend_socketio.on('time_sync')
+def handle_time_sync(data):
+    """浏览器时钟同步握手：按后端时钟回复（本机时间 + 与后端的偏差）"""
+    client_time = data.get('client_time') if isinstance(data, dict) else None
+    return {'client_time': client_time, 'server_time': time.time() + relay.clock_offset}
+
+
 @frontend_app.route('/api/game/state')
 def api_game_state():
-    """代理后端API"""
+    """代理后端API（已订阅后端推送时直接返回缓存；查询历史版本时转发）"""
+    from flask import request
+    if request.args.get('version'):
+        response = backend.get(f"{BACKEND_URL}/api/game/state", params={'version': request.args['version']},
+                                headers=ADMIN_HEADERS, timeout=2)
+        return jsonify(response.json()), response.status_code
+    cached = relay.get('game_state_update')
+    if cached is not None:
+        return jsonify({"code": 200, "message": "ok", "data": cached})
     data = get_backend_data('/api/game/state', use_admin=True)
     if data is None:
         return jsonify({"code": 500, "message": "后端状态接口无响应", "data": {}}), 500
     return jsonify(data)
 
 
+@frontend_app.route('/api/connection/quality')
+def api_connection_quality():
+    """代理后端API"""
+    data = get_backend_data('/api/connection/quality', use_admin=True)
+    if data is None:
+        return jsonify({"code": 500, "message": "后端连接质量接口无响应", "data": {}}), 500
+    return jsonify(data)
+
+
+@frontend_app.route('/api/traces/slow')
+def api_slow_traces():
+    """前端记录的慢请求（含代理耗时和并入的后端各段耗时），最新的在前"""
+    return jsonify({"code": 200, "message": "ok",
+                    "data": {'threshold_ms': trace_store.threshold_ms, 'traces': trace_store.list()}})
+
+
+@frontend_app.route('/api/game/export')
+def api_export_game():
+    """代理后端比赛记录导出（流式转发NDJSON）"""
+    try:
+        response = backend.get(f"{BACKEND_URL}/api/game/export", headers=ADMIN_HEADERS, stream=True, timeout=2)
+    except requests.RequestException:
+        return jsonify({"code": 500, "message": "后端导出接口无响应", "data": {}}), 500
+    return Response(
+        response.iter_content(chunk_size=None),
+        status=response.status_code,
+        mimetype='application/x-ndjson',
+        headers={'Content-Disposition': 'attachment; filename=match.ndjson'}
+    )
+
+
 @frontend_app.route('/api/public/status')
 def api_public_status():
-    """代理后端公开状态API（获取发言者和倒计时）"""
+    """代理后端公开状态API（获取发言者和倒计时，已订阅后端推送时直接返回缓存）"""
+    cached = relay.get('status_update')
+    if cached is not None:
+        return jsonify({"code": 200, "message": "ok", "data": cached})
     data = get_backend_data('/api/status', use_admin=False)
     if data is None:
         return jsonify({"code": 500, "message": "后端状态接口无响应", "data": {}}), 500
@@ -960,7 +1475,7 @@ def api_start_game():
     """代理后端API"""
     from flask import request
     data = request.json
-    response = requests.post(
+    response = backend.post(
         f"{BACKEND_URL}/api/game/start",
         json=data,
         headers=ADMIN_HEADERS,
@@ -969,10 +1484,24 @@ def api_start_game():
     return jsonify(response.json()), response.status_code
 
 
+@frontend_app.route('/api/game/new', methods=['POST'])
+def api_new_game():
+    """代理后端API（系列赛下一局）"""
+    from flask import request
+    data = request.json
+    response = backend.post(
+        f"{BACKEND_URL}/api/game/new",
+        json=data,
+        headers=ADMIN_HEADERS,
+        timeout=2
+    )
+    return jsonify(response.json()), response.status_code
+
+
 @frontend_app.route('/api/game/round/start', methods=['POST'])
 def api_start_round():
     """代理后端API"""
-    response = requests.post(
+    response = backend.post(
         f"{BACKEND_URL}/api/game/round/start",
         headers=ADMIN_HEADERS,
         timeout=2
@@ -983,7 +1512,7 @@ def api_start_round():
 @frontend_app.route('/api/game/voting/process', methods=['POST'])
 def api_process_voting():
     """代理后端API"""
-    response = requests.post(
+    response = backend.post(
         f"{BACKEND_URL}/api/game/voting/process",
         headers=ADMIN_HEADERS,
         timeout=2
@@ -994,7 +1523,7 @@ def api_process_voting():
 @frontend_app.route('/api/game/reset', methods=['POST'])
 def api_reset_game():
     """代理后端API"""
-    response = requests.post(
+    response = backend.post(
         f"{BACKEND_URL}/api/game/reset",
         headers=ADMIN_HEADERS,
         timeout=2
@@ -1006,10 +1535,11 @@ if __name__ == '__main__':
     print("=" * 50)
     print("前端界面服务器启动中...")
     print("访问地址: http://127.0.0.1:5001")
+    print(f"后端地址: {BACKEND_URL}")
     print("=" * 50)
     print("注意：请确保后端服务器(backend.py)已启动")
     print("=" * 50)
     
-    # 前端服务器运行在5001端口
-    frontend_app.run(host='0.0.0.0', port=5001, debug=True)
+    # 前端服务器运行在5001端口，浏览器推送由前端统一中继
+    frontend_socketio.run(frontend_app, host='0.0.0.0', port=5001, debug=True, allow_unsafe_werkzeug=True)
 
@@ -2,10 +2,16 @@
 游戏逻辑模块
 负责游戏状态管理、投票判定、得分计算等核心逻辑
 """
+import functools
 import random
-from typing import Dict, List, Optional, Tuple
-from datetime import datetime, timedelta
+import sys
+import time
+from array import array
+from typing import Callable, Dict, List, Optional, Tuple
+from datetime import datetime
 from enum import Enum
+from state_history import Appended
+from word_filter import WordFilter, get_filter
 
 
 # 配置常量
@@ -13,6 +19,37 @@ MAX_GROUPS = 5  # 最大组数
 DESCRIBE_TIMEOUT = 180  # 描述阶段总超时时间（秒）
 VOTE_TIMEOUT = 120  # 投票阶段超时时间（秒）
 SPEAKER_TIMEOUT = 30  # 每个人发言超时时间（秒）
+FORBIDDEN_WORD_ACTION = "flag"  # 描述中出现词语本体时的处理方式："flag" 标记并通知主持方 / "reject" 拒绝提交
+NO_VOTE = -1  # 投票数组中"尚未投票"的占位值
+
+# get_game_state() 的各项；历史版本按命令改动的项增量更新
+STATE_FIELDS = ("status", "groups", "undercover_group", "current_round", "describe_order", "current_speaker",
+                "current_speaker_index", "described_groups", "voted_groups", "eliminated_groups",
+                "elimination_ledger", "round_tables", "scores", "descriptions", "votes", "reports", "flags",
+                "game_number", "series_scores")
+DERIVED_FIELDS = ("undercover_group", "current_speaker", "described_groups", "voted_groups")  # 由其他项推导，每个版本重算
+APPEND_ONLY_FIELDS = ("eliminated_groups", "round_tables", "reports", "flags")  # 一局之内只追加的列表
+ALL_FIELDS = ()  # 标记"整个状态都变了"（换局、重置）
+
+# 单调时钟的基准：启动时的墙上时间，之后只按 time.monotonic() 累加，不受系统对时影响
+_WALL_ANCHOR = time.time()
+_MONO_ANCHOR = time.monotonic()
+
+
+def monotonic_clock() -> float:
+    """默认时钟：单调递增的浮点时间戳（秒，可换算为日期）"""
+    return _WALL_ANCHOR + (time.monotonic() - _MONO_ANCHOR)
+
+
+def format_time(timestamp: Optional[float]) -> Optional[str]:
+    """
+    把时间戳格式化为ISO字符串（只在序列化时调用，内存中一律保存浮点时间戳）
+    :param timestamp: 时间戳（秒）
+    :return: ISO格式时间，为空时返回 None
+    """
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp).isoformat()
 
 
 class GameStatus(Enum):
@@ -26,11 +63,106 @@ class GameStatus(Enum):
     GAME_END = "game_end"  # 游戏结束
 
 
+def command(record: bool = True):
+    """
+    游戏命令装饰器
+    命令执行期间冻结时钟（同一条命令内读到的时间完全一致），并把命令交给记录器，
+    这样用相同的随机种子和记录下的时间即可逐位复现整局游戏；命令改动了状态时（见 _touch）版本加1，
+    开启历史版本时只按改动的路径更新出新版本。被拒绝或没有改动的命令不产生新版本
+    :param record: 是否记录该命令
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self._command_time is not None:
+                # 嵌套调用（如批量注册）沿用外层命令的时间，且不重复记录
+                return method(self, *args, **kwargs)
+            self._command_time = self.clock()
+            try:
+                result = method(self, *args, **kwargs)
+                if record and self.recorder is not None:
+                    self.recorder.record(method.__name__, args, kwargs, self._command_time, result)
+                return result
+            finally:
+                self._command_time = None
+                if self._changed:
+                    self.version += 1
+                    if self.history is not None:
+                        self.history.record(self.version, method.__name__, self._state_changes(),
+                                            self._history_state)
+                    self._changed = set()
+        return wrapper
+    return decorator
+
+
+class GroupRecord:
+    """组信息（__slots__ 记录，比字典省内存）"""
+    __slots__ = ("gid", "name", "role", "word", "registered_at")
+
+    def __init__(self, gid: int, name: str, registered_at: float):
+        self.gid = gid  # 整数编号（注册顺序），投票数组以它为下标
+        self.name = name
+        self.role: Optional[str] = None  # "undercover" 或 "civilian"
+        self.word = ""
+        self.registered_at = registered_at  # 注册时间戳
+
+    def to_dict(self) -> Dict:
+        """序列化为接口使用的字典"""
+        return {
+            "name": self.name,
+            "role": self.role,
+            "word": self.word,
+            "registered_time": format_time(self.registered_at)
+        }
+
+
+class DescriptionRecord:
+    """一条描述（__slots__ 记录）"""
+    __slots__ = ("group", "description", "time", "timeout", "flagged")
+
+    def __init__(self, group: str, description: str, submitted_at: float, timeout: bool, flagged: bool):
+        self.group = group
+        self.description = description
+        self.time = submitted_at  # 提交时间戳
+        self.timeout = timeout  # 是否超时提交
+        self.flagged = flagged  # 是否包含违禁词
+
+    def to_dict(self) -> Dict:
+        """序列化为接口使用的字典"""
+        return {
+            "group": self.group,
+            "description": self.description,
+            "time": format_time(self.time),
+            "timeout": self.timeout,
+            "flagged": self.flagged
+        }
+
+
 class GameLogic:
     """游戏逻辑核心类"""
     
-    def __init__(self):
-        self.groups: Dict[str, Dict] = {}  # 组名 -> 组信息
+    def __init__(self, seed: Optional[int] = None, clock: Optional[Callable[[], float]] = None,
+                 recorder=None, history=None):
+        """
+        :param seed: 随机种子，为空时随机生成（可从 self.seed 读取以便复现）
+        :param clock: 时钟函数，返回浮点时间戳（秒），默认 monotonic_clock
+        :param recorder: 命令记录器（见 replay.CommandRecorder），为空时不记录
+        :param history: 状态历史（见 state_history.StateHistory），为空时不保存历史版本
+        """
+        self.seed = seed if seed is not None else random.SystemRandom().randrange(2 ** 32)
+        self._draws = 0  # 已进行的随机抽取次数（与种子一起派生每次抽取的随机数生成器）
+        self.clock = clock or monotonic_clock
+        self.recorder = recorder
+        self.history = history
+        self._command_time: Optional[float] = None  # 当前命令冻结的时间
+        self.version = 0  # 状态版本（改动状态的命令执行后递增，用于缓存失效）
+        self._changed = set()  # 当前命令改动的状态路径，如 ("reports",)、("descriptions", 回合)
+        self._view_cache: Dict[str, Dict] = {}  # 各组视图缓存 {组名: 视图}（不含剩余时间）
+        self._view_version = -1  # 视图缓存对应的状态版本
+        if recorder is not None:
+            recorder.start(self.seed)
+        self.groups: Dict[str, GroupRecord] = {}  # 组名 -> 组信息
+        self.group_names: List[str] = []  # 组编号 -> 组名
         self.game_status = GameStatus.WAITING
         self.undercover_group: Optional[str] = None  # 卧底组名
         self.undercover_word: str = ""  # 卧底词
@@ -38,15 +170,83 @@ class GameLogic:
         self.current_round = 0  # 当前回合数
         self.describe_order: List[str] = []  # 描述顺序
         self.current_speaker_index: int = 0  # 当前发言者索引
-        self.descriptions: Dict[int, List[Dict]] = {}  # 每回合的描述 {round: [{group, desc, time}]}
-        self.votes: Dict[int, Dict[str, str]] = {}  # 每回合的投票 {round: {voter: target}}
+        self.descriptions: Dict[int, List[DescriptionRecord]] = {}  # 每回合的描述 {round: [DescriptionRecord]}
+        self.votes: Dict[int, array] = {}  # 每回合的投票 {round: array[投票者编号] = 被投者编号}
         self.eliminated_groups: List[str] = []  # 已淘汰的组
+        self.elimination_ledger: Dict[str, Dict] = {}  # 淘汰记录 {group: {round, reason}}
+        self.round_tables: List[Dict] = []  # 每回合结束时的生存/得分表
         self.scores: Dict[str, int] = {}  # 得分 {group: score}
         self.reports: List[Dict] = []  # 异常上报记录
         self.last_vote_result: Optional[Dict] = None  # 最近一次投票结果
-        self.phase_deadline: Optional[datetime] = None  # 当前阶段截止时间
-        self.speaker_deadline: Optional[datetime] = None  # 当前发言者截止时间
-        
+        self.vote_results: List[Dict] = []  # 历次投票结果
+        self.phase_deadline: Optional[float] = None  # 当前阶段截止时间戳
+        self.speaker_deadline: Optional[float] = None  # 当前发言者截止时间戳
+        self.word_filter: Optional[WordFilter] = None  # 违禁词自动机（每局开始时获取，同词房间共享）
+        self.flags: List[Dict] = []  # 违禁词标记记录
+        self.game_number = 1  # 系列赛中的第几局
+        self.series_scores: Dict[str, int] = {}  # 系列赛累计得分（每局结束时累加）
+        self.archived_games: List[Dict] = []  # 已归档的往局记录
+        
+    def _now(self) -> float:
+        """当前时间戳（命令执行期间为冻结的命令时间）"""
+        return self._command_time or self.clock()
+
+    def _rng(self) -> random.Random:
+        """
+        本次抽取使用的随机数生成器
+        由 (种子, 抽取序号) 派生，用完即弃，房间不必常驻约2.5KB的 Mersenne Twister 状态
+        """
+        self._draws += 1
+        return random.Random(f"{self.seed}:{self._draws}")
+
+    def _touch(self, *paths):
+        """
+        记下当前命令改动的状态路径（get_game_state 中的项，或 ("descriptions"/"votes", 回合)）
+        :param paths: 路径元组或单个项名；ALL_FIELDS 表示整个状态都变了
+        """
+        self._changed.update(path if isinstance(path, tuple) else (path,) for path in paths)
+
+    def _state_changes(self) -> Optional[Dict[tuple, object]]:
+        """
+        本条命令改动的路径及其新值，整个状态都变了时为None
+        只追加的列表以 Appended 交给历史版本，只追加新元素；推导项每个版本重算（只与组数有关）
+        """
+        if ALL_FIELDS in self._changed:
+            return None
+        changes = {}
+        for path in self._changed:
+            key = path[0]
+            if len(path) == 2:
+                round_num = path[1]
+                changes[path] = [d.to_dict() for d in self.descriptions[round_num]] \
+                    if key == "descriptions" else self.round_votes(round_num)
+            elif key in APPEND_ONLY_FIELDS:
+                changes[path] = Appended(getattr(self, key))
+            else:
+                changes[path] = self._state_field(key)
+        for key in DERIVED_FIELDS:
+            changes[(key,)] = self._state_field(key)
+        return changes
+
+    def _history_state(self) -> Dict:
+        """历史版本整体重建时使用的完整状态（不含版本号）"""
+        return {key: self._state_field(key) for key in STATE_FIELDS}
+
+    def round_votes(self, round_num: int) -> Dict[str, str]:
+        """
+        某回合的投票（按组编号顺序）
+        :return: {投票者: 被投者}
+        """
+        names = self.group_names
+        return {names[voter]: names[target]
+                for voter, target in enumerate(self.votes.get(round_num, ())) if target != NO_VOTE}
+
+    def voted_groups_of(self, round_num: int) -> List[str]:
+        """某回合已投票的组"""
+        names = self.group_names
+        return [names[voter] for voter, target in enumerate(self.votes.get(round_num, ())) if target != NO_VOTE]
+    
+    @command()
     def register_group(self, group_name: str) -> bool:
         """
         注册游戏组
@@ -58,51 +258,83 @@ class GameLogic:
         if len(self.groups) >= MAX_GROUPS:
             return False
         
-        self.groups[group_name] = {
-            "name": group_name,
-            "role": None,  # "undercover" 或 "civilian"
-            "word": "",
-            "registered_time": datetime.now().isoformat()
-        }
+        # 组名驻留后，描述、投票结果等各处引用的都是同一个字符串对象
+        group_name = sys.intern(group_name)
+        self.groups[group_name] = GroupRecord(len(self.group_names), group_name, self._now())
+        self.group_names.append(group_name)
         
         if len(self.groups) > 0:
             self.game_status = GameStatus.REGISTERED
+        self._touch("groups", "status")
         
         return True
     
-    def start_game(self, undercover_word: str, civilian_word: str) -> bool:
+    @command()
+    def register_groups(self, group_names: List[str]) -> Tuple[bool, str]:
+        """
+        批量注册游戏组（要么全部成功，要么全部不注册）
+        :param group_names: 组名列表
+        :return: (是否成功, 消息)
+        """
+        if not group_names:
+            return False, "组名列表不能为空"
+        if len(set(group_names)) != len(group_names):
+            return False, "组名列表中有重复"
+        existing = [name for name in group_names if name in self.groups]
+        if existing:
+            return False, f"组名已存在：{', '.join(existing)}"
+        if len(self.groups) + len(group_names) > MAX_GROUPS:
+            return False, f"超过最大组数({MAX_GROUPS}组)"
+        
+        for group_name in group_names:
+            self.register_group(group_name)
+        return True, "注册成功"
+    
+    @command()
+    def start_game(self, undercover_word: str, civilian_word: str,
+                   variants: Optional[Dict[str, List[str]]] = None,
+                   undercover_group: Optional[str] = None) -> bool:
         """
         开始游戏，分配身份和词语
         :param undercover_word: 卧底词
         :param civilian_word: 平民词
+        :param variants: 违禁词变体 {词语: [变体写法...]}，可选
+        :param undercover_group: 指定卧底组（锦标赛轮换用），为空时随机选择
         :return: 是否成功开始
         """
         if len(self.groups) < 3:  # 至少3组才能开始
             return False
         if self.game_status != GameStatus.REGISTERED:
             return False
+        if undercover_group is not None and undercover_group not in self.groups:
+            return False
         
         self.undercover_word = undercover_word
         self.civilian_word = civilian_word
+        # 违禁词自动机只读，词语和变体相同的房间共享同一个
+        self.word_filter = get_filter([undercover_word, civilian_word], variants)
         
         # 随机选择卧底
-        group_names = list(self.groups.keys())
-        self.undercover_group = random.choice(group_names)
+        group_names = self.group_names
+        self.undercover_group = self.groups[undercover_group].name if undercover_group else self._rng().choice(group_names)
         
         # 分配身份和词语
         for group_name in group_names:
+            info = self.groups[group_name]
             if group_name == self.undercover_group:
-                self.groups[group_name]["role"] = "undercover"
-                self.groups[group_name]["word"] = undercover_word
+                info.role = "undercover"
+                info.word = undercover_word
             else:
-                self.groups[group_name]["role"] = "civilian"
-                self.groups[group_name]["word"] = civilian_word
+                info.role = "civilian"
+                info.word = civilian_word
         
         self.current_round = 1
         self.scores = {group_name: 0 for group_name in group_names}
         self.game_status = GameStatus.WORD_ASSIGNED
+        self._touch("groups", "current_round", "scores", "status")
         return True
     
+    @command()
     def start_round(self) -> List[str]:
         """
         开始新回合，随机排序
@@ -112,30 +344,33 @@ class GameLogic:
             return []
         
         # 获取未淘汰的组
-        active_groups = [g for g in self.groups.keys() if g not in self.eliminated_groups]
+        active_groups = [g for g in self.group_names if g not in self.eliminated_groups]
         if len(active_groups) < 2:
             return []
         
         # 随机排序
         self.describe_order = active_groups.copy()
-        random.shuffle(self.describe_order)
+        self._rng().shuffle(self.describe_order)
         
         # 初始化本回合的描述和投票
         self.descriptions[self.current_round] = []
-        self.votes[self.current_round] = {}
+        self.votes[self.current_round] = array("b", [NO_VOTE]) * len(self.group_names)
         
         # 重置发言者索引
         self.current_speaker_index = 0
         
         # 设置描述阶段截止时间
-        self.phase_deadline = datetime.now() + timedelta(seconds=DESCRIBE_TIMEOUT)
+        self.phase_deadline = self._now() + DESCRIBE_TIMEOUT
         
         # 设置第一个发言者的截止时间
-        self.speaker_deadline = datetime.now() + timedelta(seconds=SPEAKER_TIMEOUT)
+        self.speaker_deadline = self._now() + SPEAKER_TIMEOUT
         
         self.game_status = GameStatus.DESCRIBING
+        self._touch("describe_order", ("descriptions", self.current_round), ("votes", self.current_round),
+                    "current_speaker_index", "status")
         return self.describe_order
     
+    @command()
     def submit_description(self, group_name: str, description: str) -> Tuple[bool, str]:
         """
         提交描述
@@ -152,7 +387,7 @@ class GameLogic:
         
         # 检查是否已经提交过
         for desc in self.descriptions.get(self.current_round, []):
-            if desc["group"] == group_name:
+            if desc.group == group_name:
                 return False, "该组已提交过描述"
         
         # 检查是否轮到该组发言
@@ -160,37 +395,52 @@ class GameLogic:
         if current_speaker != group_name:
             return False, f"请等待，当前应由 {current_speaker} 发言"
         
+        # 检查是否说出词语本体
+        hits = self.word_filter.check(description) if self.word_filter else []
+        if hits:
+            rejected = FORBIDDEN_WORD_ACTION == "reject"
+            self.flags.append({
+                "round": self.current_round,
+                "group": group_name,
+                "description": description,
+                "hits": hits,
+                "rejected": rejected,
+                "time": format_time(self._now())
+            })
+            self._touch("flags")
+            if rejected:
+                return False, "描述中包含违禁词，请重新描述"
+        
         # 检查是否超时
         is_timeout = False
-        if self.speaker_deadline and datetime.now() > self.speaker_deadline:
+        if self.speaker_deadline and self._now() > self.speaker_deadline:
             is_timeout = True
         
-        self.descriptions[self.current_round].append({
-            "group": group_name,
-            "description": description,
-            "time": datetime.now().isoformat(),
-            "timeout": is_timeout  # 标记是否超时提交
-        })
+        self.descriptions[self.current_round].append(
+            DescriptionRecord(self.groups[group_name].name, description, self._now(), is_timeout, bool(hits)))
         
         # 移动到下一个发言者
         self.current_speaker_index += 1
+        self._touch(("descriptions", self.current_round), "current_speaker_index")
         
         # 设置下一个发言者的截止时间
-        self.speaker_deadline = datetime.now() + timedelta(seconds=SPEAKER_TIMEOUT)
+        self.speaker_deadline = self._now() + SPEAKER_TIMEOUT
         
         # 检查是否所有人都提交了
         active_groups = [g for g in self.describe_order if g not in self.eliminated_groups]
         if len(self.descriptions[self.current_round]) >= len(active_groups):
             # 设置投票阶段截止时间
-            self.phase_deadline = datetime.now() + timedelta(seconds=VOTE_TIMEOUT)
+            self.phase_deadline = self._now() + VOTE_TIMEOUT
             self.speaker_deadline = None
             self.game_status = GameStatus.VOTING
+            self._touch("status")
         
         msg = "描述提交成功"
         if is_timeout:
             msg += "（超时提交）"
         return True, msg
     
+    @command()
     def submit_vote(self, voter_group: str, target_group: str) -> bool:
         """
         提交投票
@@ -211,9 +461,11 @@ class GameLogic:
         if voter_group == target_group:  # 不能投自己
             return False
         
-        self.votes[self.current_round][voter_group] = target_group
+        self.votes[self.current_round][self.groups[voter_group].gid] = self.groups[target_group].gid
+        self._touch(("votes", self.current_round))
         return True
     
+    @command()
     def process_voting_result(self) -> Dict:
         """
         处理投票结果，判定淘汰和游戏状态
@@ -226,13 +478,15 @@ class GameLogic:
         active_groups = [g for g in self.describe_order if g not in self.eliminated_groups]
         
         # 检查是否所有人都投票了
-        if len(round_votes) < len(active_groups):
+        if len(round_votes) - round_votes.count(NO_VOTE) < len(active_groups):
             return {"error": "还有组未投票"}
         
         # 统计票数
         vote_count: Dict[str, int] = {}
-        for target in round_votes.values():
-            vote_count[target] = vote_count.get(target, 0) + 1
+        for target in round_votes:
+            if target != NO_VOTE:
+                name = self.group_names[target]
+                vote_count[name] = vote_count.get(name, 0) + 1
         
         # 找出得票最多的组
         max_votes = max(vote_count.values()) if vote_count else 0
@@ -257,7 +511,7 @@ class GameLogic:
         if len(max_voted_groups) == 1:
             # 情况a：票数最多的有1组，该组被淘汰
             eliminated = max_voted_groups[0]
-            self.eliminated_groups.append(eliminated)
+            self._eliminate(eliminated, "voted_out")
             result["eliminated"] = [eliminated]
             
             if eliminated == self.undercover_group:
@@ -273,7 +527,7 @@ class GameLogic:
                 result["final_scores"] = self.scores.copy()
             else:
                 # 平民被淘汰，检查剩余人数
-                remaining_groups = [g for g in self.groups.keys() if g not in self.eliminated_groups]
+                remaining_groups = [g for g in self.group_names if g not in self.eliminated_groups]
                 remaining_civilians = [g for g in remaining_groups if g != self.undercover_group]
                 
                 if len(remaining_civilians) <= 1:
@@ -304,7 +558,8 @@ class GameLogic:
             all_civilians = all(g != self.undercover_group for g in max_voted_groups)
             if all_civilians:
                 # 都是平民，全部淘汰，游戏结束，卧底胜利
-                self.eliminated_groups.extend(max_voted_groups)
+                for group_name in max_voted_groups:
+                    self._eliminate(group_name, "tie_all_civilians")
                 result["eliminated"] = max_voted_groups
                 result["game_ended"] = True
                 result["winner"] = "undercover"
@@ -323,23 +578,71 @@ class GameLogic:
         # 清除倒计时
         self.phase_deadline = None
         self.speaker_deadline = None
+        self._touch("status", "current_round")
+        
+        # 记录本回合的生存/得分表
+        round_table = self._build_round_table(result["round"], result["winner"])
+        self.round_tables.append(round_table)
+        self._touch("round_tables")
+        result["round_table"] = round_table
         
         self.last_vote_result = result
+        self.vote_results.append(result)
         return result
 
+    @command()
     def add_report(self, group_name: str, report_type: str, detail: str) -> Dict:
         """记录异常报告"""
-        ticket = f"RPT-{datetime.now().strftime('%Y%m%d%H%M%S')}-{len(self.reports)+1:03d}"
+        now = datetime.fromtimestamp(self._now())
+        ticket = f"RPT-{now.strftime('%Y%m%d%H%M%S')}-{len(self.reports)+1:03d}"
         entry = {
             "ticket": ticket,
             "group": group_name or "unknown",
             "type": report_type,
             "detail": detail,
-            "time": datetime.now().isoformat()
+            "time": now.isoformat()
         }
         self.reports.append(entry)
+        self._touch("reports")
         return entry
     
+    def _eliminate(self, group_name: str, reason: str):
+        """
+        淘汰某组并记入淘汰记录
+        :param group_name: 组名
+        :param reason: 淘汰原因（"voted_out" 票数最多 / "tie_all_civilians" 平票且都是平民）
+        """
+        self.eliminated_groups.append(group_name)
+        self.elimination_ledger[group_name] = {"round": self.current_round, "reason": reason}
+        self._touch("eliminated_groups", "elimination_ledger", "groups")
+    
+    def _survival_rounds(self, round_num: int) -> Dict[str, int]:
+        """
+        各组截至某回合的生存轮数（一次遍历淘汰记录）
+        生存轮数 = 被淘汰前的轮数，未被淘汰则为该回合数
+        """
+        survival_rounds: Dict[str, int] = {}
+        for group_name in self.group_names:
+            entry = self.elimination_ledger.get(group_name)
+            if entry and entry["round"] <= round_num:
+                survival_rounds[group_name] = entry["round"] - 1
+            else:
+                survival_rounds[group_name] = round_num
+        return survival_rounds
+    
+    def _build_round_table(self, round_num: int, winner: Optional[str]) -> Dict:
+        """生成某回合结束时的生存/得分表（游戏结束时得分即最终得分）"""
+        survival_rounds = self._survival_rounds(round_num)
+        scores = dict(survival_rounds)
+        if winner == "undercover" and self.undercover_group:
+            scores[self.undercover_group] += 3
+        return {
+            "round": round_num,
+            "alive": [g for g in self.group_names if g not in self.elimination_ledger],
+            "survival": survival_rounds,
+            "scores": scores
+        }
+    
     def _calculate_scores(self):
         """
         计算得分
@@ -353,97 +656,59 @@ class GameLogic:
         if not self.undercover_group:
             return
         
-        undercover_eliminated = self.undercover_group in self.eliminated_groups
-        
-        # 计算每个组的生存轮数
-        # 生存轮数 = 被淘汰时的回合数，如果未被淘汰则为当前回合数
-        survival_rounds: Dict[str, int] = {}
+        # 生存轮数直接读取淘汰记录，被淘汰的组按其被淘汰的回合计算
+        survival_rounds = self._survival_rounds(self.current_round)
+        for group_name, rounds in survival_rounds.items():
+            self.scores[group_name] = rounds
         
-        for group_name in self.groups.keys():
-            if group_name in self.eliminated_groups:
-                # 找到该组被淘汰的回合
-                eliminated_round = self._get_eliminated_round(group_name)
-                survival_rounds[group_name] = eliminated_round - 1  # 被淘汰前的轮数
-            else:
-                # 存活到最后
-                survival_rounds[group_name] = self.current_round
-        
-        if undercover_eliminated:
-            # 卧底被淘汰，平民胜利
-            # 卧底：只有生存分（被淘汰前的轮数）
-            self.scores[self.undercover_group] = max(0, survival_rounds[self.undercover_group])
-            
-            # 平民：生存分
-            for group_name in self.groups.keys():
-                if group_name != self.undercover_group:
-                    self.scores[group_name] = survival_rounds[group_name]
-        else:
-            # 卧底存活到最后，卧底胜利
-            # 卧底得分 = 胜利分(3) + 生存分
+        if self.undercover_group not in self.elimination_ledger:
+            # 卧底存活到最后，卧底胜利：得分 = 胜利分(3) + 生存分
             victory_bonus = 3
-            self.scores[self.undercover_group] = victory_bonus + survival_rounds[self.undercover_group]
-            
-            # 平民：生存分
-            for group_name in self.groups.keys():
-                if group_name != self.undercover_group:
-                    self.scores[group_name] = survival_rounds[group_name]
-    
-    def _get_eliminated_round(self, group_name: str) -> int:
-        """获取某组被淘汰的回合数"""
-        # 遍历投票结果找到该组被淘汰的回合
-        if self.last_vote_result and group_name in self.last_vote_result.get("eliminated", []):
-            return self.last_vote_result.get("round", self.current_round)
-        # 默认返回当前回合
-        return self.current_round
+            self.scores[self.undercover_group] += victory_bonus
+        
+        # 累计到系列赛总分
+        for group_name, score in self.scores.items():
+            self.series_scores[group_name] = self.series_scores.get(group_name, 0) + score
+        self._touch("scores", "series_scores")
     
     def get_game_state(self) -> Dict:
         """获取当前游戏状态"""
-        # 获取当前回合已发言的组
-        described_groups = []
-        if self.current_round in self.descriptions:
-            described_groups = [d["group"] for d in self.descriptions[self.current_round]]
-        
-        # 获取当前回合已投票的组
-        voted_groups = []
-        if self.current_round in self.votes:
-            voted_groups = list(self.votes[self.current_round].keys())
-        
-        return {
-            "status": self.game_status.value,
-            "groups": {name: {
-                "name": info["name"],
-                "role": info["role"],
+        state = {key: self._state_field(key) for key in STATE_FIELDS}
+        state["version"] = self.version
+        return state
+
+    def _state_field(self, key: str):
+        """完整状态中的一项（get_game_state 和历史版本的增量更新共用）"""
+        if key == "status":
+            return self.game_status.value
+        if key == "groups":
+            return {name: {
+                "name": info.name,
+                "role": info.role,
                 "eliminated": name in self.eliminated_groups
-            } for name, info in self.groups.items()},
-            "undercover_group": self.undercover_group if self.game_status != GameStatus.WAITING else None,
-            "current_round": self.current_round,
-            "describe_order": self.describe_order,
-            "current_speaker": self.get_current_speaker(),
-            "current_speaker_index": self.current_speaker_index,
-            "described_groups": described_groups,  # 已发言的组
-            "voted_groups": voted_groups,  # 已投票的组
-            "eliminated_groups": self.eliminated_groups,
-            "scores": self.scores,
-            "descriptions": self.descriptions,
-            "votes": self.votes,
-            "reports": self.reports
-        }
+            } for name, info in self.groups.items()}
+        if key == "undercover_group":
+            return self.undercover_group if self.game_status != GameStatus.WAITING else None
+        if key == "current_speaker":
+            return self.get_current_speaker()
+        if key == "described_groups":
+            # 当前回合已发言的组
+            return [d.group for d in self.descriptions.get(self.current_round, ())]
+        if key == "voted_groups":
+            # 当前回合已投票的组
+            return self.voted_groups_of(self.current_round)
+        if key == "descriptions":
+            return {round_num: [d.to_dict() for d in descs] for round_num, descs in self.descriptions.items()}
+        if key == "votes":
+            return {round_num: self.round_votes(round_num) for round_num in self.votes}
+        return getattr(self, key)
 
     def get_public_status(self) -> Dict:
         """面向游戏方的公开状态"""
-        active_groups = [g for g in self.groups.keys() if g not in self.eliminated_groups]
-        
-        # 计算阶段剩余时间
-        remaining_seconds = None
-        if self.phase_deadline:
-            delta = self.phase_deadline - datetime.now()
-            remaining_seconds = max(0, int(delta.total_seconds()))
+        active_groups = [g for g in self.group_names if g not in self.eliminated_groups]
         
-        # 计算当前发言者剩余时间
-        speaker_remaining = None
-        if self.speaker_deadline and self.game_status == GameStatus.DESCRIBING:
-            delta = self.speaker_deadline - datetime.now()
-            speaker_remaining = max(0, int(delta.total_seconds()))
+        # 计算阶段和当前发言者剩余时间
+        remaining_seconds, speaker_remaining = self._remaining_times()
         
         # 获取当前发言人
         current_speaker = self.get_current_speaker() if self.game_status == GameStatus.DESCRIBING else None
@@ -453,14 +718,12 @@ class GameLogic:
         if self.current_round in self.descriptions:
             for desc in self.descriptions[self.current_round]:
                 current_descriptions.append({
-                    "group": desc["group"],
-                    "description": desc["description"]
+                    "group": desc.group,
+                    "description": desc.description
                 })
         
         # 获取当前回合已投票的组
-        voted_groups = []
-        if self.current_round in self.votes:
-            voted_groups = list(self.votes[self.current_round].keys())
+        voted_groups = self.voted_groups_of(self.current_round)
         
         return {
             "status": self.game_status.value,
@@ -472,10 +735,85 @@ class GameLogic:
             "eliminated_groups": self.eliminated_groups,
             "remaining_seconds": remaining_seconds,
             "speaker_remaining_seconds": speaker_remaining,  # 当前发言者剩余时间
+            **self._deadlines(),  # 绝对截止时间和服务器时间，客户端据此在本地倒计时
             "descriptions": current_descriptions,  # 当前回合的描述列表
             "voted_groups": voted_groups  # 已投票的组
         }
     
+    def _remaining_times(self) -> Tuple[Optional[int], Optional[int]]:
+        """
+        :return: (阶段剩余秒数, 当前发言者剩余秒数)，没有倒计时时为 None
+        """
+        remaining_seconds = None
+        if self.phase_deadline:
+            remaining_seconds = max(0, int(self.phase_deadline - self._now()))
+        speaker_remaining = None
+        if self.speaker_deadline and self.game_status == GameStatus.DESCRIBING:
+            speaker_remaining = max(0, int(self.speaker_deadline - self._now()))
+        return remaining_seconds, speaker_remaining
+
+    def _deadlines(self) -> Dict[str, Optional[float]]:
+        """
+        绝对截止时间（与 server_time 同一时钟的时间戳，秒）
+        客户端用 time_sync 握手得到的时钟偏差换算到本地后自行倒计时，不随请求时刻漂移
+        """
+        return {
+            "phase_deadline": self.phase_deadline,
+            "speaker_deadline": self.speaker_deadline if self.game_status == GameStatus.DESCRIBING else None,
+            "server_time": self._now()
+        }
+
+    def get_group_view(self, group_name: str) -> Optional[Dict]:
+        """
+        某组的"我的视图"：词语、公开状态、是否轮到发言/能否投票、剩余时间和本回合描述
+        除剩余时间外的内容按 (组名, 状态版本) 缓存，状态没变时重复请求不再重新组装
+        :param group_name: 组名
+        :return: 视图，该组未注册时返回 None
+        """
+        info = self.groups.get(group_name)
+        if info is None:
+            return None
+        if self._view_version != self.version:
+            self._view_cache = {}
+            self._view_version = self.version
+        view = self._view_cache.get(group_name)
+        if view is None:
+            view = self._build_group_view(info)
+            self._view_cache[group_name] = view
+        view = dict(view)
+        view["remaining_seconds"], view["speaker_remaining_seconds"] = self._remaining_times()
+        view["server_time"] = self._now()
+        return view
+
+    def _build_group_view(self, info: GroupRecord) -> Dict:
+        """组装某组视图中不随时间变化的部分（不包含身份）"""
+        name = info.name
+        status = self.game_status
+        eliminated = name in self.eliminated_groups
+        in_round = status in [GameStatus.DESCRIBING, GameStatus.VOTING]
+        round_votes = self.votes.get(self.current_round) if in_round else None
+        current_speaker = self.get_current_speaker()
+        return {
+            "group": name,
+            "word": info.word or None,
+            "status": status.value,
+            "round": self.current_round,
+            "version": self.version,
+            "eliminated": eliminated,
+            "is_my_turn": current_speaker == name,
+            "can_vote": status == GameStatus.VOTING and not eliminated,
+            "has_voted": round_votes is not None and round_votes[info.gid] != NO_VOTE,
+            "active_groups": [g for g in self.group_names if g not in self.eliminated_groups],
+            "describe_order": list(self.describe_order) if in_round else [],
+            "current_speaker": current_speaker,
+            "current_speaker_index": self.current_speaker_index if status == GameStatus.DESCRIBING else None,
+            "phase_deadline": self.phase_deadline,
+            "speaker_deadline": self.speaker_deadline if status == GameStatus.DESCRIBING else None,
+            "eliminated_groups": list(self.eliminated_groups),
+            "descriptions": [{"group": d.group, "description": d.description}
+                             for d in self.descriptions.get(self.current_round, [])]
+        }
+
     def get_current_speaker(self) -> Optional[str]:
         """获取当前应该发言的组"""
         if self.game_status != GameStatus.DESCRIBING:
@@ -492,24 +830,103 @@ class GameLogic:
         """获取指定组的词语（仅在该组查询时返回）"""
         if group_name not in self.groups:
             return None
-        return self.groups[group_name].get("word")
+        return self.groups[group_name].word
     
-    def reset_game(self):
-        """重置游戏"""
-        self.groups.clear()
-        self.game_status = GameStatus.WAITING
+    @command()
+    def new_game(self, undercover_word: str, civilian_word: str,
+                 variants: Optional[Dict[str, List[str]]] = None,
+                 undercover_group: Optional[str] = None) -> Tuple[bool, str]:
+        """
+        系列赛的下一局：保留已注册的组和系列赛累计得分，归档本局后重新分配身份和词语，直接进入词语已分配状态
+        :param undercover_word: 卧底词
+        :param civilian_word: 平民词
+        :param variants: 违禁词变体，可选
+        :param undercover_group: 指定卧底组，为空时随机选择
+        :return: (是否成功, 消息)
+        """
+        if self.game_status not in [GameStatus.REGISTERED, GameStatus.GAME_END]:
+            return False, "只能在本局结束后开始下一局"
+        if len(self.groups) < 3:
+            return False, "至少需要3组才能开始"
+        if undercover_group is not None and undercover_group not in self.groups:
+            return False, "指定的卧底组不存在"
+        
+        if self.game_status == GameStatus.GAME_END:
+            self.archived_games.append(self._archive())
+            self.game_number += 1
+        self._clear_game()
+        self._touch(ALL_FIELDS)
+        for info in self.groups.values():
+            info.role = None
+            info.word = ""
+        self.game_status = GameStatus.REGISTERED
+        self.start_game(undercover_word, civilian_word, variants, undercover_group)
+        return True, f"第{self.game_number}局已开始"
+    
+    def _archive(self) -> Dict:
+        """本局的归档记录（序列化后保存，之后本局的状态即可清空）"""
+        winner = self.last_vote_result["winner"] if self.last_vote_result else None
+        return {
+            "game": self.game_number,
+            "undercover_group": self.undercover_group,
+            "undercover_word": self.undercover_word,
+            "civilian_word": self.civilian_word,
+            "rounds": self.current_round,
+            "winner": winner,
+            "scores": dict(self.scores),
+            "elimination_ledger": self.elimination_ledger,
+            "round_tables": self.round_tables,
+            "descriptions": {round_num: [d.to_dict() for d in descs]
+                             for round_num, descs in self.descriptions.items()},
+            "votes": {round_num: self.round_votes(round_num) for round_num in self.votes},
+            "reports": self.reports,
+            "flags": self.flags
+        }
+    
+    def _clear_game(self):
+        """清空一局的状态（不动已注册的组和系列赛数据）"""
         self.undercover_group = None
         self.undercover_word = ""
         self.civilian_word = ""
         self.current_round = 0
         self.describe_order = []
         self.current_speaker_index = 0
-        self.descriptions.clear()
-        self.votes.clear()
+        self.descriptions = {}
+        self.votes = {}
         self.eliminated_groups = []
-        self.scores.clear()
+        self.elimination_ledger = {}
+        self.round_tables = []
+        self.scores = {}
         self.reports = []
         self.last_vote_result = None
+        self.vote_results = []
         self.phase_deadline = None
         self.speaker_deadline = None
-
+        self.word_filter = None
+        self.flags = []
+    
+    def get_series(self) -> Dict:
+        """系列赛概况：当前局数、累计得分（降序）和往局归档"""
+        ranking = sorted(self.series_scores.items(), key=lambda item: (-item[1], item[0]))
+        return {
+            "game_number": self.game_number,
+            "series_scores": self.series_scores,
+            "ranking": [{"rank": i, "group": name, "score": score} for i, (name, score) in enumerate(ranking, 1)],
+            "archived_games": self.archived_games
+        }
+    
+    @command(record=False)
+    def reset_game(self):
+        """重置游戏（重新生成随机种子，记录器从新的一局开始记录）"""
+        self.groups.clear()
+        self.group_names = []
+        self.game_status = GameStatus.WAITING
+        self._clear_game()
+        self.game_number = 1
+        self.series_scores = {}
+        self.archived_games = []
+        self.seed = random.SystemRandom().randrange(2 ** 32)
+        self._draws = 0
+        self._touch(ALL_FIELDS)
+        if self.recorder is not None:
+            self.recorder.start(self.seed)
@@ -1,20 +1,33 @@
 """
 交互式游戏方客户端
 可以看到其他人的描述、倒计时，手动输入描述和投票
+状态、词语和发言/投票提醒都通过本组私有的 Socket.IO 频道推送
 """
-import requests
-import time
+import json
 import os
+import queue
 import sys
+import time
+
+import requests
+import socketio
 
 # 配置服务器地址
 BASE_URL = "http://127.0.0.1:5000"
+TOKEN_FILE = ".undercover_token.json"  # 保存各组凭证，重新启动客户端时直接加入，无需重新注册
 
 class InteractiveClient:
     def __init__(self, group_name: str):
         self.group_name = group_name
         self.word = None
-        self.last_descriptions = []
+        self.token = None  # 私有频道凭证（注册时下发）
+        self.saved_token = False  # 当前凭证是否读自本地保存（被拒绝时改为重新注册）
+        self.game_over = False  # 是否已处理过本局的结束（系列赛中等下一局开始后清除）
+        self.status = {}  # 最近一次推送的"我的视图"
+        self.events = queue.Queue()  # 推送事件队列（由主线程处理）
+        self.prompting = False  # 是否正在等待输入（期间不刷新屏幕）
+        self.sio = None
+        self.clock_offset = 0.0  # 服务器时钟相对本机的偏差（秒）
     
     def clear_screen(self):
         """清屏"""
@@ -26,29 +39,33 @@ class InteractiveClient:
         print(f"  {title}")
         print("="*50)
     
-    def get_status(self):
-        """获取游戏状态"""
+    def _token_key(self) -> str:
+        return f"{BASE_URL} {self.group_name}"
+
+    def load_token(self):
+        """读取本地保存的凭证"""
         try:
-            r = requests.get(f"{BASE_URL}/api/status", timeout=3)
-            if r.status_code == 200:
-                return r.json().get('data', {})
-        except:
-            pass
-        return {}
-    
-    def get_descriptions(self):
-        """获取当前回合的描述（通过状态API无法获取，需要单独接口）"""
-        # 注意：公开API不暴露描述内容，这里模拟从主持方广播获取
-        # 实际游戏中，主持方会念出来或显示在大屏幕上
+            with open(TOKEN_FILE, encoding='utf-8') as f:
+                return json.load(f).get(self._token_key())
+        except (OSError, ValueError, AttributeError):
+            return None
+
+    def save_token(self, token):
+        """保存凭证（为None时删除）"""
         try:
-            # 尝试获取（如果有公开接口的话）
-            r = requests.get(f"{BASE_URL}/api/descriptions", timeout=3)
-            if r.status_code == 200:
-                return r.json().get('data', {})
-        except:
-            pass
-        return {}
-    
+            with open(TOKEN_FILE, encoding='utf-8') as f:
+                tokens = json.load(f)
+        except (OSError, ValueError):
+            tokens = {}
+        if not isinstance(tokens, dict):
+            tokens = {}
+        if token:
+            tokens[self._token_key()] = token
+        else:
+            tokens.pop(self._token_key(), None)
+        with open(TOKEN_FILE, 'w', encoding='utf-8') as f:
+            json.dump(tokens, f, ensure_ascii=False)
+
     def register(self) -> bool:
         """注册"""
         try:
@@ -56,6 +73,9 @@ class InteractiveClient:
                             json={"group_name": self.group_name}, timeout=3)
             result = r.json()
             if result.get('code') == 200:
+                self.token = result['data'].get('token')
+                self.saved_token = False
+                self.save_token(self.token)
                 print(f"✓ 注册成功！")
                 return True
             else:
@@ -65,19 +85,6 @@ class InteractiveClient:
             print(f"✗ 连接失败: {e}")
             return False
     
-    def get_word(self):
-        """获取词语"""
-        try:
-            r = requests.get(f"{BASE_URL}/api/word", 
-                           params={"group_name": self.group_name}, timeout=3)
-            result = r.json()
-            if result.get('code') == 200:
-                self.word = result['data'].get('word')
-                return self.word
-        except:
-            pass
-        return None
-    
     def submit_description(self, desc: str) -> tuple:
         """提交描述"""
         try:
@@ -178,154 +185,189 @@ class InteractiveClient:
         
         print(f"╚{'═'*48}╝")
     
-    def wait_for_game_start(self):
-        """等待游戏开始"""
-        print("\n等待主持方开始游戏...")
-        while True:
-            status = self.get_status()
-            if status.get('status') in ['word_assigned', 'describing']:
-                return True
-            if status.get('status') == 'game_end':
-                return False
-            time.sleep(1)
+    def connect(self) -> bool:
+        """连接推送通道并用凭证加入本组私有频道"""
+        sio = socketio.Client(reconnection=True)
+
+        @sio.on('connect')
+        def on_connect():
+            # 断线重连后重新加入，服务器会补发当前视图、词语和阶段事件
+            sio.emit('join_group', {'group_name': self.group_name, 'token': self.token})
+
+        @sio.on('join_error')
+        def on_join_error(data):
+            self.events.put(('error', data.get('message', '加入私有频道失败')))
+
+        @sio.on('my_view')
+        def on_my_view(data):
+            self.status = data
+            if data.get('word'):
+                self.word = data['word']
+            if not self.prompting:
+                self.display_status(data)
+            # 每局只提示一次结束；系列赛的下一局开始后状态离开 game_end，再次结束时重新提示
+            ended = data.get('status') == 'game_end'
+            if ended and not self.game_over:
+                self.events.put(('game_end', data))
+            self.game_over = ended
+
+        @sio.on('your_word')
+        def on_your_word(data):
+            self.word = data.get('word')
+            self.events.put(('word', data))
+
+        @sio.on('your_turn')
+        def on_your_turn(data):
+            self.events.put(('turn', data))
+
+        @sio.on('vote_open')
+        def on_vote_open(data):
+            self.events.put(('vote', data))
+
+        @sio.on('latency_ping')
+        def on_latency_ping(data):
+            # 原样回复 ack，服务器据此统计本组的网络时延
+            return data
+
+        try:
+            sio.connect(BASE_URL)
+        except Exception as e:
+            print(f"✗ 推送通道连接失败: {e}")
+            return False
+        self.sio = sio
+        self.sync_clock()
+        return True
     
-    def wait_for_my_turn(self):
-        """等待轮到自己发言，同时显示状态"""
-        while True:
-            status = self.get_status()
-            self.display_status(status)
-            
-            if status.get('status') != 'describing':
-                return status.get('status')
-            
-            if status.get('current_speaker') == self.group_name:
-                return 'my_turn'
-            
-            print(f"\n等待 {status.get('current_speaker')} 发言中...")
-            time.sleep(2)
+    def sync_clock(self, samples: int = 3):
+        """时钟同步握手：取往返最短的一次样本估计服务器时钟偏差"""
+        best_rtt = None
+        for _ in range(samples):
+            t0 = time.time()
+            try:
+                ack = self.sio.call('time_sync', {'client_time': t0}, timeout=2)
+            except socketio.exceptions.TimeoutError:
+                continue
+            t1 = time.time()
+            if ack and (best_rtt is None or t1 - t0 < best_rtt):
+                best_rtt = t1 - t0
+                self.clock_offset = ack['server_time'] - (t0 + t1) / 2
+    
+    def seconds_left(self, event: dict, default: int) -> int:
+        """按推送的绝对截止时间在本地计算剩余秒数"""
+        deadline = event.get('deadline')
+        if deadline is None:
+            return event.get('remaining_seconds', default)
+        return max(0, int(deadline - (time.time() + self.clock_offset)))
+    
+    def prompt(self, text: str) -> str:
+        """输入期间暂停刷新屏幕"""
+        self.prompting = True
+        try:
+            return input(text).strip()
+        finally:
+            self.prompting = False
+    
+    def take_turn(self, event: dict):
+        """轮到自己发言"""
+        self.display_status(self.status)
+        print(f"\n👉 轮到你发言了！剩余 {self.seconds_left(event, 30)} 秒")
+        print(f"你的词语是: 【{self.word}】")
+        
+        desc = self.prompt("请输入你的描述: ")
+        if not desc:
+            desc = "我选择沉默"
+        
+        success, msg = self.submit_description(desc)
+        if success:
+            print(f"✓ 描述提交成功!")
+        else:
+            print(f"✗ 提交失败: {msg}")
+    
+    def vote(self, event: dict):
+        """投票阶段开始"""
+        self.display_status(self.status)
+        others = event.get('candidates', [])
+        if not others:
+            return
+        
+        print(f"\n🗳️ 投票阶段！剩余 {self.seconds_left(event, 120)} 秒")
+        print("可投票的组:")
+        for i, g in enumerate(others, 1):
+            print(f"  {i}. {g}")
+        
+        choice = self.prompt(f"请输入要投票的组名或序号: ")
+        
+        # 支持输入序号
+        if choice.isdigit():
+            idx = int(choice) - 1
+            if 0 <= idx < len(others):
+                choice = others[idx]
+        
+        if choice in others:
+            success, msg = self.submit_vote(choice)
+            if success:
+                print(f"✓ 投票成功: {self.group_name} → {choice}")
+            else:
+                print(f"✗ 投票失败: {msg}")
+        else:
+            print("无效的选择")
+        print("\n等待其他人投票...")
     
     def run(self):
-        """运行客户端"""
+        """运行客户端（事件驱动：状态、词语、发言和投票提醒均由服务器推送，不再轮询）"""
         self.print_header(f"谁是卧底 - 游戏方客户端")
         print(f"服务器: {BASE_URL}")
         print(f"组名: {self.group_name}")
         
-        # 注册
-        if not self.register():
+        # 有保存的凭证时直接加入私有频道（重新启动客户端不必重新注册），否则先注册
+        self.token = self.load_token()
+        if self.token:
+            self.saved_token = True
+            print("✓ 使用已保存的凭证加入")
+        elif not self.register():
             return
-        
-        # 等待游戏开始
-        if not self.wait_for_game_start():
-            print("游戏已结束")
+        if not self.connect():
             return
+        print("\n等待主持方开始游戏...")
         
-        # 获取词语
-        self.word = self.get_word()
-        if self.word:
-            print(f"\n🎯 你的词语是: 【{self.word}】")
-            print("请记住你的词语！")
-            input("按Enter继续...")
-        
-        # 游戏主循环
-        while True:
-            status = self.get_status()
-            game_status = status.get('status')
-            
-            if game_status == 'game_end':
-                self.display_status(status)
-                print("\n🏁 游戏结束！")
-                if self.group_name in status.get('eliminated_groups', []):
-                    print("😢 你被淘汰了")
-                else:
-                    print("🎉 你存活到了最后！")
-                break
-            
-            elif game_status == 'describing':
-                # 等待轮到自己
-                result = self.wait_for_my_turn()
+        # 游戏主循环：处理推送事件（输入只能在主线程进行）
+        # 一局结束后继续运行：系列赛的下一局沿用同一连接，会重新收到 your_word 和状态推送
+        try:
+            while True:
+                kind, data = self.events.get()
                 
-                if result == 'my_turn':
-                    status = self.get_status()
-                    self.display_status(status)
-                    
-                    speaker_time = status.get('speaker_remaining_seconds', 30)
-                    print(f"\n👉 轮到你发言了！剩余 {speaker_time} 秒")
-                    print(f"你的词语是: 【{self.word}】")
-                    
-                    desc = input("请输入你的描述: ").strip()
-                    if not desc:
-                        desc = "我选择沉默"
-                    
-                    success, msg = self.submit_description(desc)
-                    if success:
-                        print(f"✓ 描述提交成功!")
-                    else:
-                        print(f"✗ 提交失败: {msg}")
-                    
-                    time.sleep(1)
+                if kind == 'error':
+                    if self.saved_token:
+                        # 保存的凭证已失效（如主持方重置了游戏），重新注册后再加入
+                        self.save_token(None)
+                        print("保存的凭证已失效，重新注册...")
+                        if not self.register():
+                            break
+                        self.sio.emit('join_group', {'group_name': self.group_name, 'token': self.token})
+                        continue
+                    print(f"✗ {data}")
+                    break
                 
-                elif result == 'voting':
-                    continue
-                else:
-                    time.sleep(1)
-            
-            elif game_status == 'voting':
-                self.display_status(status)
+                elif kind == 'game_end':
+                    self.display_status(data)
+                    print("\n🏁 本局结束！")
+                    if data.get('eliminated'):
+                        print("😢 你被淘汰了")
+                    else:
+                        print("🎉 你存活到了最后！")
+                    print("\n等待主持方开始下一局（按 Ctrl+C 退出）...")
                 
-                # 获取可投票的组
-                active = status.get('active_groups', [])
-                others = [g for g in active if g != self.group_name]
+                elif kind == 'word':
+                    print(f"\n🎯 你的词语是: 【{self.word}】")
+                    print("请记住你的词语！等待主持方开始第一回合...")
                 
-                if others:
-                    print(f"\n🗳️ 投票阶段！剩余 {status.get('remaining_seconds', 120)} 秒")
-                    print("可投票的组:")
-                    for i, g in enumerate(others, 1):
-                        print(f"  {i}. {g}")
-                    
-                    choice = input(f"请输入要投票的组名或序号: ").strip()
-                    
-                    # 支持输入序号
-                    if choice.isdigit():
-                        idx = int(choice) - 1
-                        if 0 <= idx < len(others):
-                            choice = others[idx]
-                    
-                    if choice in others:
-                        success, msg = self.submit_vote(choice)
-                        if success:
-                            print(f"✓ 投票成功: {self.group_name} → {choice}")
-                        else:
-                            print(f"✗ 投票失败: {msg}")
-                    else:
-                        print("无效的选择")
+                elif kind == 'turn':
+                    self.take_turn(data)
                 
-                # 等待投票阶段结束
-                print("\n等待其他人投票...")
-                while True:
-                    s = self.get_status()
-                    if s.get('status') != 'voting':
-                        break
-                    time.sleep(2)
-            
-            elif game_status == 'round_end':
-                self.display_status(status)
-                print("\n回合结束，等待主持方开始下一轮...")
-                while True:
-                    s = self.get_status()
-                    if s.get('status') in ['describing', 'game_end']:
-                        break
-                    time.sleep(2)
-            
-            elif game_status == 'word_assigned':
-                self.display_status(status)
-                print("\n等待主持方开始第一回合...")
-                time.sleep(2)
-            
-            else:
-                time.sleep(1)
-        
-        print("\n游戏结束，感谢参与！")
-        input("按Enter退出...")
+                elif kind == 'vote':
+                    self.vote(data)
+        finally:
+            self.sio.disconnect()
 
 
 def main():
@@ -0,0 +1,108 @@
+"""
+轮询节奏模块
+主持方开始回合、阶段截止等时刻，固定间隔轮询的客户端会在同一时间窗口内一起醒来，
+多张桌子叠加后 /api/status 出现同步的请求尖峰。为此：
+- 服务器端：/api/status 和 /api/me 返回 next_poll_ms，按阶段（等待主持方操作时放慢）、
+  距截止时间的远近（截止前刚好在截止后到达）和当前轮询负载（超过目标速率时按比例放慢）给出建议间隔
+- 客户端：在建议间隔上叠加随机抖动，请求失败时按指数退避（同样带抖动），错开各客户端的请求时刻
+"""
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+
+
+POLL_IDLE_MS = 5000  # 等待主持方操作（未开局、回合之间、已结束）时的轮询间隔
+POLL_ACTIVE_MS = 3000  # 描述、投票阶段的轮询间隔
+POLL_MIN_MS = 1000  # 建议间隔下限
+POLL_MAX_MS = 15000  # 建议间隔上限
+DEADLINE_MARGIN_MS = 300  # 截止时间临近时，建议在截止后多久再来
+LOAD_WINDOW_SECONDS = 5  # 统计轮询速率的滑动窗口（秒）
+LOAD_TARGET_RPS = 50  # 轮询速率超过该值时按比例放慢
+POLL_JITTER = 0.5  # 客户端在建议间隔上随机增加 0~50%
+BACKOFF_BASE_MS = 1000  # 请求失败后的首次退避时间
+BACKOFF_MAX_MS = 30000  # 退避时间上限
+
+# 需要等主持方操作才会变化的状态
+IDLE_STATUSES = ("waiting", "registered", "word_assigned", "round_end", "game_end")
+
+
+class RateMeter:
+    """滑动窗口请求速率（按秒分桶，线程安全）"""
+
+    def __init__(self, window: int = LOAD_WINDOW_SECONDS, clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.clock = clock
+        self.lock = threading.Lock()
+        self._buckets: Deque[list] = deque()  # [秒, 次数]
+
+    def hit(self):
+        second = int(self.clock())
+        with self.lock:
+            if self._buckets and self._buckets[-1][0] == second:
+                self._buckets[-1][1] += 1
+            else:
+                self._buckets.append([second, 1])
+            while self._buckets[0][0] <= second - self.window:
+                self._buckets.popleft()
+
+    def rate(self) -> float:
+        """最近 window 秒（不含当前未满的一秒）的平均每秒请求数"""
+        second = int(self.clock())
+        with self.lock:
+            total = sum(count for start, count in self._buckets if second - self.window <= start < second)
+        return total / self.window
+
+
+_meter = RateMeter()
+
+
+def record_poll():
+    """记下一次状态轮询（由后端在 /api/status、/api/me 中调用）"""
+    _meter.hit()
+
+
+def load_factor() -> float:
+    """当前轮询负载相对目标速率的倍数（不超过目标时为1）"""
+    return max(1.0, _meter.rate() / LOAD_TARGET_RPS)
+
+
+def next_poll_ms(status: str, deadline: Optional[float], now: float, load: Optional[float] = None) -> int:
+    """
+    建议的下次轮询间隔
+    :param status: 游戏状态
+    :param deadline: 最近的截止时间（发言或阶段截止，与 now 同一时钟，没有时为None）
+    :param now: 当前时间
+    :param load: 负载倍数（默认取当前轮询负载）
+    :return: 毫秒
+    """
+    interval = POLL_IDLE_MS if status in IDLE_STATUSES else POLL_ACTIVE_MS
+    if deadline is not None:
+        # 截止前的轮询看不到变化，截止临近时改为在截止后稍等再来
+        until_deadline = (deadline - now) * 1000 + DEADLINE_MARGIN_MS
+        if 0 < until_deadline < interval:
+            interval = until_deadline
+    interval *= load_factor() if load is None else load
+    return int(min(POLL_MAX_MS, max(POLL_MIN_MS, interval)))
+
+
+def next_delay(hint_ms: Optional[int], failures: int = 0, rng: random.Random = random) -> float:
+    """
+    客户端下次轮询前的等待时间
+    :param hint_ms: 服务器返回的 next_poll_ms（旧版服务器没有时为None）
+    :param failures: 连续失败次数（0 表示上次请求成功）
+    :return: 秒
+    """
+    if failures > 0:
+        # 指数退避，取上限的一半再加随机的另一半，避免断线的客户端同时重试
+        ceiling = min(BACKOFF_MAX_MS, BACKOFF_BASE_MS * 2 ** (failures - 1))
+        return (ceiling / 2 + rng.uniform(0, ceiling / 2)) / 1000
+    interval = hint_ms if hint_ms else POLL_ACTIVE_MS
+    return interval * (1 + rng.uniform(0, POLL_JITTER)) / 1000
+
+
+def poll_hint(status: Dict) -> Optional[int]:
+    """从 /api/status、/api/me 的响应数据中取出 next_poll_ms"""
+    hint = status.get("next_poll_ms") if isinstance(status, dict) else None
+    return hint if isinstance(hint, int) and hint > 0 else None
@@ -0,0 +1,158 @@
+"""
+命令记录与回放模块
+记录 GameLogic 的命令流（随机种子 + 每条命令的参数、时间和返回值），
+离线以最快速度逐条回放：既是性能基准的工作负载，也是 GameLogic 改动的回归校验；
+压缩后的记录同时用作房间休眠时的磁盘快照（恢复即回放）
+
+用法：
+    python replay.py match.ndjson            # 回放并校验每条命令的返回值
+    python replay.py match.ndjson --repeat 100  # 重复回放，统计吞吐量
+"""
+import argparse
+import json
+import time
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from game_logic import GameLogic, monotonic_clock
+
+
+FORMAT_VERSION = 2  # 记录文件格式版本（2：时间改为浮点时间戳）
+
+
+class CommandRecorder:
+    """命令记录器：每条命令在记录时即序列化为一行JSON"""
+
+    def __init__(self):
+        self.seed: Optional[int] = None
+        self.lines: List[str] = []
+
+    def start(self, seed: int):
+        """开始记录新的一局（游戏创建或重置时调用）"""
+        self.seed = seed
+        self.lines = []
+
+    def record(self, name: str, args: tuple, kwargs: dict, command_time: float, result):
+        """记录一条命令"""
+        self.lines.append(json.dumps({
+            "cmd": name,
+            "args": list(args),
+            "kwargs": kwargs,
+            "time": command_time,
+            "result": result
+        }, ensure_ascii=False))
+
+    def iter_ndjson(self) -> Iterator[str]:
+        """逐行输出记录文件内容（首行为文件头）"""
+        yield json.dumps({"version": FORMAT_VERSION, "seed": self.seed}) + "\n"
+        for line in list(self.lines):
+            yield line + "\n"
+
+    def dump(self, path: str):
+        """保存为NDJSON文件"""
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(self.iter_ndjson())
+
+
+class ReplayClock:
+    """回放时钟：返回当前回放命令记录下的时间"""
+
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def load(path: str) -> Tuple[int, List[Dict]]:
+    """
+    读取记录文件
+    :return: (随机种子, 命令列表)
+    """
+    with open(path, encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        if header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"不支持的记录文件版本：{header.get('version')}")
+        commands = [json.loads(line) for line in f if line.strip()]
+    return header["seed"], commands
+
+
+def replay(seed: int, commands: List[Dict], check: bool = True) -> Tuple[GameLogic, List[Dict]]:
+    """
+    按记录回放一局游戏
+    :param seed: 随机种子
+    :param commands: 命令列表
+    :param check: 是否逐条比对返回值
+    :return: (回放后的游戏实例, 返回值不一致的命令列表)
+    """
+    clock = ReplayClock()
+    game = GameLogic(seed=seed, clock=clock)
+    mismatches = []
+    for index, entry in enumerate(commands):
+        clock.now = entry["time"]
+        result = getattr(game, entry["cmd"])(*entry["args"], **entry["kwargs"])
+        if check:
+            actual = json.loads(json.dumps(result, ensure_ascii=False))
+            if actual != entry["result"]:
+                mismatches.append({
+                    "index": index,
+                    "cmd": entry["cmd"],
+                    "expected": entry["result"],
+                    "actual": actual
+                })
+    return game, mismatches
+
+
+def snapshot(game: GameLogic) -> bytes:
+    """
+    生成游戏快照（zlib 压缩的记录文件内容），游戏必须带有记录器
+    :return: 快照字节串
+    """
+    return zlib.compress("".join(game.recorder.iter_ndjson()).encode("utf-8"))
+
+
+def restore(data: bytes) -> GameLogic:
+    """
+    从快照恢复游戏：回放记录后换回实时时钟，并接上原有记录继续记录
+    :param data: snapshot() 生成的快照
+    :return: 游戏实例
+    """
+    lines = zlib.decompress(data).decode("utf-8").splitlines()
+    header = json.loads(lines[0])
+    if header.get("version") != FORMAT_VERSION:
+        raise ValueError(f"不支持的快照版本：{header.get('version')}")
+    commands = lines[1:]
+    game, _ = replay(header["seed"], [json.loads(line) for line in commands], check=False)
+    game.clock = monotonic_clock
+    game.recorder = CommandRecorder()
+    game.recorder.start(header["seed"])
+    game.recorder.lines = commands  # 回放结果与记录一致，直接沿用原记录行
+    return game
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回放 GameLogic 命令记录")
+    parser.add_argument("path", help="记录文件（/api/game/record 导出的NDJSON）")
+    parser.add_argument("--repeat", type=int, default=1, help="重复回放次数（用于测吞吐量）")
+    args = parser.parse_args()
+
+    seed, commands = load(args.path)
+    _, mismatches = replay(seed, commands)
+    for item in mismatches:
+        print(f"✗ 第{item['index']}条命令 {item['cmd']} 返回值不一致")
+        print(f"  记录: {json.dumps(item['expected'], ensure_ascii=False)}")
+        print(f"  回放: {json.dumps(item['actual'], ensure_ascii=False)}")
+    print(f"校验：{len(commands)} 条命令，{len(mismatches)} 条不一致")
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        replay(seed, commands, check=False)
+    elapsed = time.perf_counter() - start
+    total = len(commands) * args.repeat
+    print(f"基准：回放 {args.repeat} 次共 {total} 条命令，耗时 {elapsed:.3f} 秒，"
+          f"{total / elapsed if elapsed else 0:.0f} 条/秒")
+    raise SystemExit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
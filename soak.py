@@ -0,0 +1,331 @@
+"""
+长时间压测（soak test）
+启动 backend.py（开启 tracemalloc），通过 HTTP 和 Socket.IO 连续打完成千上万局完整的游戏：
+每局注册、各组连接私有频道、开局、描述、投票、异常上报，结束后断开连接并重置。
+定期采样后端的常驻内存、tracemalloc 统计的内存、线程数、文件描述符、GC 对象数和各全局容器的大小，
+用最小二乘法拟合"每局增长量"，超过阈值时判定为泄漏（退出码1），并列出相对基线增长最多的分配位置和调用栈
+
+用法：
+    python soak.py --games 2000
+    python soak.py --games 5000 --sample-every 100 --report soak_report.json
+    python soak.py --url http://127.0.0.1:5000 --games 500   # 压测已启动的后端（需以 BACKEND_DEBUG=0 PYTHONTRACEMALLOC=8 启动）
+"""
+import argparse
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+import requests
+import socketio
+
+
+GROUPS = ["望月队", "青木队", "星火队", "山海队"]
+WORD_PAIRS = [("向日葵", "太阳花"), ("苹果", "梨"), ("猫", "狗"), ("钢琴", "吉他")]
+MAX_ROUNDS = 6  # 每局最多回合数（防止投票僵持时无限进行）
+WARMUP_GAMES = 50  # 预热局数（缓存、历史版本窗口等填满后才建立基线）
+# 预热的最短时间（秒）：让内存分配器的空闲池和各类有上限的窗口先稳定下来
+WARMUP_SECONDS = 60
+SAMPLE_EVERY = 50  # 每隔多少局采样一次
+SAMPLE_TIMEOUT = 300  # 一次资源采样的超时（秒）
+TRACEMALLOC_FRAMES = 8  # 后端 tracemalloc 记录的调用栈深度（越深越慢）
+# 按设计会持续增长、不计入泄漏判断的模块（历史描述索引保存全部描述）
+EXPECTED_GROWTH = ("description_index.py",)
+# 不计入线程数的短命线程：engine.io 每个连接的心跳定时线程睡满一个 ping 周期（25秒）后才退出，
+# 数量随连接速率波动；连接本身泄漏时会体现在 socketio_sessions 上
+TRANSIENT_THREADS = ("Thread (_send_ping)",)
+# 每局增长量的阈值。历史描述索引按设计每局保留约2KB（描述原文、时间戳不在索引模块中分配），
+# 泄漏一整局游戏状态约8KB（见 bench_memory.py），泄漏一个连接的会话对象也有数KB
+MAX_TRACED_BYTES_PER_GAME = 4096
+# 内存分配器的空闲池要运行很久才稳定，RSS 只用于发现 tracemalloc 看不到的泄漏（C 扩展等）；
+# 开启 tracemalloc 时快照本身会让分配器持有大量内存，此时 RSS 仅供参考、不做判断
+MAX_RSS_BYTES_PER_GAME = 16384
+MAX_COUNT_PER_GAME = 0.01  # 线程、文件描述符、容器大小（每100局最多增长1个）
+MAX_GC_OBJECTS_PER_GAME = 20.0
+
+
+def slope(points: List[Tuple[float, float]]) -> Optional[float]:
+    """最小二乘拟合的斜率（每局增长量），样本不足时为None"""
+    points = [(x, y) for x, y in points if y is not None]
+    if len(points) < 3:
+        return None
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    if not var_x:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
+
+
+class SoakRunner:
+    """驱动后端连续打完多局游戏并采样资源"""
+
+    def __init__(self, url: str, admin_token: str, seed: int = 0):
+        self.url = url.rstrip("/")
+        self.admin = {"X-Admin-Token": admin_token}
+        self.http = requests.Session()
+        self.rng = random.Random(seed)
+        self.games = 0
+        self.requests = 0
+        self.failures = 0
+        self.errors: List[str] = []
+
+    def _call(self, method: str, path: str, admin: bool = False, timeout: float = 10, **kwargs) -> Dict:
+        self.requests += 1
+        response = self.http.request(method, self.url + path, headers=self.admin if admin else None,
+                                     timeout=timeout, **kwargs)
+        try:
+            body = response.json()
+        except ValueError:
+            body = {"code": response.status_code, "message": f"HTTP {response.status_code}"}
+        if body.get("code") != 200:
+            self.failures += 1
+            if len(self.errors) < 20:
+                self.errors.append(f"{method} {path}: {body.get('message')}")
+        return body.get("data") or {}
+
+    def _connect(self, group_name: str, token: str) -> socketio.Client:
+        """连接私有频道（回复 latency_ping，和真实客户端一样）"""
+        client = socketio.Client(reconnection=False)
+        client.on("latency_ping", lambda data: data)
+        client.connect(self.url)
+        client.emit("join_group", {"group_name": group_name, "token": token})
+        return client
+
+    def play_game(self):
+        """完整打一局：注册、连接、开局、若干回合、上报、断开、重置"""
+        tokens = {name: self._call("POST", "/api/register", json={"group_name": name}).get("token")
+                  for name in GROUPS}
+        # 一部分组不连接推送频道（只用 HTTP 轮询），一部分连接两次（多个标签页）
+        clients = []
+        for name in GROUPS:
+            roll = self.rng.random()
+            if roll < 0.2 or not tokens[name]:
+                continue
+            clients.append(self._connect(name, tokens[name]))
+            if roll > 0.9:
+                clients.append(self._connect(name, tokens[name]))
+
+        undercover_word, civilian_word = self.rng.choice(WORD_PAIRS)
+        undercover = self._call("POST", "/api/game/start", admin=True,
+                                json={"undercover_word": undercover_word,
+                                      "civilian_word": civilian_word}).get("undercover_group")
+        for _ in range(MAX_ROUNDS):
+            order = self._call("POST", "/api/game/round/start", admin=True).get("order")
+            if not order:
+                break
+            for name in order:
+                self._call("GET", "/api/me", params={"group_name": name})
+                self._call("POST", "/api/describe",
+                           json={"group_name": name, "description": f"{name}觉得它很常见{self.rng.randrange(100)}"})
+            for name in order:
+                # 平民大多能投中卧底，偶尔投错，让局长短有变化
+                candidates = [g for g in order if g != name]
+                target = undercover if name != undercover and self.rng.random() < 0.6 else self.rng.choice(candidates)
+                self._call("POST", "/api/vote", json={"voter_group": name, "target_group": target})
+            if self._call("POST", "/api/game/voting/process", admin=True).get("game_ended"):
+                break
+        if self.rng.random() < 0.3:
+            self._call("POST", "/api/report", json={"group_name": GROUPS[0], "type": "network", "detail": "描述时断线"})
+
+        for client in clients:
+            client.disconnect()
+        self._call("POST", "/api/game/reset", admin=True)
+        self.games += 1
+
+    def sample(self, baseline: bool = False, top: int = 15) -> Dict:
+        params = {"top": top, "exclude": ",".join(EXPECTED_GROWTH)}
+        if baseline:
+            params["baseline"] = "1"
+        # tracemalloc 快照在调用栈较深时需要较长时间
+        data = self._call("GET", "/api/debug/resources", admin=True, timeout=SAMPLE_TIMEOUT, params=params)
+        data["games"] = self.games
+        data["time"] = time.time()
+        return data
+
+
+def analyze(samples: List[Dict], thresholds: Dict[str, float]) -> List[Dict]:
+    """
+    各指标的每局增长量与阈值比较
+    只用后一半采样拟合（历史版本窗口、缓存等有上限的容器此时已填满，剩下的持续增长才是泄漏）
+    :return: [{metric, start, end, slope, threshold, failed}]
+    """
+    series = {
+        "traced_bytes": [(s["games"], s["traced_bytes"]) for s in samples],
+        # 扣除 tracemalloc 自身的开销
+        "rss_bytes": [(s["games"], s["rss_bytes"] and s["rss_bytes"] - s.get("tracemalloc_bytes", 0))
+                      for s in samples],
+        "threads": [(s["games"], s["threads"] - sum(s["thread_names"].get(name, 0) for name in TRANSIENT_THREADS))
+                    for s in samples],
+        "fds": [(s["games"], s["fds"]) for s in samples],
+        "gc_objects": [(s["games"], s["gc_objects"]) for s in samples],
+    }
+    for name in samples[0].get("containers", {}):
+        series[f"containers.{name}"] = [(s["games"], s["containers"].get(name)) for s in samples]
+    results = []
+    for metric, points in series.items():
+        value = slope(points[len(points) // 2:] if len(points) >= 4 else points)
+        threshold = thresholds.get(metric, thresholds["count"])
+        if metric == "rss_bytes" and samples[-1].get("tracing"):
+            threshold = None
+        results.append({
+            "metric": metric,
+            "start": points[0][1],
+            "end": points[-1][1],
+            "slope": value,
+            "threshold": threshold,
+            "failed": value is not None and threshold is not None and value > threshold
+        })
+    return results
+
+
+def print_report(samples: List[Dict], results: List[Dict], errors: List[str]):
+    last = samples[-1]
+    print(f"\n{'指标':<34}{'基线':>14}{'结束':>14}{'每局增长':>14}{'阈值':>12}")
+    for result in results:
+        value = "—" if result["slope"] is None else f"{result['slope']:.3f}"
+        mark = "  ✗ 泄漏" if result["failed"] else ""
+        threshold = "仅供参考" if result["threshold"] is None else result["threshold"]
+        print(f"{result['metric']:<34}{str(result['start']):>14}{str(result['end']):>14}{value:>14}"
+              f"{threshold:>12}{mark}")
+    print(f"\n线程（按名称）：{last.get('thread_names')}")
+    if last.get("top_allocations"):
+        print("\n相对基线增长最多的分配位置：")
+        for item in last["top_allocations"]:
+            print(f"  {item['size_diff'] / 1024:+10.1f} KB {item['count_diff']:+8d} 个  {item['file']}:{item['line']}")
+            for frame in item["traceback"][1:]:
+                print(f"{'':32}← {frame}")
+    elif not last.get("tracing"):
+        print("\n后端未开启 tracemalloc（以 PYTHONTRACEMALLOC=8 启动），没有分配位置统计")
+    if errors:
+        print("\n请求错误（前20条）：")
+        for error in errors:
+            print(f"  {error}")
+
+
+def start_backend(frames: int) -> Tuple[subprocess.Popen, str]:
+    """启动开启 tracemalloc、关闭调试模式的后端（描述索引、快照和后端日志写到临时目录）"""
+    workdir = tempfile.mkdtemp(prefix="soak-")
+    env = dict(os.environ,
+               PYTHONTRACEMALLOC=str(frames),
+               DESCRIPTION_INDEX_DIR=os.path.join(workdir, "description_index"),
+               SNAPSHOT_DIR=os.path.join(workdir, "snapshots"),
+               SLOW_TRACE_MS="100000",
+               BACKEND_DEBUG="0")  # 调试模式会缓存出错请求的调用栈，自动重载会在改动代码时重启后端
+    env.pop("TRAFFIC_LOG", None)
+    backend = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend.py")
+    with open(os.path.join(workdir, "backend.log"), "w", encoding="utf-8") as log:
+        process = subprocess.Popen([sys.executable, backend], env=env, stdout=log, stderr=subprocess.STDOUT,
+                                   start_new_session=(os.name == "posix"))
+    return process, workdir
+
+
+def stop_backend(process: subprocess.Popen):
+    if os.name == "posix":
+        try:
+            os.killpg(process.pid, signal.SIGINT)
+        except ProcessLookupError:
+            pass
+    else:
+        process.terminate()
+    try:
+        process.wait(10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def wait_ready(url: str, process: Optional[subprocess.Popen] = None, timeout: float = 120):
+    """等待后端就绪（开启 tracemalloc 后导入变慢，启动可能需要半分钟）"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise SystemExit("后端启动失败（端口被占用？），详见 backend.log")
+        try:
+            requests.get(url + "/api/status", timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.3)
+    raise SystemExit(f"后端 {url} 未在 {timeout} 秒内就绪")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="长时间压测：连续打完多局游戏并检测内存、线程和句柄泄漏")
+    parser.add_argument("--games", type=int, default=1000, help="压测局数（不含预热）")
+    parser.add_argument("--warmup", type=int, default=WARMUP_GAMES, help="预热局数")
+    parser.add_argument("--warmup-seconds", type=float, default=WARMUP_SECONDS, help="预热的最短时间（秒）")
+    parser.add_argument("--sample-every", type=int, default=SAMPLE_EVERY, help="每隔多少局采样一次")
+    parser.add_argument("--url", help="压测已启动的后端（不指定时自动启动 backend.py）")
+    parser.add_argument("--admin-token", default=os.environ.get("ADMIN_TOKEN", "host-secret"), help="主持方令牌")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--top", type=int, default=15, help="报告中列出的分配位置数")
+    parser.add_argument("--max-bytes-per-game", type=float, default=MAX_TRACED_BYTES_PER_GAME,
+                        help="tracemalloc 内存每局增长阈值（字节）")
+    parser.add_argument("--max-rss-per-game", type=float, default=MAX_RSS_BYTES_PER_GAME,
+                        help="常驻内存每局增长阈值（字节）")
+    parser.add_argument("--max-count-per-game", type=float, default=MAX_COUNT_PER_GAME,
+                        help="线程、文件描述符和容器大小每局增长阈值")
+    parser.add_argument("--report", help="保存完整报告（JSON）")
+    args = parser.parse_args()
+
+    process = None
+    url = args.url
+    if url is None:
+        url = "http://127.0.0.1:5000"
+        try:
+            requests.get(url + "/api/status", timeout=1)
+        except requests.RequestException:
+            pass
+        else:
+            raise SystemExit(f"{url} 上已有后端在运行，请先停止或用 --url 指定")
+        process, workdir = start_backend(TRACEMALLOC_FRAMES)
+        print(f"已启动后端（临时目录 {workdir}，日志 backend.log）")
+    try:
+        wait_ready(url, process)
+        runner = SoakRunner(url, args.admin_token, args.seed)
+        start = time.perf_counter()
+        warmup_until = time.monotonic() + args.warmup_seconds
+        while runner.games < args.warmup or time.monotonic() < warmup_until:
+            runner.play_game()
+        warmup = runner.games
+        samples = [runner.sample(baseline=True)]
+        print(f"预热 {warmup} 局完成，开始压测 {args.games} 局")
+        while runner.games < warmup + args.games:
+            runner.play_game()
+            if (runner.games - warmup) % args.sample_every == 0:
+                samples.append(runner.sample(top=args.top))
+                latest = samples[-1]
+                rate = runner.games / (time.perf_counter() - start)
+                print(f"  第 {runner.games} 局：RSS {latest['rss_bytes'] / 1048576:.1f}MB，"
+                      f"tracemalloc {(latest['traced_bytes'] or 0) / 1048576:.2f}MB，线程 {latest['threads']}，"
+                      f"文件描述符 {latest['fds']}（{rate:.1f} 局/秒）")
+    finally:
+        if process is not None:
+            stop_backend(process)
+
+    thresholds = {
+        "traced_bytes": args.max_bytes_per_game,
+        "rss_bytes": args.max_rss_per_game,
+        "gc_objects": MAX_GC_OBJECTS_PER_GAME,
+        "count": args.max_count_per_game
+    }
+    results = analyze(samples, thresholds)
+    print_report(samples, results, runner.errors)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({"games": runner.games, "requests": runner.requests, "results": results,
+                       "samples": samples, "errors": runner.errors}, f, ensure_ascii=False, indent=2)
+    failed = [result["metric"] for result in results if result["failed"]]
+    if failed:
+        print(f"\n✗ 以下指标持续增长，疑似泄漏：{', '.join(failed)}")
+        sys.exit(1)
+    print(f"\n✓ {runner.games} 局、{runner.requests} 个请求后未发现持续增长")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+状态历史版本模块
+每条改动了状态的游戏命令执行后保存一个 get_game_state() 的只读版本。新版本由上一版本按命令改动的路径更新得到：
+只复制路径上的字典，其余部分直接引用上一版本的对象，列表用持久化列表保存（追加只复制 O(log n) 个节点），
+所以每个版本的耗时和增加的内存都只与本次变化的内容成正比。
+按版本号二分查找，可以回看"第2回合投票刚开始时"之类的任意历史时刻；取出的是共享的只读版本，序列化时再 thaw
+"""
+import threading
+from bisect import bisect_right
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+HISTORY_WINDOW = 500  # 默认保留的版本数
+BRANCH_BITS = 5  # 持久化列表每个节点32个分支
+BRANCH = 1 << BRANCH_BITS
+BRANCH_MASK = BRANCH - 1
+
+_MISSING = object()
+
+
+class PersistentList:
+    """
+    持久化列表（32叉字典树 + 尾部缓冲）：追加返回新列表，只复制 O(log n) 个节点，其余节点与原列表共享
+    """
+    __slots__ = ("count", "shift", "root", "tail")
+
+    def __init__(self, count: int = 0, shift: int = BRANCH_BITS, root: tuple = (), tail: tuple = ()):
+        self.count = count
+        self.shift = shift
+        self.root = root
+        self.tail = tail
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self):
+        yield from self._iter_node(self.root, self.shift)
+        yield from self.tail
+
+    def _iter_node(self, node: tuple, shift: int):
+        if shift == 0:
+            yield from node
+            return
+        for child in node:
+            yield from self._iter_node(child, shift - BRANCH_BITS)
+
+    def append(self, value: Any) -> "PersistentList":
+        if len(self.tail) < BRANCH:
+            return PersistentList(self.count + 1, self.shift, self.root, self.tail + (value,))
+        # 尾部已满：把尾部作为叶子挂进树里，必要时树长高一层
+        tail_offset = self.count - BRANCH
+        if (tail_offset >> BRANCH_BITS) >= (1 << self.shift):
+            root = (self.root, self._path(self.shift, self.tail))
+            shift = self.shift + BRANCH_BITS
+        else:
+            root = self._push(self.shift, self.root, tail_offset, self.tail)
+            shift = self.shift
+        return PersistentList(self.count + 1, shift, root, (value,))
+
+    def _push(self, shift: int, node: tuple, index: int, leaf: tuple) -> tuple:
+        slot = (index >> shift) & BRANCH_MASK
+        if shift == BRANCH_BITS:
+            child = leaf
+        elif slot < len(node):
+            child = self._push(shift - BRANCH_BITS, node[slot], index, leaf)
+        else:
+            child = self._path(shift - BRANCH_BITS, leaf)
+        return node[:slot] + (child,) + node[slot + 1:]
+
+    def _path(self, shift: int, leaf: tuple) -> tuple:
+        return leaf if shift == 0 else (self._path(shift - BRANCH_BITS, leaf),)
+
+    def extend(self, values) -> "PersistentList":
+        result = self
+        for value in values:
+            result = result.append(value)
+        return result
+
+
+def share(new: Any, old: Any) -> Any:
+    """
+    返回与 new 相等的只读副本，其中与 old 相等的部分直接复用 old 的对象（结构共享）
+    new 可以引用游戏内部的可变对象，返回值与之不再有任何关联；列表保存为 PersistentList
+    :param new: 新状态（字典、列表和不可变标量组成）
+    :param old: 上一版本中对应位置的值
+    :return: 共享后的值（整体相等时即 old 本身）
+    """
+    if isinstance(new, dict):
+        base = old if isinstance(old, dict) else {}
+        result = {key: share(value, base.get(key, _MISSING)) for key, value in new.items()}
+        if base is old and len(result) == len(base) and all(result[key] is base.get(key, _MISSING) for key in result):
+            return old
+        return result
+    if isinstance(new, (list, tuple)):
+        if isinstance(old, PersistentList) and len(new) >= len(old):
+            # 只追加的列表（异常上报、违禁词标记、描述……）：前缀不变时共享原列表，只追加新元素
+            # 先用 == 快速比较（不含列表的元素在C层面比完），不相等时再逐层共享
+            if all(value == previous or share(value, previous) is previous for value, previous in zip(new, old)):
+                return old.extend(share(value, _MISSING) for value in new[len(old):])
+        return PersistentList().extend(share(value, _MISSING) for value in new)
+    if old is not _MISSING and type(new) is type(old) and new == old:
+        return old
+    return new
+
+
+class Appended:
+    """
+    只追加的列表的新值：在上一版本的持久化列表后面只追加新增的元素（列表变短时整体重建）
+    """
+    __slots__ = ("items",)
+
+    def __init__(self, items: list):
+        self.items = items
+
+
+def _apply(old: Any, value: Any) -> Any:
+    """某个路径上的新值（与旧值结构共享）"""
+    if isinstance(value, Appended):
+        items = value.items
+        if isinstance(old, PersistentList) and len(items) >= len(old):
+            return old.extend(share(item, _MISSING) for item in items[len(old):])
+        return PersistentList().extend(share(item, _MISSING) for item in items)
+    return share(value, old)
+
+
+def assoc(state: Dict, path: Tuple, value: Any) -> Dict:
+    """
+    返回把 path 处换成 value 后的新状态：只浅复制路径上的字典，其余部分与原状态共享
+    :param state: 原状态（不会被修改）
+    :param path: 键路径，如 ("reports",)、("descriptions", 2)
+    :param value: 新值（Appended 表示只追加）
+    :return: 新状态（没有变化时即 state 本身）
+    """
+    key = path[0]
+    old = state.get(key, _MISSING)
+    if len(path) == 1:
+        new = _apply(old, value)
+    else:
+        new = assoc(old if isinstance(old, dict) else {}, path[1:], value)
+    if new is old:
+        return state
+    result = dict(state)
+    result[key] = new
+    return result
+
+
+def thaw(value: Any) -> Any:
+    """把共享的只读状态还原成普通的字典和列表（可直接序列化为JSON）"""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, PersistentList):
+        return [thaw(item) for item in value]
+    return value
+
+
+class StateHistory:
+    """最近若干个版本的游戏状态（线程安全，查询 O(log n)）"""
+
+    def __init__(self, window: int = HISTORY_WINDOW):
+        self.window = window
+        self.lock = threading.Lock()
+        self._versions: List[int] = []  # 升序版本号
+        self._entries: List[tuple] = []  # (命令名, 状态)
+        self._start = 0  # 保留窗口的起点（过期的版本批量丢弃，均摊 O(1)）
+
+    def record(self, version: int, command: str, changes: Optional[Dict[Tuple, Any]],
+               full_state: Callable[[], Dict]):
+        """
+        保存一个版本
+        :param version: 状态版本号（单调递增）
+        :param command: 产生该版本的命令名
+        :param changes: 本次改动的 {路径: 新值}；为None时（换局、重置）整体重建
+        :param full_state: 返回完整状态的函数，整体重建或还没有任何版本时调用
+        """
+        with self.lock:
+            previous = self._entries[-1][1] if len(self._entries) > self._start else _MISSING
+            if changes is None or previous is _MISSING:
+                state = share(full_state(), previous)
+            else:
+                state = previous
+                for path, value in changes.items():
+                    state = assoc(state, path, value)
+            self._versions.append(version)
+            self._entries.append((command, state))
+            if len(self._versions) - self._start > self.window:
+                self._start += 1
+                if self._start >= self.window:
+                    del self._versions[:self._start]
+                    del self._entries[:self._start]
+                    self._start = 0
+
+    def get(self, version: int) -> Optional[Dict]:
+        """
+        某个版本时的状态（该版本号之前最后一条改动状态的命令执行后的状态）
+        :return: 共享的只读状态（列表为 PersistentList，不要修改，序列化前用 thaw 还原），不在保留范围内时为None
+        """
+        with self.lock:
+            index = bisect_right(self._versions, version, lo=self._start) - 1
+            if index < self._start:
+                return None
+            command, state = self._entries[index]
+            version = self._versions[index]
+        return dict(state, version=version, command=command)
+
+    def versions(self) -> List[Dict]:
+        """保留范围内的版本列表 [{version, command, status, round}]"""
+        with self.lock:
+            return [{
+                "version": version,
+                "command": command,
+                "status": state.get("status"),
+                "round": state.get("current_round")
+            } for version, (command, state) in zip(self._versions[self._start:], self._entries[self._start:])]
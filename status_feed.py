@@ -0,0 +1,67 @@
+"""
+公开状态推送模块
+为观众端/投屏提供 Server-Sent Events 推送：每次状态变化只序列化一次，
+所有订阅者共享同一个环形缓冲区，断线重连时按 Last-Event-ID 补发
+"""
+import json
+import threading
+from collections import deque
+from itertools import islice
+from typing import Deque, Iterator, List, Optional, Tuple
+
+
+FEED_BUFFER_SIZE = 64  # 缓冲区保留的最近事件数
+HEARTBEAT_INTERVAL = 15  # 无事件时的心跳间隔（秒）
+RETRY_MS = 3000  # 浏览器断线重连间隔（毫秒）
+
+
+class StatusFeed:
+    """共享的状态事件缓冲区"""
+
+    def __init__(self, buffer_size: int = FEED_BUFFER_SIZE):
+        self._frames: Deque[Tuple[int, bytes]] = deque(maxlen=buffer_size)
+        self._cond = threading.Condition()
+        self.last_id = 0  # 最新事件编号
+
+    def publish(self, payload: dict, event: str = "status"):
+        """
+        发布一条事件（序列化一次，供所有订阅者复用）
+        :param payload: 事件数据
+        :param event: SSE事件名
+        """
+        data = json.dumps(payload, ensure_ascii=False)
+        with self._cond:
+            self.last_id += 1
+            frame = f"id: {self.last_id}\nevent: {event}\ndata: {data}\n\n".encode("utf-8")
+            self._frames.append((self.last_id, frame))
+            self._cond.notify_all()
+
+    def _frames_after(self, last_id: Optional[int]) -> List[Tuple[int, bytes]]:
+        """取出编号大于 last_id 的事件（需持有锁）"""
+        if not self._frames:
+            return []
+        oldest = self._frames[0][0]
+        if last_id is None or last_id < oldest - 1 or last_id > self.last_id:
+            # 新订阅者、落后太多或服务器已重启：状态是全量快照，只需补发最新一条
+            return [self._frames[-1]]
+        return list(islice(self._frames, max(0, last_id - oldest + 1), None))
+
+    def subscribe(self, last_id: Optional[int] = None) -> Iterator[bytes]:
+        """
+        订阅事件流
+        :param last_id: 客户端最后收到的事件编号（Last-Event-ID），为空时从最新状态开始
+        :return: SSE报文生成器
+        """
+        yield f"retry: {RETRY_MS}\n\n".encode("utf-8")
+        while True:
+            with self._cond:
+                frames = self._frames_after(last_id)
+                if not frames:
+                    self._cond.wait(HEARTBEAT_INTERVAL)
+                    frames = self._frames_after(last_id)
+            if not frames:
+                yield b": heartbeat\n\n"
+                continue
+            for frame_id, frame in frames:
+                last_id = frame_id
+                yield frame
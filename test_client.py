@@ -6,6 +6,8 @@ import requests
 import time
 import json
 
+from polling import next_delay, poll_hint
+
 # 配置服务器地址（请修改为实际的主持方服务器IP）
 BASE_URL = "http://192.168.81.102:5000"
 
@@ -75,6 +77,30 @@ def test_get_state():
         print(f"✗ 请求失败: {e}")
         return None
 
+def wait_for_status(statuses, speaker=None, timeout=600):
+    """
+    轮询状态直到进入指定阶段（按服务器返回的 next_poll_ms 加随机抖动等待，请求失败时指数退避）
+    :param statuses: 目标状态
+    :param speaker: 描述阶段还需等到轮到该组发言
+    :return: 状态数据，超时或游戏已结束时为None
+    """
+    failures = 0
+    hint = None
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            data = requests.get(f"{BASE_URL}/api/status", timeout=5).json().get('data') or {}
+            failures = 0
+            hint = poll_hint(data)
+            if data.get('status') in statuses and (speaker is None or data.get('current_speaker') == speaker):
+                return data
+            if data.get('status') == 'game_end':
+                return None
+        except (requests.exceptions.RequestException, ValueError):
+            failures += 1
+        time.sleep(next_delay(hint, failures))
+    return None
+
 def test_get_word(group_name):
     """测试获取词语"""
     print(f"获取词语: {group_name}")
@@ -169,7 +195,7 @@ def main():
     # 等待游戏开始
     print("\n等待游戏开始...")
     print("（请主持方在另一个终端启动游戏）")
-    input("按Enter继续...")
+    wait_for_status(('word_assigned', 'describing'))
     
     # 获取游戏状态
     state = test_get_state()
@@ -183,8 +209,8 @@ def main():
                 print(f"\n你的词语是: {word}")
     
     # 等待描述阶段
-    print("\n等待描述阶段...")
-    input("按Enter继续...")
+    print("\n等待轮到本组发言...")
+    wait_for_status(('describing',), speaker=group_name)
     
     # 提交描述
     description = input(f"\n请输入描述（或按Enter使用默认'这是一个测试描述'）: ").strip()
@@ -194,7 +220,7 @@ def main():
     
     # 等待投票阶段
     print("\n等待投票阶段...")
-    input("按Enter继续...")
+    wait_for_status(('voting',))
     
     # 获取游戏状态以查看其他组
     state = test_get_state()
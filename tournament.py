@@ -0,0 +1,321 @@
+"""
+锦标赛模块
+把大量报名队伍分配到多张并行的桌子上，每张桌子是一局独立的游戏，并汇总积分榜；
+空闲的桌子会休眠到磁盘快照，下次访问时透明恢复
+"""
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from game_logic import GameLogic, GameStatus, MAX_GROUPS
+from replay import CommandRecorder, restore, snapshot
+from tracing import TracedLock
+
+
+MIN_TABLE_SIZE = 3  # 每桌最少组数（开局要求）
+MAX_TABLE_SIZE = MAX_GROUPS  # 每桌最多组数
+ROOM_IDLE_SECONDS = 300  # 桌子空闲多久后休眠（秒）
+MAX_RESIDENT_TABLES = 1000  # 常驻内存的桌子数上限（按桌数计，不是字节数），超出时按最久未用优先休眠
+HIBERNATE_GRACE_SECONDS = 5  # 刚被访问过的桌子不休眠（避免活跃的桌子反复休眠、恢复）
+SNAPSHOT_DIR = "snapshots"  # 休眠快照目录
+
+
+class GameHandle:
+    """
+    桌子游戏实例的句柄：本身不持有实例，每次访问属性时才从桌子取（已休眠时透明恢复）
+    只能在持有桌子的锁时使用。休眠同样需要这把锁，持锁期间实例不会被换出，
+    不会出现先取实例、再加锁时实例已被换出，改动落在旧实例上的情况
+    """
+    __slots__ = ("_table",)
+
+    def __init__(self, table: "Table"):
+        object.__setattr__(self, "_table", table)
+
+    def __getattr__(self, name):
+        return getattr(self._table.game, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._table.game, name, value)
+
+
+class Table:
+    """一张桌子：独立的游戏实例和锁，不同桌子之间互不阻塞"""
+
+    def __init__(self, table_id: str, members: List[str]):
+        self.table_id = table_id
+        self.members = members
+        self._game: Optional[GameLogic] = GameLogic(recorder=CommandRecorder())
+        self.lock = TracedLock()
+        self._wake_lock = threading.Lock()  # 保护休眠/恢复
+        self.recorded = False  # 本桌得分是否已计入积分榜
+        self.last_used = time.monotonic()  # 最近访问时间
+        self.snapshot_path: Optional[str] = None  # 休眠时的快照文件
+        self._peek: Tuple[GameStatus, int] = (GameStatus.WAITING, 0)  # 休眠时保留的 (状态, 回合)
+        self.handle = GameHandle(self)  # 交给请求处理的句柄（加锁后再取实例）
+        for name in members:
+            self._game.register_group(name)
+
+    @property
+    def game(self) -> GameLogic:
+        """游戏实例（已休眠时从磁盘快照透明恢复；需持有 self.lock 或锦标赛的锁，否则可能随即被换出）"""
+        self.last_used = time.monotonic()
+        game = self._game
+        if game is None:
+            with self._wake_lock:
+                if self._game is None:
+                    self._game = self._wake()
+                game = self._game
+        return game
+
+    @property
+    def resident(self) -> bool:
+        """是否常驻内存"""
+        return self._game is not None
+
+    def peek(self) -> Tuple[GameStatus, int]:
+        """读取 (状态, 回合)，休眠中的桌子不会被唤醒"""
+        game = self._game
+        return (game.game_status, game.current_round) if game is not None else self._peek
+
+    def hibernate(self, snapshot_dir: str) -> bool:
+        """
+        写入磁盘快照并释放游戏实例（调用方需持有 self.lock，保证没有请求正在修改）
+        :return: 是否休眠成功
+        """
+        with self._wake_lock:
+            game = self._game
+            if game is None:
+                return False
+            os.makedirs(snapshot_dir, exist_ok=True)
+            path = os.path.join(snapshot_dir, f"{self.table_id}.snap")
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(snapshot(game))
+            os.replace(tmp_path, path)
+            self._peek = (game.game_status, game.current_round)
+            self.snapshot_path = path
+            self._game = None
+            return True
+
+    def _wake(self) -> GameLogic:
+        """从快照恢复（需持有 self._wake_lock）"""
+        with open(self.snapshot_path, "rb") as f:
+            game = restore(f.read())
+        os.remove(self.snapshot_path)  # 恢复后以内存中的状态为准
+        self.snapshot_path = None
+        return game
+
+    def discard(self):
+        """桌子作废时删除残留的快照"""
+        with self._wake_lock:
+            if self.snapshot_path and os.path.exists(self.snapshot_path):
+                os.remove(self.snapshot_path)
+            self.snapshot_path = None
+
+
+class Tournament:
+    """锦标赛：报名池、座位编排、卧底轮换和累计积分"""
+
+    def __init__(self, seed: Optional[int] = None, snapshot_dir: str = SNAPSHOT_DIR,
+                 idle_seconds: float = ROOM_IDLE_SECONDS, max_resident: int = MAX_RESIDENT_TABLES):
+        """
+        :param seed: 座位编排和卧底轮换的随机种子
+        :param snapshot_dir: 桌子休眠快照目录
+        :param idle_seconds: 桌子空闲多久后休眠（秒）
+        :param max_resident: 常驻内存的桌子上限
+        """
+        self.snapshot_dir = snapshot_dir
+        self.idle_seconds = idle_seconds
+        self.max_resident = max_resident
+        self.teams: List[str] = []  # 报名池
+        self.rng = random.Random(seed)
+        self.meetings: Dict[str, Dict[str, int]] = {}  # 同桌次数 {a: {b: 次数}}
+        self.undercover_counts: Dict[str, int] = {}  # 担任卧底次数
+        self.standings: Dict[str, int] = {}  # 累计得分
+        self.games_played: Dict[str, int] = {}  # 已完成的局数
+        self.round_number = 0  # 当前是第几轮编排
+        self.tables: Dict[str, Table] = {}  # 当前轮的桌子 {桌号: Table}
+        self.team_table: Dict[str, str] = {}  # 队伍所在桌号
+        self.lock = TracedLock()  # 保护报名池、座位表和积分榜
+
+    def add_team(self, group_name: str) -> bool:
+        """
+        加入报名池
+        :param group_name: 组名
+        :return: 是否加入成功
+        """
+        if group_name in self.meetings:
+            return False
+        self.teams.append(group_name)
+        self.meetings[group_name] = {}
+        self.undercover_counts[group_name] = 0
+        self.standings[group_name] = 0
+        self.games_played[group_name] = 0
+        return True
+
+    def compute_seating(self) -> List[List[str]]:
+        """
+        计算一轮座位编排（不修改状态）
+        桌数取 ceil(N/5)，各桌人数相差不超过1；按随机顺序贪心入座，
+        每个队伍选择与已入座成员同桌次数之和最小的桌子，平局时选空位最多的桌子
+        :return: 每张桌子的成员列表
+        """
+        n = len(self.teams)
+        if n < MIN_TABLE_SIZE:
+            return []
+        table_count = -(-n // MAX_TABLE_SIZE)
+        capacity = [n // table_count + (1 if i < n % table_count else 0) for i in range(table_count)]
+        tables: List[List[str]] = [[] for _ in range(table_count)]
+
+        order = self.teams.copy()
+        self.rng.shuffle(order)
+        # 见面次数多的队伍约束更强，优先入座
+        order.sort(key=lambda t: -sum(self.meetings[t].values()))
+
+        for team in order:
+            met = self.meetings[team]
+            best, best_key = -1, None
+            for i, members in enumerate(tables):
+                free = capacity[i] - len(members)
+                if free <= 0:
+                    continue
+                key = (sum(met.get(m, 0) for m in members), -free)
+                if best_key is None or key < best_key:
+                    best, best_key = i, key
+            tables[best].append(team)
+        return tables
+
+    def seat_next_round(self) -> Dict[str, List[str]]:
+        """
+        编排下一轮并创建桌子（上一轮所有桌子必须已结束）
+        :return: {桌号: 成员列表}，无法编排时返回空字典
+        """
+        if any(t.peek()[0] != GameStatus.GAME_END for t in self.tables.values()):
+            return {}
+        seating = self.compute_seating()
+        if not seating:
+            return {}
+
+        self.round_number += 1
+        for table in self.tables.values():
+            table.discard()
+        self.tables = {}
+        self.team_table = {}
+        for i, members in enumerate(seating, 1):
+            table_id = f"R{self.round_number}-T{i}"
+            self.tables[table_id] = Table(table_id, members)
+            for name in members:
+                self.team_table[name] = table_id
+                for other in members:
+                    if other != name:
+                        self.meetings[name][other] = self.meetings[name].get(other, 0) + 1
+        return {table_id: table.members for table_id, table in self.tables.items()}
+
+    def start_tables(self, undercover_word: str, civilian_word: str) -> Dict[str, str]:
+        """
+        所有桌子同时开局，卧底按担任次数最少优先轮换
+        :return: {桌号: 卧底组名}
+        """
+        assigned: Dict[str, str] = {}
+        for table_id, table in self.tables.items():
+            with table.lock:
+                if table.game.game_status != GameStatus.REGISTERED:
+                    continue
+                fewest = min(self.undercover_counts[m] for m in table.members)
+                candidates = [m for m in table.members if self.undercover_counts[m] == fewest]
+                undercover = self.rng.choice(candidates)
+                if table.game.start_game(undercover_word, civilian_word, undercover_group=undercover):
+                    self.undercover_counts[undercover] += 1
+                    assigned[table_id] = undercover
+        return assigned
+
+    def table_for(self, group_name: str) -> Optional[Table]:
+        """获取队伍当前所在的桌子"""
+        table_id = self.team_table.get(group_name)
+        return self.tables.get(table_id) if table_id else None
+
+    def record_results(self) -> List[str]:
+        """
+        把已结束桌子的得分计入积分榜（每张桌子只计一次）
+        :return: 本次计入的桌号
+        """
+        return [table_id for table_id in list(self.tables) if self.record_table(table_id)]
+
+    def record_table(self, table_id: str) -> bool:
+        """
+        把一张已结束桌子的得分计入积分榜（只计一次；批量命令在同一局后接着开新局前调用）
+        :return: 是否计入
+        """
+        table = self.tables.get(table_id)
+        if table is None or table.recorded or table.peek()[0] != GameStatus.GAME_END:
+            return False
+        for name, score in table.game.scores.items():
+            self.standings[name] += score
+            self.games_played[name] += 1
+        table.recorded = True
+        return True
+
+    def get_standings(self) -> List[Dict]:
+        """积分榜（按累计得分降序）"""
+        ranking = sorted(self.teams, key=lambda t: (-self.standings[t], t))
+        return [{
+            "rank": i,
+            "group": name,
+            "score": self.standings[name],
+            "games_played": self.games_played[name],
+            "undercover_times": self.undercover_counts[name],
+            "table": self.team_table.get(name)
+        } for i, name in enumerate(ranking, 1)]
+
+    def get_tables_summary(self) -> Dict[str, Dict]:
+        """当前各桌概况"""
+        summary = {}
+        for table_id, table in self.tables.items():
+            status, current_round = table.peek()
+            summary[table_id] = {
+                "members": table.members,
+                "status": status.value,
+                "round": current_round,
+                "recorded": table.recorded,
+                "resident": table.resident
+            }
+        return summary
+
+    def hibernate_idle(self, now: Optional[float] = None) -> List[str]:
+        """
+        休眠空闲的桌子：空闲超过 idle_seconds 的桌子，以及常驻数超过 max_resident 时最久未用的桌子，
+        写入磁盘快照并移出内存；正在处理请求（锁被占用）或刚被访问过的桌子跳过
+        :param now: 当前单调时间，默认 time.monotonic()
+        :return: 本次休眠的桌号
+        """
+        now = time.monotonic() if now is None else now
+        resident = sorted((t for t in self.tables.values() if t.resident), key=lambda t: t.last_used)
+        excess = len(resident) - self.max_resident
+        hibernated = []
+        for i, table in enumerate(resident):
+            idle = now - table.last_used
+            if idle < HIBERNATE_GRACE_SECONDS or (i >= excess and idle < self.idle_seconds):
+                break  # 按最近访问时间排序，后面的桌子更新
+            if not table.lock.acquire(blocking=False):
+                continue
+            try:
+                if table.hibernate(self.snapshot_dir):
+                    hibernated.append(table.table_id)
+            finally:
+                table.lock.release()
+        return hibernated
+
+    def reset(self):
+        """重置锦标赛"""
+        self.teams = []
+        self.meetings = {}
+        self.undercover_counts = {}
+        self.standings = {}
+        self.games_played = {}
+        self.round_number = 0
+        for table in self.tables.values():
+            table.discard()
+        self.tables = {}
+        self.team_table = {}
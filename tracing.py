@@ -0,0 +1,184 @@
+"""
+请求追踪模块
+一次操作从浏览器 → frontend.py 代理 → backend.py 路由 → 游戏锁 → 游戏逻辑 → 广播，
+各段耗时记入同一个追踪（追踪编号通过 X-Trace-Id 请求头在前后端之间传递），
+响应带 Server-Timing 头（浏览器开发者工具可直接查看），超过阈值的慢请求保存在有界的内存队列中供主持界面查看
+
+记录的分段：
+- proxy：前端代理转发到后端的耗时（含网络）
+- lock：等锁时间
+- logic：持锁时间（游戏逻辑，含锁内的序列化）
+- serialize：响应序列化
+- broadcast：状态广播（后台任务，响应发出后补记，只出现在慢请求队列中）
+"""
+import re
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Deque, Dict, List, Optional
+
+
+TRACE_HEADER = "X-Trace-Id"
+SLOW_TRACE_MS = 100  # 超过多少毫秒算慢请求
+SLOW_TRACE_CAPACITY = 200  # 慢请求队列长度
+_TRACE_ID = re.compile(r"^[0-9A-Za-z-]{1,64}$")
+_SERVER_TIMING = re.compile(r"([\w-]+);dur=([\d.]+)")
+
+_local = threading.local()
+
+
+class Trace:
+    """一次请求的追踪"""
+
+    def __init__(self, trace_id: str, method: str, path: str):
+        self.trace_id = trace_id
+        self.method = method
+        self.path = path
+        self.start = time.perf_counter()
+        self.started_at = datetime.now().isoformat()
+        self.spans: Dict[str, float] = {}  # 分段名 -> 累计毫秒（同名分段累加）
+        self.total_ms = 0.0
+        self.status = None
+        self._held: List[float] = []  # 已持有的锁的获取时刻（支持嵌套加锁）
+        self._lock = threading.Lock()  # broadcast 分段在后台线程补记，与读取分段的线程并发
+
+    def add(self, name: str, ms: float):
+        with self._lock:
+            self.spans[name] = self.spans.get(name, 0.0) + ms
+
+    def _spans(self) -> Dict[str, float]:
+        """分段的快照（遍历期间后台线程可能仍在补记）"""
+        with self._lock:
+            return dict(self.spans)
+
+    @contextmanager
+    def span(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000)
+
+    def merge_server_timing(self, header: Optional[str], prefix: str):
+        """把下游返回的 Server-Timing 分段并入本追踪（加前缀区分）"""
+        for name, duration in _SERVER_TIMING.findall(header or ""):
+            self.add(prefix + name, float(duration))
+
+    def server_timing(self) -> str:
+        """Server-Timing 响应头"""
+        items = [f"{name};dur={ms:.2f}" for name, ms in self._spans().items()]
+        items.append(f"total;dur={self.total_ms:.2f}")
+        return ", ".join(items)
+
+    def to_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "time": self.started_at,
+            "total_ms": round(self.total_ms, 2),
+            "spans": {name: round(ms, 2) for name, ms in self._spans().items()}
+        }
+
+
+def current_trace() -> Optional[Trace]:
+    """当前线程正在处理的请求的追踪（不在请求中时为None）"""
+    return getattr(_local, "trace", None)
+
+
+@contextmanager
+def span(name: str):
+    """在当前追踪中记录一个分段（没有追踪时什么也不做）"""
+    trace = current_trace()
+    if trace is None:
+        yield
+        return
+    with trace.span(name):
+        yield
+
+
+class TracedLock:
+    """
+    带计时的锁（可直接替换 threading.Lock）：在请求中加锁时把等锁时间记为 lock、持锁时间记为 logic
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        return self._lock.acquire(blocking, timeout)
+
+    def release(self):
+        self._lock.release()
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    def __enter__(self):
+        trace = current_trace()
+        if trace is None:
+            self._lock.acquire()
+            return self
+        start = time.perf_counter()
+        self._lock.acquire()
+        acquired = time.perf_counter()
+        trace.add("lock", (acquired - start) * 1000)
+        trace._held.append(acquired)
+        return self
+
+    def __exit__(self, *exc):
+        trace = current_trace()
+        if trace is not None and trace._held:
+            trace.add("logic", (time.perf_counter() - trace._held.pop()) * 1000)
+        self._lock.release()
+
+
+class TraceStore:
+    """慢请求队列（有界，旧的自动淘汰）"""
+
+    def __init__(self, threshold_ms: float = SLOW_TRACE_MS, capacity: int = SLOW_TRACE_CAPACITY):
+        self.threshold_ms = threshold_ms
+        self._traces: Deque[Trace] = deque(maxlen=capacity)
+
+    def add(self, trace: Trace):
+        if trace.total_ms >= self.threshold_ms:
+            self._traces.append(trace)
+
+    def list(self) -> List[Dict]:
+        """最新的在前（广播等后台分段在响应之后补记，读取时才序列化）"""
+        return [trace.to_dict() for trace in reversed(list(self._traces))]
+
+
+def install(app, store: TraceStore):
+    """
+    为 Flask 应用开启追踪：沿用请求头中的追踪编号（没有则新建），响应带上 X-Trace-Id 和 Server-Timing
+    :param app: Flask 应用
+    :param store: 慢请求队列
+    """
+    from flask import request
+
+    @app.before_request
+    def _start_trace():
+        trace_id = request.headers.get(TRACE_HEADER, "")
+        if not _TRACE_ID.match(trace_id):
+            trace_id = secrets.token_hex(8)
+        _local.trace = Trace(trace_id, request.method, request.full_path.rstrip("?"))
+
+    @app.after_request
+    def _finish_trace(response):
+        trace = current_trace()
+        if trace is not None:
+            trace.total_ms = (time.perf_counter() - trace.start) * 1000
+            trace.status = response.status_code
+            response.headers[TRACE_HEADER] = trace.trace_id
+            response.headers["Server-Timing"] = trace.server_timing()
+            store.add(trace)
+        return response
+
+    @app.teardown_request
+    def _clear_trace(exc=None):
+        _local.trace = None
@@ -0,0 +1,358 @@
+"""
+流量记录与回放模块
+后端开启 TRAFFIC_LOG 后逐条记录收到的HTTP请求和 Socket.IO 事件（路由、请求体、状态码、耗时），
+回放时按原有的到达间隔（可压缩 1~100 倍）对本地后端重新发起，统计延迟和错误，并与上一次构建的报告对比
+
+用法：
+    TRAFFIC_LOG=traffic.ndjson.gz python backend.py    # 记录（.gz 结尾时压缩保存）
+    python traffic.py traffic.ndjson.gz --speed 10 --save new.json
+    python traffic.py traffic.ndjson.gz --speed 10 --baseline new.json  # 与上次构建对比
+"""
+import argparse
+import gzip
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, IO, List, Optional
+
+import requests
+import socketio
+
+
+FORMAT_VERSION = 1  # 流量文件格式版本
+FLUSH_EVERY = 100  # 每记录多少条刷新一次文件
+REPLAY_WORKERS = 64  # 回放HTTP请求的并发线程数
+SKIPPED_MIMETYPES = ("text/event-stream",)  # 不记录的长连接响应（SSE）
+SCRUBBED = "<scrubbed>"  # 落盘前替换敏感字段的占位值
+SECRET_FIELDS = ("token", "source")  # 不落盘的字段：组凭证、托管策略源码
+
+
+def _open(path: str, mode: str) -> IO:
+    """按扩展名选择是否 gzip 压缩"""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _scrub(data: Dict, entry: Dict) -> Dict:
+    """
+    替换请求体中的组凭证和策略源码（返回副本，不修改原数据）
+    :param entry: 所属记录，带源码时标记 x:1
+    """
+    if not any(key in data for key in SECRET_FIELDS):
+        return data
+    data = dict(data)
+    if "token" in data:
+        data["token"] = SCRUBBED
+    if "source" in data:
+        data["source"] = SCRUBBED
+        entry["x"] = 1
+    return data
+
+
+class TrafficRecorder:
+    """
+    流量记录器：每条记录一行紧凑JSON
+    http: {t 相对开始的秒数, k:"http", m 方法, p 路径, q 查询串, b 请求体, a 是否带主持方令牌, s 状态码, d 耗时毫秒}
+    ws:   {t, k:"ws", c 连接编号, e 事件名, b 事件数据}
+    主持方令牌本身不落盘，回放时用 --admin-token 重新提供；请求体和事件数据中的组凭证（token）
+    和托管策略源码（source）替换为占位值，带源码的记录标记 x:1（无法回放）
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file: Optional[IO] = None  # 收到第一条记录时才创建（调试模式的重载监视进程不会写文件）
+        self._lock = threading.Lock()
+        self._t0 = time.monotonic()
+        self._pending = 0
+        self._sessions: Dict[str, int] = {}  # Socket.IO sid -> 短连接编号
+        self._next_conn = 0
+
+    def _write(self, entry: Dict):
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = _open(self.path, "w")
+                self._file.write(json.dumps({"version": FORMAT_VERSION, "started_at": datetime.now().isoformat()}) + "\n")
+            self._file.write(line)
+            self._pending += 1
+            if self._pending >= FLUSH_EVERY:
+                self._file.flush()
+                self._pending = 0
+
+    def _offset(self) -> float:
+        return round(time.monotonic() - self._t0, 4)
+
+    def record_http(self, req, response, duration_ms: float):
+        """
+        记录一次HTTP请求
+        :param req: flask.request
+        :param response: flask 响应对象
+        :param duration_ms: 处理耗时（毫秒）
+        """
+        if response.mimetype in SKIPPED_MIMETYPES:
+            return
+        entry = {"t": self._offset(), "k": "http", "m": req.method, "p": req.path}
+        if req.query_string:
+            entry["q"] = req.query_string.decode("utf-8", "replace")
+        body = req.get_data(as_text=True)
+        if body:
+            try:
+                data = json.loads(body)
+            except ValueError:
+                data = None
+            if isinstance(data, dict):
+                scrubbed = _scrub(data, entry)
+                if scrubbed is not data:
+                    body = json.dumps(scrubbed, ensure_ascii=False, separators=(",", ":"))
+            entry["b"] = body
+        if req.headers.get("X-Admin-Token"):
+            entry["a"] = 1
+        entry["s"] = response.status_code
+        entry["d"] = round(duration_ms, 2)
+        self._write(entry)
+
+    def record_socket(self, sid: str, event: str, data=None):
+        """
+        记录一个客户端发来的 Socket.IO 事件（含 connect / disconnect）
+        :param sid: 连接的 sid（落盘时换成短编号）
+        """
+        with self._lock:
+            conn = self._sessions.get(sid)
+            if conn is None:
+                self._next_conn += 1
+                conn = self._sessions[sid] = self._next_conn
+            if event == "disconnect":
+                self._sessions.pop(sid, None)
+        entry = {"t": self._offset(), "k": "ws", "c": conn, "e": event}
+        if isinstance(data, dict):
+            data = _scrub(data, entry)
+        if data is not None:
+            entry["b"] = data
+        self._write(entry)
+
+    def close(self):
+        """刷新并关闭文件"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+
+
+def load(path: str) -> List[Dict]:
+    """
+    读取流量文件
+    :return: 记录列表（按时间排序）
+    """
+    with _open(path, "r") as f:
+        header = json.loads(f.readline())
+        if header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"不支持的流量文件版本：{header.get('version')}")
+        entries = [json.loads(line) for line in f if line.strip()]
+    entries.sort(key=lambda e: e["t"])
+    return entries
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))], 2)
+
+
+class TrafficReplayer:
+    """按原有到达间隔重放流量"""
+
+    def __init__(self, target: str, speed: float = 1.0, admin_token: str = "host-secret"):
+        self.target = target.rstrip("/")
+        self.speed = speed
+        self.admin_token = admin_token
+        self.tokens: Dict[str, str] = {}  # 回放中注册得到的新凭证 {组名: token}，用于改写 join_group
+        self.results: List[Dict] = []
+        self.skipped = 0  # 无法回放而跳过的记录数（上传托管策略，源码未落盘）
+        self.max_lag_ms = 0.0  # 实际发出时间落后计划时间的最大值
+        self._lock = threading.Lock()
+        self._clients: Dict[int, socketio.Client] = {}
+        self._conn_queues: Dict[int, ThreadPoolExecutor] = {}  # 每个连接一个单线程队列，事件按序发送且不阻塞调度
+
+    def _send_http(self, entry: Dict):
+        url = self.target + entry["p"] + ("?" + entry["q"] if entry.get("q") else "")
+        headers = {}
+        body = entry.get("b") or ""
+        if body:
+            headers["Content-Type"] = "application/json"
+            if SCRUBBED in body:
+                body = self._restore_token(body)
+        if entry.get("a"):
+            headers["X-Admin-Token"] = self.admin_token
+        start = time.perf_counter()
+        try:
+            response = requests.request(entry["m"], url, data=body.encode("utf-8"),
+                                        headers=headers, timeout=10)
+            status = response.status_code
+        except requests.RequestException:
+            response, status = None, 0
+        latency = (time.perf_counter() - start) * 1000
+        if response is not None and status == 200 and entry["p"].endswith("/register"):
+            self._capture_tokens(response)
+        with self._lock:
+            self.results.append({
+                "route": f"{entry['m']} {entry['p']}",
+                "latency": latency,
+                "status": status,
+                "recorded_status": entry.get("s"),
+                "recorded_latency": entry.get("d")
+            })
+
+    def _restore_token(self, body: str) -> str:
+        """把请求体中被替换掉的组凭证换成回放中注册得到的凭证"""
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return body
+        if isinstance(data, dict) and data.get("token") == SCRUBBED:
+            data["token"] = self.tokens.get(data.get("group_name"), "")
+        return json.dumps(data, ensure_ascii=False)
+
+    def _capture_tokens(self, response):
+        try:
+            data = response.json().get("data") or {}
+        except ValueError:
+            return
+        if data.get("token") and data.get("group_name"):
+            self.tokens[data["group_name"]] = data["token"]
+        self.tokens.update(data.get("tokens") or {})
+
+    def _send_socket(self, entry: Dict):
+        conn, event, data = entry["c"], entry["e"], entry.get("b")
+        client = self._clients.get(conn)
+        try:
+            if event == "connect":
+                client = socketio.Client()
+                client.connect(self.target)
+                self._clients[conn] = client
+            elif event == "disconnect":
+                if client:
+                    client.disconnect()
+                self._clients.pop(conn, None)
+            elif client:
+                if event == "join_group" and isinstance(data, dict):
+                    data = dict(data, token=self.tokens.get(data.get("group_name"), data.get("token")))
+                client.emit(event, data)
+        except socketio.exceptions.SocketIOError:
+            with self._lock:
+                self.results.append({"route": f"WS {event}", "latency": 0.0, "status": 0,
+                                     "recorded_status": 200, "recorded_latency": None})
+
+    def run(self, entries: List[Dict]):
+        """按计划时间逐条发出（HTTP并发发送，同一连接的 Socket.IO 事件按序发送）"""
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=REPLAY_WORKERS) as pool:
+            for entry in entries:
+                if entry.get("x"):
+                    self.skipped += 1
+                    continue
+                due = start + entry["t"] / self.speed
+                delay = due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    self.max_lag_ms = max(self.max_lag_ms, -delay * 1000)
+                if entry["k"] == "http":
+                    pool.submit(self._send_http, entry)
+                else:
+                    queue = self._conn_queues.get(entry["c"])
+                    if queue is None:
+                        queue = self._conn_queues[entry["c"]] = ThreadPoolExecutor(max_workers=1)
+                    queue.submit(self._send_socket, entry)
+        for queue in self._conn_queues.values():
+            queue.shutdown(wait=True)
+        for client in list(self._clients.values()):
+            client.disconnect()
+
+    def report(self) -> Dict:
+        """
+        汇总报告
+        :return: {"overall": {...}, "routes": {路由: {...}}}
+        """
+        routes: Dict[str, List[Dict]] = {}
+        for item in self.results:
+            routes.setdefault(item["route"], []).append(item)
+        summary = {route: self._summarize(items) for route, items in sorted(routes.items())}
+        overall = self._summarize(self.results)
+        overall["max_lag_ms"] = round(self.max_lag_ms, 2)
+        return {"overall": overall, "routes": summary}
+
+    @staticmethod
+    def _summarize(items: List[Dict]) -> Dict:
+        latencies = [i["latency"] for i in items]
+        recorded = [i["recorded_latency"] for i in items if i["recorded_latency"] is not None]
+        return {
+            "count": len(items),
+            "errors": sum(1 for i in items if i["status"] == 0 or i["status"] >= 500),
+            "status_changed": sum(1 for i in items if i["recorded_status"] and i["status"] != i["recorded_status"]),
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "p99": _percentile(latencies, 99),
+            "recorded_p50": _percentile(recorded, 50),
+            "recorded_p95": _percentile(recorded, 95)
+        }
+
+
+def _delta(new: Optional[float], old: Optional[float]) -> str:
+    if new is None or old is None:
+        return "-"
+    return f"{new - old:+.2f}"
+
+
+def print_report(report: Dict, baseline: Optional[Dict] = None):
+    """打印报告（提供上次构建的报告时附带差值）"""
+    overall = report["overall"]
+    print(f"共 {overall['count']} 条，错误 {overall['errors']}，状态码变化 {overall['status_changed']}，"
+          f"p50 {overall['p50']}ms，p95 {overall['p95']}ms，p99 {overall['p99']}ms，最大发送滞后 {overall['max_lag_ms']}ms")
+    print(f"{'路由':<36}{'次数':>6}{'错误':>6}{'p50':>9}{'p95':>9}{'p99':>9}" + ("{:>10}{:>10}{:>8}".format('Δp50', 'Δp95', 'Δ错误') if baseline else ""))
+    old_routes = (baseline or {}).get("routes", {})
+    for route, stats in report["routes"].items():
+        line = f"{route:<36}{stats['count']:>6}{stats['errors']:>6}{stats['p50']:>9}{stats['p95']:>9}{stats['p99']:>9}"
+        if baseline:
+            old = old_routes.get(route, {})
+            errors = stats["errors"] - old["errors"] if old else None
+            line += f"{_delta(stats['p50'], old.get('p50')):>10}{_delta(stats['p95'], old.get('p95')):>10}" \
+                    f"{('-' if errors is None else f'{errors:+d}'):>8}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按原有到达间隔回放流量记录")
+    parser.add_argument("path", help="流量文件（TRAFFIC_LOG 生成）")
+    parser.add_argument("--target", default="http://127.0.0.1:5000", help="回放目标后端地址")
+    parser.add_argument("--speed", type=float, default=1.0, help="时间压缩倍数（1~100）")
+    parser.add_argument("--admin-token", default="host-secret", help="目标后端的主持方令牌")
+    parser.add_argument("--save", help="保存本次报告（JSON）")
+    parser.add_argument("--baseline", help="上一次构建的报告（JSON），用于对比")
+    args = parser.parse_args()
+    if not 1 <= args.speed <= 100:
+        parser.error("--speed 需在 1~100 之间")
+
+    entries = load(args.path)
+    replayer = TrafficReplayer(args.target, args.speed, args.admin_token)
+    duration = entries[-1]["t"] / args.speed if entries else 0
+    print(f"回放 {len(entries)} 条记录，预计 {duration:.1f} 秒")
+    replayer.run(entries)
+    report = replayer.report()
+    if replayer.skipped:
+        print(f"跳过 {replayer.skipped} 条无法回放的记录（托管策略上传，源码未落盘）")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
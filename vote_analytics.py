@@ -0,0 +1,223 @@
+"""
+投票图分析模块
+把各局、各回合的投票累积成以组编号为下标的 NumPy 邻接矩阵，用矩阵运算统计：
+- 找卧底准确率：以平民身份投出的票中投中卧底的比例
+- 互投率：两组同时参与的回合中互相投票的比例
+- 同票率（串票嫌疑）：两组同时参与的回合中投给同一目标的比例
+- 影响力：投票与本回合淘汰结果一致的比例
+
+每处理完一轮投票调用 observe_round 增量更新，查询只做一次矩阵运算，耗时与累计局数无关
+
+用法：
+    python vote_analytics.py match1.ndjson match2.ndjson --top 10
+"""
+import argparse
+import json
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+INITIAL_CAPACITY = 64  # 初始可容纳的组数（不够时按倍数扩容）
+TOP_PAIRS = 10  # 默认返回的可疑组对数
+MIN_SHARED_ROUNDS = 2  # 组对至少同时参与的回合数（样本太少的组对不参与排名）
+
+# 累积矩阵 [投票者, 被投者]：票数、互投次数、同票次数、同时参与的回合数
+MATRICES = ("votes", "mutual", "co_votes", "together")
+# 累积向量 [组]：投票数、以平民身份投票数、投中卧底数、与淘汰结果一致数、被投票数
+VECTORS = ("cast", "civilian_cast", "hits", "aligned", "received")
+
+
+class VoteAnalytics:
+    """跨回合、跨局的投票图统计（线程安全）"""
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        self.lock = threading.Lock()
+        self.index: Dict[str, int] = {}  # 组名 -> 编号
+        self.names: List[str] = []  # 编号 -> 组名
+        self.rounds = 0  # 已统计的回合数
+        self.games = 0  # 已统计的完整局数
+        self.capacity = 0
+        for name in MATRICES:
+            setattr(self, name, np.zeros((0, 0), dtype=np.int32))
+        for name in VECTORS:
+            setattr(self, name, np.zeros(0, dtype=np.int32))
+        self._grow(capacity)
+
+    def _grow(self, capacity: int):
+        """扩容并保留已有数据"""
+        n = self.capacity
+        for name in MATRICES:
+            grown = np.zeros((capacity, capacity), dtype=np.int32)
+            grown[:n, :n] = getattr(self, name)
+            setattr(self, name, grown)
+        for name in VECTORS:
+            grown = np.zeros(capacity, dtype=np.int32)
+            grown[:n] = getattr(self, name)
+            setattr(self, name, grown)
+        self.capacity = capacity
+
+    def _id(self, group_name: str) -> int:
+        """组名对应的编号（新组分配下一个编号）"""
+        gid = self.index.get(group_name)
+        if gid is None:
+            gid = len(self.names)
+            if gid >= self.capacity:
+                self._grow(self.capacity * 2)
+            self.index[group_name] = gid
+            self.names.append(group_name)
+        return gid
+
+    def observe_round(self, votes: Dict[str, str], undercover_group: Optional[str],
+                      eliminated: Iterable[str] = (), game_ended: bool = False):
+        """
+        计入一轮已处理的投票
+        :param votes: {投票者: 被投者}
+        :param undercover_group: 本局卧底
+        :param eliminated: 本轮被投出的组
+        :param game_ended: 本轮后游戏是否结束
+        """
+        if not votes:
+            return
+        with self.lock:
+            voters = np.array([self._id(name) for name in votes], dtype=np.intp)
+            targets = np.array([self._id(name) for name in votes.values()], dtype=np.intp)
+
+            np.add.at(self.votes, (voters, targets), 1)
+            np.add.at(self.received, targets, 1)
+            self.cast[voters] += 1
+
+            # 本轮参与者的局部邻接矩阵，组对统计一次性写回全局矩阵
+            ids = np.union1d(voters, targets)
+            local_voters = np.searchsorted(ids, voters)
+            adjacency = np.zeros((len(ids), len(ids)), dtype=np.int32)
+            adjacency[local_voters, np.searchsorted(ids, targets)] = 1
+            voted = np.zeros(len(ids), dtype=np.int32)
+            voted[local_voters] = 1
+            co_votes = adjacency @ adjacency.T
+            together = np.outer(voted, voted)
+            np.fill_diagonal(co_votes, 0)
+            np.fill_diagonal(together, 0)
+            block = np.ix_(ids, ids)
+            self.mutual[block] += adjacency & adjacency.T
+            self.co_votes[block] += co_votes
+            self.together[block] += together
+
+            undercover = self.index.get(undercover_group, -1)
+            civilian = voters != undercover
+            self.civilian_cast[voters[civilian]] += 1
+            self.hits[voters[civilian & (targets == undercover)]] += 1
+            out = [self.index[name] for name in eliminated if name in self.index]
+            self.aligned[voters[np.isin(targets, out)]] += 1
+
+            self.rounds += 1
+            if game_ended:
+                self.games += 1
+
+    def observe_game(self, game) -> int:
+        """
+        计入一个游戏实例中已处理的全部投票（系列赛往局归档和当前局），用于从记录或快照补录
+        :param game: GameLogic 实例
+        :return: 计入的回合数
+        """
+        before = self.rounds
+        for archive in game.get_series()["archived_games"]:
+            self._observe_archive(archive, None)
+        state = game.get_game_state()
+        # 投票阶段中的本回合尚未处理，不计入
+        pending = state["current_round"] if state["status"] == "voting" else None
+        self._observe_archive(state, pending)
+        return self.rounds - before
+
+    def _observe_archive(self, archive: Dict, pending_round: Optional[int]):
+        """计入一局的归档（或 get_game_state 的结果）中的投票"""
+        rounds = sorted(int(round_num) for round_num in archive["votes"])
+        ended = archive.get("winner") is not None or archive.get("status") == "game_end"
+        votes = {int(round_num): round_votes for round_num, round_votes in archive["votes"].items()}
+        for round_num in rounds:
+            if round_num == pending_round:
+                continue
+            # 与实时计入的投票结果一致：本回合的所有淘汰（被投出和全平民平票），不按原因筛选
+            eliminated = [name for name, entry in archive["elimination_ledger"].items()
+                          if entry["round"] == round_num]
+            self.observe_round(votes[round_num], archive["undercover_group"], eliminated,
+                               ended and round_num == rounds[-1])
+
+    def summary(self, top: int = TOP_PAIRS, min_rounds: int = MIN_SHARED_ROUNDS) -> Dict:
+        """
+        统计结果
+        :param top: 互投、同票各返回前几对
+        :param min_rounds: 组对至少同时参与的回合数
+        :return: {rounds, games, groups: [...], collusion: [...], reciprocal: [...]}
+        """
+        with self.lock:
+            n = len(self.names)
+            cast = self.cast[:n]
+            received = self.received[:n]
+            accuracy = self.hits[:n] / np.maximum(self.civilian_cast[:n], 1)
+            influence = self.aligned[:n] / np.maximum(cast, 1)
+            together = self.together[:n, :n]
+            shared = np.maximum(together, 1)
+            collusion = self.co_votes[:n, :n] / shared
+            reciprocity = self.mutual[:n, :n] / shared
+            upper = np.triu_indices(n, 1)
+            eligible = together[upper] >= min_rounds
+            groups = [{
+                "group": self.names[i],
+                "votes_cast": int(cast[i]),
+                "votes_received": int(received[i]),
+                "accuracy": round(float(accuracy[i]), 3),
+                "influence": round(float(influence[i]), 3)
+            } for i in np.lexsort((-influence, -accuracy))]
+            return {
+                "rounds": self.rounds,
+                "games": self.games,
+                "groups": groups,
+                "collusion": self._top_pairs(collusion, together, upper, eligible, top),
+                "reciprocal": self._top_pairs(reciprocity, together, upper, eligible, top)
+            }
+
+    def _top_pairs(self, rates: np.ndarray, together: np.ndarray, upper, eligible: np.ndarray,
+                   top: int) -> List[Dict]:
+        """取比例最高的前 top 个组对（需持有锁）"""
+        scores = np.where(eligible, rates[upper], 0.0)
+        if top <= 0 or not scores.size:
+            return []
+        if top < scores.size:
+            candidates = np.argpartition(-scores, top - 1)[:top]
+        else:
+            candidates = np.arange(scores.size)
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        rows, cols = upper
+        return [{
+            "groups": [self.names[rows[k]], self.names[cols[k]]],
+            "rate": round(float(scores[k]), 3),
+            "shared_rounds": int(together[rows[k], cols[k]])
+        } for k in candidates if scores[k] > 0]
+
+
+def main():
+    from replay import load, replay
+
+    parser = argparse.ArgumentParser(description="从命令记录统计投票图")
+    parser.add_argument("paths", nargs="+", help="记录文件（/api/game/record 导出的NDJSON）")
+    parser.add_argument("--top", type=int, default=TOP_PAIRS, help="互投、同票各显示前几对")
+    args = parser.parse_args()
+
+    analytics = VoteAnalytics()
+    for path in args.paths:
+        seed, commands = load(path)
+        game, _ = replay(seed, commands, check=False)
+        analytics.observe_game(game)
+
+    start = time.perf_counter()
+    result = analytics.summary(args.top)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    print(f"{result['games']} 局 {result['rounds']} 个回合，{len(analytics.names)} 组，查询耗时 {elapsed:.2f} 毫秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+违禁词检测模块
+基于 Aho-Corasick 多模式自动机，检测描述中是否直接说出了词语本体
+"""
+import functools
+import json
+import unicodedata
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from pypinyin import lazy_pinyin  # 见 requirements.txt；未安装时不生成拼音模式，后端启动时提示
+except ImportError:
+    lazy_pinyin = None
+
+PINYIN_AVAILABLE = lazy_pinyin is not None  # 是否能检测拼音写法
+
+
+FILTER_CACHE_SIZE = 256  # 共享自动机缓存的最大数量
+
+
+def normalize_text(text: str) -> str:
+    """
+    归一化文本：全角转半角、转小写，并去掉空白和标点
+    这样 "向 日 葵"、"向-日-葵"、"ＸＩＡＮＧ" 等拆字写法与本体一致
+    :param text: 原始文本
+    :return: 归一化后的文本
+    """
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    return "".join(ch for ch in text if ch.isalnum())
+
+
+def validate_variants(variants) -> Optional[str]:
+    """
+    校验违禁词变体配置，必须是 {词语: [变体写法...]}，变体为非空字符串
+    （字符串值会被逐字拆成单字模式，造成大量误判）
+    :param variants: 待校验的配置
+    :return: 错误信息，合法时为None
+    """
+    if not isinstance(variants, dict):
+        return 'variants必须是对象'
+    for word, items in variants.items():
+        if not isinstance(items, list):
+            return f'variants中"{word}"的值必须是列表'
+        if not all(isinstance(item, str) and item.strip() for item in items):
+            return f'variants中"{word}"的变体必须是非空字符串'
+    return None
+
+
+class WordFilter:
+    """
+    违禁词自动机
+    每局开始时根据卧底词/平民词构建一次，之后每次描述只需线性扫描一遍
+    """
+
+    def __init__(self, words: Iterable[str], variants: Optional[Dict[str, List[str]]] = None):
+        """
+        :param words: 需要检测的词语（卧底词、平民词）
+        :param variants: 额外配置的变体 {词语: [变体写法...]}
+        :raises ValueError: 变体配置格式错误
+        """
+        error = validate_variants(variants or {})
+        if error:
+            raise ValueError(error)
+        self._goto: List[Dict[str, int]] = [{}]  # 状态转移表
+        self._fail: List[int] = [0]  # 失败指针
+        self._output: List[List[Dict]] = [[]]  # 每个状态命中的模式
+        self.patterns: List[Dict] = []
+
+        variants = variants or {}
+        for word in words:
+            if not word:
+                continue
+            self._add(word, word, "word")
+            if lazy_pinyin is not None:
+                self._add("".join(lazy_pinyin(word)), word, "pinyin")
+            for variant in variants.get(word, []):
+                self._add(variant, word, "variant")
+        self._build()
+
+    def _add(self, pattern: str, word: str, kind: str):
+        """向字典树中加入一个模式"""
+        key = normalize_text(pattern)
+        if not key:
+            return
+        state = 0
+        for ch in key:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = nxt
+        entry = {"pattern": key, "word": word, "kind": kind}
+        if entry not in self._output[state]:
+            self._output[state].append(entry)
+            self.patterns.append(entry)
+
+    def _build(self):
+        """广度优先计算失败指针，并合并后缀状态的输出"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0  # 第一层节点失败指针指向根
+                self._output[nxt] = self._output[nxt] + self._output[self._fail[nxt]]
+
+    def check(self, text: str) -> List[Dict]:
+        """
+        扫描文本
+        :param text: 描述内容
+        :return: 命中的模式列表（按出现顺序去重）
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        hits: List[Dict] = []
+        state = 0
+        for ch in normalize_text(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for entry in output[state]:
+                if entry not in hits:
+                    hits.append(entry)
+        return hits
+
+
+@functools.lru_cache(maxsize=FILTER_CACHE_SIZE)
+def _cached_filter(words: Tuple[str, ...], variants_key: str) -> WordFilter:
+    """按词语和变体缓存自动机"""
+    return WordFilter(words, json.loads(variants_key))
+
+
+def get_filter(words: Iterable[str], variants: Optional[Dict[str, List[str]]] = None) -> WordFilter:
+    """
+    获取违禁词自动机
+    自动机构建后只读，词语和变体相同的房间（如锦标赛各桌）共享同一个实例
+    :param words: 需要检测的词语
+    :param variants: 额外配置的变体 {词语: [变体写法...]}
+    :return: 自动机
+    """
+    variants_key = json.dumps(variants or {}, ensure_ascii=False, sort_keys=True)
+    return _cached_filter(tuple(words), variants_key)